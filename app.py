@@ -6,10 +6,8 @@ import time
 # --- Módulos internos ---
 from ui.style import aplicar_estilos
 from ui.header import mostrar_encabezado
-from modules.dashboard import mostrar_dashboard
-from modules.alta import mostrar_alta
-from modules.baja import mostrar_baja
-from modules.ver_socios import mostrar_socios
+# Las vistas (y sus dependencias pesadas: matplotlib, reportlab, PyPDF2) se importan
+# solo cuando se elige su entrada del menú.
 from modules.usuarios import (
     cargar_usuarios,
     guardar_usuarios,
@@ -17,17 +15,30 @@ from modules.usuarios import (
     hash_password,
     es_hash_bcrypt,
 )
-from modules.editar import mostrar_editar
 from core.data_manager import (
     sincronizar_pendientes,
     hay_pendientes_offline,
+    google_no_disponible,
     crear_backup_diario_sheets,
     limpiar_backups_antiguos,
     leer_fecha_ultimo_backup,
     guardar_fecha_ultimo_backup,
     fecha_hoy_madrid,
+    obtener_metricas,
+    antiguedad_datos,
+    STORAGE_BACKEND,
+    exportar_a_sheets,
+    importar_desde_sheets,
+    backend_local_vacio,
+    iniciar_almacenamiento,
+    esperar_almacenamiento,
+    arrancar_sin_google,
+    iniciar_contexto_peticion,
 )
 
+# La conexión con Google se prepara en segundo plano mientras se muestra el login.
+iniciar_almacenamiento()
+
 # --- Configuración de página ---
 st.set_page_config(page_title="Gestión Gimnasio", page_icon="💪", layout="centered")
 
@@ -53,7 +64,10 @@ TOKEN_PATH = BASE_DIR / "token.json"
 faltan_oauth_archivos = (not OAUTH_CREDS_PATH.exists()) or (not TOKEN_PATH.exists())
 faltan_oauth_env = ("OAUTH_CREDENTIALS_JSON" not in os.environ) or ("OAUTH_TOKEN_JSON" not in os.environ)
 
-if faltan_oauth_archivos and faltan_oauth_env:
+# Con SOCIOS_FAKE_GOOGLE=1 se usa el simulador en memoria y no hacen falta credenciales.
+usar_fake_google = os.environ.get("SOCIOS_FAKE_GOOGLE", "").strip().lower() in ("1", "true", "si", "sí")
+
+if faltan_oauth_archivos and faltan_oauth_env and not usar_fake_google:
     st.error(
         "❌ No se encontraron credenciales OAuth. Coloca oauth_credentials.json y token.json en el proyecto "
         "o define OAUTH_CREDENTIALS_JSON y OAUTH_TOKEN_JSON en el entorno."
@@ -66,6 +80,13 @@ for key in ["logged_in", "role", "username", "full_name"]:
         st.session_state[key] = None if key != "logged_in" else False
 st.session_state.setdefault("auto_backup_ran", False)
 
+# --- Contexto de datos de esta ejecución: memoiza lecturas repetidas y cuenta llamadas a Google ---
+contexto_anterior = st.session_state.get("contexto_datos")
+if contexto_anterior is not None:
+    contexto_anterior.cerrar()
+    st.session_state["llamadas_ultima_ejecucion"] = contexto_anterior.total_llamadas
+st.session_state["contexto_datos"] = iniciar_contexto_peticion()
+
 # --- LOGIN ---
 def login_screen():
     st.title("🔐 Acceso al sistema")
@@ -126,18 +147,34 @@ if not st.session_state.logged_in:
     login_screen()
     st.stop()
 
+# Si Google no responde pero hay foto local, se sigue con ella; solo se para ante credenciales o configuración.
+sin_google = False
+try:
+    esperar_almacenamiento()
+except Exception as e:
+    if not arrancar_sin_google(e):
+        st.error(f"Error al conectar con el almacenamiento de socios: {e}")
+        st.stop()
+    sin_google = True
+
 # --- Menú lateral (solo visible tras login) ---
 st.sidebar.write(f"👤 Usuario: {st.session_state.full_name}")
 st.sidebar.write(f"🔑 Rol: {st.session_state.role.capitalize()}")
 
-sincronizados = sincronizar_pendientes()
+sincronizados = 0 if sin_google else sincronizar_pendientes()
 if sincronizados:
     st.toast(f"✅ {sincronizados} cambio(s) sincronizados correctamente.")
-if st.session_state.get("offline_flag") or hay_pendientes_offline():
+if sin_google or google_no_disponible():
+    st.warning("⚠ Google no responde. Se muestran los últimos datos guardados y los cambios quedan pendientes de sincronizar.")
+elif st.session_state.get("offline_flag") or hay_pendientes_offline():
     st.warning("⚠ La red está inestable. Cambios guardados localmente y pendientes de sincronizar.")
+# Los datos pueden servirse desde la foto local mientras se revalidan en segundo plano.
+antiguedad = antiguedad_datos()
+if antiguedad is not None and antiguedad > 300:
+    st.sidebar.caption(f"🕒 Datos de hace {int(antiguedad // 60)} min (actualizando…)")
 
-# --- Backups automáticos para admin (solo una vez por login) ---
-if st.session_state.role == "admin" and not st.session_state.get("auto_backup_ran", False):
+# --- Backups automáticos para admin (solo una vez por login; con Google caído se espera a que vuelva) ---
+if st.session_state.role == "admin" and not st.session_state.get("auto_backup_ran", False) and not (sin_google or google_no_disponible()):
     try:
         hoy_str = fecha_hoy_madrid()
 
@@ -214,6 +251,7 @@ if st.session_state.role == "admin":
     opciones = [
         "Registrar alta",
         "🔍 Buscar socio",
+        "📅 Vencimientos",
         "✏️ Editar socio",
         "Ver socios",
         "Gestión de usuarios 👥",
@@ -235,14 +273,22 @@ st.sidebar.button("Cerrar sesión", on_click=logout)
 
 # --- Contenido dinámico ---
 if opcion == "Registrar alta":
+    from modules.alta import mostrar_alta
     mostrar_alta()
 elif opcion == "🔍 Buscar socio":
+    from modules.baja import mostrar_baja
     mostrar_baja()
+elif opcion == "📅 Vencimientos":
+    from modules.vencimientos import mostrar_vencimientos
+    mostrar_vencimientos()
 elif opcion == "Ver socios":
+    from modules.ver_socios import mostrar_socios
     mostrar_socios()
 elif opcion == "✏️ Editar socio":
+    from modules.editar import mostrar_editar
     mostrar_editar()
 elif opcion == "📊 Estadísticas del gimnasio":
+    from modules.dashboard import mostrar_dashboard
     mostrar_dashboard()
 elif opcion == "Gestión de usuarios 👥":
     from modules.usuarios import mostrar_gestion_usuarios
@@ -264,3 +310,18 @@ elif opcion == "📦 Backups":
         limpiar_backups_antiguos()
         st.success("Limpieza de backups ejecutada.")
         st.stop()
+    if STORAGE_BACKEND == "sqlite":
+        st.markdown("---")
+        st.subheader("💾 Base de datos local (SQLite)")
+        st.caption("Los socios y los logs se guardan en el servidor; Google Sheets es solo una copia exportada.")
+        col_exp, col_imp = st.columns(2)
+        if col_exp.button("Exportar socios a Google Sheets"):
+            filas = exportar_a_sheets()
+            st.success(f"Exportados {filas} socio(s) a Google Sheets.")
+        if backend_local_vacio() and col_imp.button("Importar socios desde Google Sheets"):
+            filas = importar_desde_sheets()
+            st.success(f"Importados {filas} socio(s) a la base local.")
+    st.markdown("---")
+    with st.expander("📈 Métricas de acceso a Google Sheets"):
+        st.caption(f"Llamadas a Google en la ejecución anterior: {st.session_state.get('llamadas_ultima_ejecucion', '—')}")
+        st.json(obtener_metricas())
@@ -0,0 +1,16 @@
+"""
+Benchmarks de la capa de datos. Se ejecutan como módulos: python -m benchmarks.<nombre>.
+
+Nunca usan Google de verdad: el simulador en memoria (core/fake_google.py) se activa
+antes de que nada importe core.data_manager.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("SOCIOS_FAKE_GOOGLE", "1")
+os.environ.setdefault("SPREADSHEET_ID", "benchmark")
+# Sin límite de cuota: se mide la capa de datos, no el limitador.
+os.environ.setdefault("SOCIOS_API_CUOTA_POR_MINUTO", "0")
+os.environ.setdefault("SOCIOS_API_CUOTA_DRIVE_POR_MINUTO", "0")
+# La foto local de las mediciones no debe pisar la de la aplicación.
+os.environ.setdefault("SOCIOS_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "benchmark_socios_snapshot.pkl"))
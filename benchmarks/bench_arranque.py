@@ -0,0 +1,84 @@
+# benchmarks/bench_arranque.py
+"""
+Mide el arranque de la capa de datos contra el simulador de Google con latencia:
+
+- Arranque en frío: un proceso nuevo importa core.data_manager (lo que ve el login) y
+  espera a que el almacenamiento esté listo. Cada repetición es un proceso aparte.
+- Arranque en caliente: en un proceso ya inicializado, lo que paga cada rerun de Streamlit
+  (volver a pedir el almacenamiento).
+
+Uso:
+    python -m benchmarks.bench_arranque
+    python -m benchmarks.bench_arranque --latencia-ms 150 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.medicion import guardar_resultados
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+# Se ejecuta en un proceso nuevo: imprime una línea JSON con las medidas.
+_SCRIPT_FRIO = """
+import json, time
+inicio = time.perf_counter()
+import core.data_manager as dm
+importado = time.perf_counter()
+dm.esperar_almacenamiento()
+listo = time.perf_counter()
+inicio_caliente = time.perf_counter()
+for _ in range(1000):
+    dm.esperar_almacenamiento()
+caliente = (time.perf_counter() - inicio_caliente) / 1000
+print(json.dumps({
+    "import": importado - inicio,
+    "listo": listo - inicio,
+    "caliente": caliente,
+    "llamadas_api": dm._get_fake_google().estadisticas()["total_llamadas"],
+}))
+"""
+
+
+def _arranque_en_frio(latencia_ms: float) -> dict:
+    entorno = dict(os.environ, FAKE_GOOGLE_LATENCIA_MS=str(latencia_ms))
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_FRIO],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia-ms", type=float, default=80.0, help="latencia simulada por llamada a la API")
+    parser.add_argument("--salida", type=Path, default=None, help="fichero JSON (por defecto, benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    medidas = [_arranque_en_frio(args.latencia_ms) for _ in range(max(1, args.repeticiones))]
+    mejor = min(medidas, key=lambda m: m["listo"])
+    resultados = [
+        {"operacion": "import core.data_manager (login visible)", "segundos": round(min(m["import"] for m in medidas), 6)},
+        {"operacion": "arranque en frío (almacenamiento listo)", "segundos": round(mejor["listo"], 6), "llamadas_api": mejor["llamadas_api"]},
+        {"operacion": "arranque en caliente (rerun)", "segundos": round(min(m["caliente"] for m in medidas), 9)},
+    ]
+
+    print(f"{'operación':<42} | {'tiempo (ms)':>11} | {'llamadas':>8}")
+    for r in resultados:
+        print(f"{r['operacion']:<42} | {r['segundos'] * 1000:>11.3f} | {r.get('llamadas_api', ''):>8}")
+
+    ruta = guardar_resultados("arranque", resultados, vars(args) | {"salida": str(args.salida) if args.salida else None}, args.salida)
+    print(f"Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/bench_capa_datos.py
+"""
+Mide cómo escalan las operaciones de la capa de datos con gimnasios sintéticos de
+distintos tamaños, contra el simulador de Google en memoria: tiempo, llamadas a la API,
+bytes transferidos y memoria pico por operación, más la memoria que ocupa la caché de
+socios. Los resultados se guardan en JSON.
+
+Uso:
+    python -m benchmarks.bench_capa_datos
+    python -m benchmarks.bench_capa_datos --tamanos 1000 10000 --latencia-ms 80
+    python -m benchmarks.bench_capa_datos --salida resultados.json
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+import core.data_manager as dm
+from benchmarks.datos_sinteticos import cargar_en_fake, generar_logs, generar_socios
+from benchmarks.medicion import guardar_resultados, imprimir_tabla, medir
+from modules.busqueda import COLUMNAS_BUSQUEDA, _filtrar_socios
+
+
+def _nuevo_gimnasio(filas: int, logs_por_socio: int, semilla: int, latencia_ms: float):
+    """Sustituye el simulador por uno nuevo con el gimnasio sintético y vacía las cachés."""
+    dm._fake_google = None
+    dm._sheets_service = None
+    dm._drive_service = None
+    dm._sheet_title_cache = None
+    dm._pestanas_existentes.clear()
+    dm.SNAPSHOT_PATH.unlink(missing_ok=True)
+    dm._snapshot_disco_mtime = None
+    dm._cache_df = None
+    dm._cache_descargado_en = None
+    dm._set_snapshot(None)
+    dm._invalidar_cache()
+
+    fake = dm._get_fake_google()
+    socios = generar_socios(filas, semilla)
+    cargar_en_fake(fake, dm._get_spreadsheet_id(), socios, generar_logs(socios, filas * logs_por_socio, semilla))
+    fake.latencia_ms = latencia_ms
+    return fake, socios
+
+
+def _escenarios(socios):
+    """(operación, preparar, función). `preparar` corre fuera del cronómetro."""
+
+    def en_frio():
+        dm._invalidar_cache()
+
+    def caliente():
+        dm.cargar_datos()
+
+    def alternar_pago(fila):
+        # Como las páginas: el cambio pasa por SocioStore, que respeta los tipos de la caché.
+        store = dm.obtener_socio_store()
+        pagado = dm.texto_en_hoja("Estado de pago", store.df["Estado de pago"].iloc[fila]) == "Pagado"
+        store.set_status(store.df["DNI"].iloc[fila], estado_pago="No pagado" if pagado else "Pagado")
+        return store.df
+
+    def marcar_un_pago():
+        # Lo que quede de la repetición anterior se escribe fuera del cronómetro.
+        dm.vaciar_escrituras_pendientes()
+        return alternar_pago(len(socios) // 2)
+
+    def pagos_seguidos(filas):
+        # Cada pago lee la caché y confirma (diario local); luego, la escritura agrupada
+        # que haría el hilo escritor al cerrar la ventana.
+        for fila in filas:
+            dm.guardar_datos(alternar_pago(fila))
+        dm.vaciar_escrituras_pendientes()
+
+    def filas_repartidas(cuantas):
+        dm.vaciar_escrituras_pendientes()
+        return [i * len(socios) // cuantas for i in range(cuantas)]
+
+    def con_alias():
+        df = socios.rename(columns={"Plan contratado": "plan_contratado"})
+        df["Plan"] = ""
+        return df
+
+    dni_con_historial = socios["DNI"].iloc[0]
+    return [
+        ("cargar_datos (frío)", en_frio, lambda _: dm.cargar_datos()),
+        ("cargar_datos (caché)", caliente, lambda _: dm.cargar_datos()),
+        ("cargar_datos columnas (frío)", en_frio, lambda _: dm.cargar_datos(columns=COLUMNAS_BUSQUEDA)),
+        ("_aplicar_reglas_pago", lambda: socios.copy(), lambda df: dm._aplicar_reglas_pago(df)),
+        ("_normalize_dataframe_columns", con_alias, lambda df: dm._normalize_dataframe_columns(df)),
+        ("_filtrar_socios", lambda: dm.cargar_datos(), lambda df: _filtrar_socios(df, "Apellidos", "martín")),
+        ("guardar_datos (confirmación)", marcar_un_pago, lambda df: dm.guardar_datos(df)),
+        ("guardar_datos (1 pago)", lambda: filas_repartidas(1), pagos_seguidos),
+        ("guardar_datos (10 pagos)", lambda: filas_repartidas(10), pagos_seguidos),
+        ("guardar_datos (reescritura)", lambda: marcar_un_pago().iloc[1:], lambda df: dm.guardar_datos(df)),
+        ("obtener_historial_logs", None, lambda _: dm.obtener_historial_logs(dni_con_historial)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--logs-por-socio", type=int, default=2)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="latencia simulada por llamada a la API")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", type=Path, default=None, help="fichero JSON (por defecto, benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    # La cola offline de la medición no debe mezclarse con la de la aplicación.
+    directorio = Path(tempfile.mkdtemp(prefix="bench_capa_datos_"))
+    dm.QUEUE_PATH = directorio / "offline_queue.json"
+    dm.DIARIO_PATH = directorio / "escrituras_pendientes.jsonl"
+
+    resultados = []
+    for filas in args.tamanos:
+        fake, socios = _nuevo_gimnasio(filas, args.logs_por_socio, args.semilla, args.latencia_ms)
+        medidas = [
+            medir(operacion, funcion, preparar, args.repeticiones, fake, filas=filas)
+            for operacion, preparar, funcion in _escenarios(socios)
+        ]
+        imprimir_tabla(medidas)
+        resultados.extend(medidas)
+
+        # Memoria de la caché: representación tipada frente a la misma tabla como texto de hoja.
+        cache = dm.cargar_datos()
+        memoria = {
+            "operacion": "memoria caché",
+            "filas": filas,
+            "bytes_tipada": int(cache.memory_usage(deep=True).sum()),
+            "bytes_texto": int(dm._to_sheet_values(cache).memory_usage(deep=True).sum()),
+        }
+        print(
+            f"caché en memoria: {memoria['bytes_tipada'] / 2**20:.2f} MB "
+            f"(como texto de hoja: {memoria['bytes_texto'] / 2**20:.2f} MB)"
+        )
+        print()
+        resultados.append(memoria)
+
+    ruta = guardar_resultados("capa_datos", resultados, vars(args) | {"salida": str(args.salida) if args.salida else None}, args.salida)
+    print(f"Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_google_colgado.py
+"""
+Mide cuánto tarda la capa de datos en rendirse cuando Google acepta las conexiones pero
+no responde (el simulador espera el timeout del transporte y falla con TimeoutError).
+A diferencia de una caída que falla al instante, cada intento cuesta un timeout entero:
+importa cuántos se pagan antes de que el cortacircuitos se abra y las operaciones pasen
+a servirse de la caché o a la cola offline sin esperar.
+
+Cada operación invalida la caché y vuelve a leer los socios, como tras una escritura.
+
+Uso:
+    SOCIOS_FAKE_GOOGLE=1 python -m benchmarks.bench_google_colgado
+    SOCIOS_FAKE_GOOGLE=1 python -m benchmarks.bench_google_colgado --timeout 2 --operaciones 4
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import core.data_manager as dm
+from benchmarks.datos_sinteticos import cargar_en_fake, generar_logs, generar_socios
+from benchmarks.medicion import guardar_resultados
+from core import llamadas_api
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000)
+    parser.add_argument("--operaciones", type=int, default=3)
+    parser.add_argument(
+        "--timeout", type=float, default=llamadas_api.TIMEOUT_SEGUNDOS, help="timeout del transporte en segundos"
+    )
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", type=Path, default=None, help="fichero JSON (por defecto, benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    # La cola offline y la foto local de la medición no deben mezclarse con las de la aplicación.
+    directorio = Path(tempfile.mkdtemp(prefix="bench_google_colgado_"))
+    dm.QUEUE_PATH = directorio / "offline_queue.json"
+    dm.DIARIO_PATH = directorio / "escrituras_pendientes.jsonl"
+    dm.SNAPSHOT_PATH = directorio / "socios_snapshot.pkl"
+    llamadas_api.TIMEOUT_SEGUNDOS = args.timeout
+
+    fake = dm._get_fake_google()
+    socios = generar_socios(args.filas, args.semilla)
+    cargar_en_fake(fake, dm._get_spreadsheet_id(), socios, generar_logs(socios, args.filas, args.semilla))
+    dm.cargar_datos()
+
+    fake.simular_cuelgue()
+    resultados = []
+    for n in range(1, args.operaciones + 1):
+        fake.reiniciar_estadisticas()
+        dm._invalidar_cache()
+        inicio = time.perf_counter()
+        df = dm.cargar_datos()
+        resultados.append(
+            {
+                "operacion": f"lectura {n} con Google colgado",
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "llamadas_api": fake.estadisticas()["total_llamadas"],
+                "filas_servidas": len(df),
+                "circuito": llamadas_api.obtener_estadisticas()["circuito"]["estado"],
+            }
+        )
+    fake.simular_cuelgue(False)
+
+    print(f"timeout {args.timeout:g} s, umbral del cortacircuitos {llamadas_api.UMBRAL_FALLOS_CIRCUITO} fallos")
+    print(f"{'operación':<32} | {'tiempo (s)':>10} | {'llamadas':>8} | {'filas':>7} | circuito")
+    for r in resultados:
+        print(
+            f"{r['operacion']:<32} | {r['segundos']:>10.3f} | {r['llamadas_api']:>8} | "
+            f"{r['filas_servidas']:>7} | {r['circuito']}"
+        )
+    print(f"total hasta servir sin esperar: {sum(r['segundos'] for r in resultados):.3f} s")
+
+    ruta = guardar_resultados(
+        "google_colgado", resultados, vars(args) | {"salida": str(args.salida) if args.salida else None}, args.salida
+    )
+    print(f"Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
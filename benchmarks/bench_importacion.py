@@ -0,0 +1,104 @@
+# benchmarks/bench_importacion.py
+"""
+Informe de tiempos de importación con `python -X importtime`, en procesos nuevos:
+
+- Arranque: lo que app.py importa siempre (antes del login y en cada proceso).
+- Cada vista de modules/: lo que añade importarla encima del arranque, que es lo que
+  paga el primer usuario que la elige en el menú.
+
+Señala los paquetes pesados (matplotlib, reportlab, PyPDF2) que arrastra cada importación:
+si aparecen en el arranque, alguien ha vuelto a importarlos de forma anticipada.
+
+Uso:
+    python -m benchmarks.bench_importacion
+    python -m benchmarks.bench_importacion --repeticiones 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.medicion import guardar_resultados
+
+RAIZ = Path(__file__).resolve().parents[1]
+# Lo que app.py importa de forma incondicional.
+ARRANQUE = ["streamlit", "ui.style", "ui.header", "modules.usuarios", "core.data_manager"]
+PAQUETES_PESADOS = ["matplotlib", "reportlab", "PyPDF2"]
+
+
+def _vistas() -> list:
+    return sorted(
+        f"modules.{ruta.stem}"
+        for ruta in (RAIZ / "modules").glob("*.py")
+        if ruta.stem not in ("__init__", "usuarios") and "def mostrar_" in ruta.read_text(encoding="utf-8")
+    )
+
+
+def _importtime(previos: list, modulos: list) -> list:
+    """Importa `previos` y luego `modulos` bajo -X importtime; devuelve [(self_us, acumulado_us, nombre)]."""
+    codigo = "".join(f"import {m}\n" for m in previos + modulos)
+    entorno = dict(os.environ, PYTHONPATH=str(RAIZ))
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+    )
+    if resultado.returncode != 0:
+        ultima = resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else ""
+        raise RuntimeError(f"No se pudo importar {', '.join(modulos)}: {ultima}")
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        filas.append((int(propio), int(acumulado), nombre.rstrip()))
+    return filas
+
+
+def _medir(previos: list, modulos: list) -> dict:
+    """Tiempo de importar `modulos` (ya importados `previos`) y paquetes pesados que arrastran."""
+    filas = _importtime(previos, modulos)
+    # Las líneas salen en orden de finalización: las de `previos` terminan antes que las de `modulos`.
+    ultimo_previo = max((i for i, (_, _, n) in enumerate(filas) if n.strip() in previos), default=-1)
+    nuevas = filas[ultimo_previo + 1:]
+    principales = [f for f in nuevas if f[2].strip() in modulos]
+    raices = {n.strip().split(".")[0] for _, _, n in nuevas}
+    return {
+        "segundos": sum(acumulado for _, acumulado, _ in principales) / 1e6,
+        "modulos_importados": len(nuevas),
+        "paquetes_pesados": [p for p in PAQUETES_PESADOS if p in raices],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", type=Path, default=None, help="fichero JSON (por defecto, benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    casos = [("arranque de app.py", [], ARRANQUE)]
+    casos += [(vista, ARRANQUE, [vista]) for vista in _vistas()]
+    casos.append(("todas las vistas (importación anticipada)", ARRANQUE, _vistas()))
+
+    resultados = []
+    for operacion, previos, modulos in casos:
+        medidas = [_medir(previos, modulos) for _ in range(max(1, args.repeticiones))]
+        mejor = min(medidas, key=lambda m: m["segundos"])
+        resultados.append({"operacion": operacion, **mejor, "segundos": round(mejor["segundos"], 6)})
+
+    print(f"{'importación':<44} | {'tiempo (ms)':>11} | {'módulos':>7} | pesados")
+    for r in resultados:
+        print(
+            f"{r['operacion']:<44} | {r['segundos'] * 1000:>11.1f} | {r['modulos_importados']:>7} | "
+            f"{', '.join(r['paquetes_pesados']) or '—'}"
+        )
+
+    ruta = guardar_resultados("importacion", resultados, vars(args) | {"salida": str(args.salida) if args.salida else None}, args.salida)
+    print(f"Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_reglas_pago.py
+"""
+Compara la versión por columnas de _aplicar_reglas_pago con la implementación
+anterior basada en iterrows sobre DataFrames sintéticos.
+
+Uso:
+    python -m benchmarks.bench_reglas_pago
+    python -m benchmarks.bench_reglas_pago --tamanos 1000 10000
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import generar_socios
+from core.data_manager import PLAN_PERIODOS_MESES, _aplicar_reglas_pago
+
+
+def _aplicar_reglas_pago_iterrows(df: pd.DataFrame):
+    """Implementación previa (fila a fila), conservada solo como referencia de rendimiento."""
+    actualizado = False
+    now = pd.Timestamp.now()
+    df["Estado de pago"] = df["Estado de pago"].replace("", "No pagado")
+
+    for idx, row in df.iterrows():
+        plan = str(row.get("Plan contratado", "")).strip()
+        estado_actual = str(row.get("Estado de pago", "")).strip() or "No pagado"
+        fecha_pago = str(row.get("Fecha último pago", "")).strip()
+
+        if plan not in PLAN_PERIODOS_MESES:
+            if estado_actual not in ("Pagado", "No pagado"):
+                df.at[idx, "Estado de pago"] = "No pagado"
+                actualizado = True
+            continue
+
+        if not fecha_pago:
+            if estado_actual != "No pagado":
+                df.at[idx, "Estado de pago"] = "No pagado"
+                actualizado = True
+            continue
+
+        fecha_dt = pd.to_datetime(fecha_pago, errors="coerce")
+        if pd.isna(fecha_dt):
+            if estado_actual != "No pagado":
+                df.at[idx, "Estado de pago"] = "No pagado"
+                actualizado = True
+            continue
+
+        next_due = fecha_dt + pd.DateOffset(months=PLAN_PERIODOS_MESES[plan])
+        if now >= next_due and estado_actual != "No pagado":
+            df.at[idx, "Estado de pago"] = "No pagado"
+            actualizado = True
+
+    return df, actualizado
+
+
+def _medir(funcion, df: pd.DataFrame, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        copia = df.copy()
+        inicio = time.perf_counter()
+        funcion(copia)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+    # pd.to_datetime fila a fila avisa de que infiere el formato; es ruido para la medición.
+    warnings.simplefilter("ignore", UserWarning)
+
+    print(f"{'filas':>8} | {'iterrows (s)':>12} | {'columnas (s)':>12} | {'mejora':>7}")
+    for filas in args.tamanos:
+        df = generar_socios(filas)
+        # La versión fila a fila es muy lenta con muchas filas: una sola medición basta.
+        t_iterrows = _medir(_aplicar_reglas_pago_iterrows, df, 1 if filas >= 50_000 else args.repeticiones)
+        t_columnas = _medir(_aplicar_reglas_pago, df, args.repeticiones)
+        print(f"{filas:>8} | {t_iterrows:>12.4f} | {t_columnas:>12.4f} | {t_iterrows / t_columnas:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
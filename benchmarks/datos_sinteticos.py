@@ -0,0 +1,143 @@
+# benchmarks/datos_sinteticos.py
+"""
+Generador de gimnasios sintéticos: socios con DNI válido, fechas coherentes y planes
+reales de la aplicación, y filas de la hoja Logs. Todo es determinista para una semilla.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from core.data_manager import COLUMNS, LOG_COLUMNS, PLAN_PERIODOS_MESES
+from modules.alta import PLANES_ADULTO, PLANES_INFANTIL
+
+LETRAS_DNI = "TRWAGMYFPDXBNJZSQVHLCKE"
+FORMATO_FECHA = "%d-%m-%Y %H:%M:%S"
+
+NOMBRES = [
+    "Lucía", "Hugo", "Martina", "Martín", "Sofía", "Daniel", "Julia", "Pablo", "Paula", "Alejandro",
+    "Valeria", "Álvaro", "Emma", "Adrián", "Daniela", "Mario", "Carla", "Diego", "Sara", "Javier",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez",
+    "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero",
+]
+LOCALIDADES = ["Madrid", "Alcobendas", "Getafe", "Leganés", "Móstoles", "Alcorcón", "Fuenlabrada"]
+BANCOS = ["Santander", "BBVA", "CaixaBank", "Sabadell", "Bankinter", ""]
+ACCIONES_LOG = ["alta", "editar", "pagado", "no pagado", "baja"]
+
+
+def dni_valido(numero: int) -> str:
+    return f"{numero:08d}{LETRAS_DNI[numero % 23]}"
+
+
+def _planes_adulto(rng: random.Random):
+    disciplina = rng.choice(list(PLANES_ADULTO))
+    plan, precio = rng.choice(PLANES_ADULTO[disciplina])
+    return disciplina, plan, precio
+
+
+def generar_socios(filas: int, semilla: int = 42, fraccion_periodica: float = 0.3) -> pd.DataFrame:
+    """
+    Devuelve `filas` socios con el esquema COLUMNS y todas las celdas como texto.
+    Una `fraccion_periodica` de socios tiene un plan de PLAN_PERIODOS_MESES, para que las
+    reglas de vencimiento de pago tengan trabajo; el resto usa los planes del alta.
+    """
+    rng = random.Random(semilla)
+    ahora = datetime.now()
+    registros = []
+    numeros = rng.sample(range(10_000_000, 99_999_999), filas)
+    for numero in numeros:
+        infantil = rng.random() < 0.15
+        edad = rng.randint(8, 14) if infantil else rng.randint(15, 70)
+        nacimiento = (ahora - timedelta(days=edad * 365 + rng.randint(0, 364))).date()
+        if infantil:
+            disciplina = "Infantil"
+            plan, precio = rng.choice(PLANES_INFANTIL)
+        else:
+            disciplina, plan, precio = _planes_adulto(rng)
+        if rng.random() < fraccion_periodica:
+            plan = rng.choice(list(PLAN_PERIODOS_MESES))
+        alta = ahora - timedelta(days=rng.randint(0, 5 * 365), seconds=rng.randint(0, 86_399))
+        fecha_pago = ""
+        if rng.random() < 0.85:
+            fecha_pago = (ahora - timedelta(days=rng.randint(0, 400), seconds=rng.randint(0, 86_399))).strftime(FORMATO_FECHA)
+        nombre = rng.choice(NOMBRES)
+        apellidos = f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        banco = rng.choice(BANCOS)
+        registros.append(
+            {
+                "Nombre": nombre,
+                "Apellidos": apellidos,
+                "DNI": dni_valido(numero),
+                "Teléfono": f"6{rng.randint(0, 99_999_999):08d}",
+                "Email": f"{nombre.lower()}.{numero}@correo.es",
+                "Disciplina": disciplina,
+                "Plan contratado": plan,
+                "Precio": precio,
+                "Fecha nacimiento": nacimiento.isoformat(),
+                "Fecha de alta": alta.strftime(FORMATO_FECHA),
+                "Banco": banco,
+                "Titular": f"{nombre} {apellidos}" if banco else "",
+                "IBAN": f"ES{rng.randint(10, 99)}{rng.randint(0, 10**20 - 1):020d}" if banco else "",
+                "Localidad": rng.choice(LOCALIDADES),
+                "Estado": "Baja" if rng.random() < 0.1 else "Activo",
+                "Estado de pago": rng.choice(["Pagado", "No pagado"]),
+                "Fecha último pago": fecha_pago,
+                "URL PDF Consentimiento": f"https://drive.google.com/file/d/{numero:x}a/view" if not infantil else "",
+                "URL Doc WhatsApp": f"https://drive.google.com/file/d/{numero:x}b/view",
+                "URL Doc Publicidad": f"https://drive.google.com/file/d/{numero:x}c/view",
+                "URL Doc Menor14": f"https://drive.google.com/file/d/{numero:x}d/view" if edad < 14 else "",
+                "URL Doc 14-18": f"https://drive.google.com/file/d/{numero:x}e/view" if 14 <= edad < 18 else "",
+                "Versión": "1",
+            }
+        )
+    return pd.DataFrame(registros, columns=COLUMNS)
+
+
+def generar_logs(socios: pd.DataFrame, filas: int, semilla: int = 42) -> list:
+    """Devuelve `filas` eventos de la hoja Logs (listas en el orden LOG_COLUMNS) sobre DNIs de `socios`."""
+    rng = random.Random(semilla)
+    ahora = datetime.now()
+    dnis = socios["DNI"].tolist()
+    usuarios = ["admin", "recepcion", "empleado1", "empleado2"]
+    logs = []
+    for _ in range(filas):
+        accion = rng.choice(ACCIONES_LOG)
+        fecha = ahora - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86_399))
+        logs.append(
+            [
+                fecha.strftime(FORMATO_FECHA),
+                rng.choice(usuarios),
+                accion,
+                rng.choice(dnis) if dnis else "",
+                f"Cambio de prueba ({accion})",
+            ]
+        )
+    logs.sort(key=lambda fila: datetime.strptime(fila[0], FORMATO_FECHA))
+    return logs
+
+
+def cargar_en_fake(fake, spreadsheet_id: str, socios: pd.DataFrame, logs: list) -> None:
+    """Rellena la hoja principal y la pestaña Logs del simulador de Google sin contar llamadas."""
+    servicio = fake.sheets().spreadsheets()
+    hojas = [h["properties"]["title"] for h in servicio.get(spreadsheetId=spreadsheet_id).execute()["sheets"]]
+    titulo = hojas[0]
+    if "Logs" not in hojas:
+        servicio.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"requests": [{"addSheet": {"properties": {"title": "Logs"}}}]},
+        ).execute()
+    servicio.values().update(
+        spreadsheetId=spreadsheet_id,
+        range=f"{titulo}!A1",
+        valueInputOption="RAW",
+        body={"values": [COLUMNS] + socios[COLUMNS].values.tolist()},
+    ).execute()
+    servicio.values().update(
+        spreadsheetId=spreadsheet_id,
+        range="Logs!A1",
+        valueInputOption="RAW",
+        body={"values": [LOG_COLUMNS] + logs},
+    ).execute()
+    fake.reiniciar_estadisticas()
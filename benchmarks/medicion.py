@@ -0,0 +1,102 @@
+# benchmarks/medicion.py
+"""
+Utilidades comunes de medición: tiempo de reloj, llamadas y bytes contra el simulador
+de Google, memoria pico, y volcado de resultados a JSON para comparar ejecuciones.
+"""
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+DIRECTORIO_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+
+def medir(operacion: str, funcion, preparar=None, repeticiones: int = 3, fake=None, **datos) -> dict:
+    """
+    Ejecuta `funcion(estado)` `repeticiones` veces, con `estado = preparar()` antes de cada
+    una (fuera del cronómetro), y se queda con el mejor tiempo. La memoria pico se mide en
+    una ejecución aparte bajo tracemalloc, que ralentiza el código y falsearía el tiempo.
+    Las llamadas y bytes son los de la última ejecución cronometrada.
+    """
+    mejor = float("inf")
+    estadisticas = {}
+    for _ in range(max(1, repeticiones)):
+        estado = preparar() if preparar else None
+        if fake is not None:
+            fake.reiniciar_estadisticas()
+        inicio = time.perf_counter()
+        funcion(estado)
+        mejor = min(mejor, time.perf_counter() - inicio)
+        if fake is not None:
+            estadisticas = fake.estadisticas()
+
+    estado = preparar() if preparar else None
+    tracemalloc.start()
+    try:
+        funcion(estado)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "operacion": operacion,
+        **datos,
+        "segundos": round(mejor, 6),
+        "llamadas_api": estadisticas.get("total_llamadas", 0),
+        "llamadas_por_metodo": estadisticas.get("llamadas", {}),
+        "bytes_enviados": estadisticas.get("bytes_enviados", 0),
+        "bytes_recibidos": estadisticas.get("bytes_recibidos", 0),
+        "memoria_pico_bytes": pico,
+    }
+
+
+def _commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def guardar_resultados(nombre: str, resultados: list, parametros: dict, ruta: Path | None = None) -> Path:
+    """Escribe los resultados con metadatos del entorno; por defecto en benchmarks/resultados/."""
+    ahora = datetime.now()
+    if ruta is None:
+        ruta = DIRECTORIO_RESULTADOS / f"{nombre}_{ahora:%Y%m%d-%H%M%S}.json"
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    documento = {
+        "benchmark": nombre,
+        "fecha": ahora.isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "entorno": {
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+        },
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+    return ruta
+
+
+def imprimir_tabla(resultados: list) -> None:
+    print(f"{'operación':<28} | {'filas':>7} | {'tiempo (ms)':>11} | {'llamadas':>8} | {'KB env.':>8} | {'KB rec.':>9} | {'pico (MB)':>9}")
+    for r in resultados:
+        print(
+            f"{r['operacion']:<28} | {r.get('filas', ''):>7} | {r['segundos'] * 1000:>11.2f} | {r['llamadas_api']:>8} | "
+            f"{r['bytes_enviados'] / 1024:>8.1f} | {r['bytes_recibidos'] / 1024:>9.1f} | {r['memoria_pico_bytes'] / 2**20:>9.2f}"
+        )
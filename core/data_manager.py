@@ -1,17 +1,34 @@
 # core/data_manager.py
 from google.oauth2.credentials import Credentials
+from google.auth.exceptions import TransportError
 from google.auth.transport.requests import Request
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import json
 import os
 import io
 import csv
+import atexit
+import contextvars
+import pickle
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
 import pytz
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
 
+from core import llamadas_api
+from core.storage import BackendSocios, ConflictoVersiones, SQLiteBackend
+
 # --- Configuración ---
 # Scopes OAuth para Drive (subida/listado de archivos creados) y Sheets (lectura/escritura).
 SCOPES = [
@@ -27,11 +44,139 @@ DRIVE_FOLDER_NAME = "FIRMAS_PDF"
 DRIVE_FOLDER_ID = os.environ.get("DRIVE_FOLDER_ID")
 SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID")
 BACKUP_SHEETS_FOLDER_NAME = "BACKUPS_SHEETS"
+# Almacenamiento de socios y logs: "sheets" (Google Sheets, por defecto) o "sqlite"
+# (fichero local; Sheets queda como destino de exportación).
+STORAGE_BACKEND = os.environ.get("SOCIOS_BACKEND", "sheets").strip().lower()
+SQLITE_PATH = Path(os.environ.get("SOCIOS_SQLITE_PATH", BASE_DIR / "socios.db"))
+LOG_COLUMNS = ["Fecha", "Usuario", "Acción", "DNI", "Detalle"]
+_backend = None
+# Con SOCIOS_FAKE_GOOGLE=1 los servicios de Sheets y Drive se sustituyen por el simulador
+# en memoria de core/fake_google.py: sin credenciales ni red, para medir y probar la capa de datos.
+USAR_FAKE_GOOGLE = os.environ.get("SOCIOS_FAKE_GOOGLE", "").strip().lower() in ("1", "true", "si", "sí")
+_fake_google = None
 _credentials = None
+# Protege la carga y el refresco de las credenciales, compartidas por todos los transportes.
+_credenciales_lock = threading.RLock()
+# El token de acceso se renueva en segundo plano este margen antes de caducar, para que
+# ninguna llamada de un usuario tenga que esperar al refresco.
+TOKEN_MARGEN_REFRESCO_SEGUNDOS = float(os.environ.get("SOCIOS_TOKEN_MARGEN", "300"))
+TOKEN_REINTENTO_SEGUNDOS = 60
+_refrescador_token = None
+_token_despertar = threading.Event()
+_token_stats = {"refrescos_segundo_plano": 0, "refrescos_en_peticion": 0, "fallos": 0}
 _sheets_service = None
 _drive_service = None
 _spreadsheet_id_cache = None
 _sheet_title_cache = None
+# Pestañas que ya se sabe que existen en la hoja de cálculo (evita releer sus metadatos).
+_pestanas_existentes = set()
+# Construcción de los servicios y del simulador: una sola vez aunque la pidan varios hilos.
+_servicios_lock = threading.RLock()
+# Inicialización del almacenamiento: una vez por proceso y en segundo plano (ver iniciar_almacenamiento).
+_inicializacion = None
+_inicializacion_lock = threading.Lock()
+# Contexto de la ejecución del script en curso (ver iniciar_contexto_peticion) y totales por ejecución.
+_contexto_peticion = contextvars.ContextVar("contexto_peticion", default=None)
+_ejecuciones_stats = {"ejecuciones": 0, "llamadas": 0, "llamadas_max": 0, "lecturas_reutilizadas": 0}
+# Último contenido conocido de la hoja principal (como texto), base para escribir solo diferencias.
+_snapshot_df = None
+# Índice hash de DNIs existentes. Se actualiza en el sitio con cada escritura y alta; solo se
+# reconstruye (bajo demanda, a partir de la foto) tras leer la hoja entera.
+_dni_index = None
+# SocioStore (índices por DNI y estado) de la caché de proceso; se reconstruye solo cuando cambia _cache_df.
+_socio_store = None
+# Caché de proceso del DataFrame de socios, compartida por todas las sesiones de Streamlit.
+# Se invalida al escribir (subiendo _data_version) y caduca tras CACHE_TTL_SEGUNDOS
+# para recoger cambios hechos fuera de la aplicación; al caducar se consulta la versión
+# del archivo en Drive y solo se vuelve a descargar si ha cambiado.
+CACHE_TTL_SEGUNDOS = float(os.environ.get("SOCIOS_CACHE_TTL", "60"))
+_data_lock = threading.RLock()
+_data_version = 0
+_cache_df = None
+_cache_version = -1
+_cache_cargado_en = 0.0
+_cache_firma = None
+# Instante (reloj de pared) en que los datos en memoria se leyeron de Sheets; da su antigüedad.
+_cache_descargado_en = None
+_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "lecturas_parciales": 0,
+    "comprobaciones_cambio": 0,
+    "descargas_evitadas": 0,
+    "servidas_obsoletas": 0,
+    "servidas_desde_disco": 0,
+    "revalidaciones": 0,
+}
+# Foto local de la hoja compartida por todos los procesos del servidor. Se reescribe tras
+# cada lectura o escritura correcta y permite servir datos al instante (o sin conexión).
+SNAPSHOT_PATH = Path(os.environ.get("SOCIOS_SNAPSHOT_PATH", BASE_DIR / "socios_snapshot.pkl"))
+_snapshot_disco_mtime = None
+_refresco_en_curso = False
+# Descarga completa en curso para la caché: una a la vez, sin el candado de datos. Quien
+# llega mientras tanto espera en la condición y se sirve lo que se haya instalado.
+_descarga_en_curso = False
+_descarga_cond = threading.Condition(_data_lock)
+# Lecturas proyectadas (solo algunas columnas):
+# {tupla de columnas: (versión, instante de carga, firma de Drive, DataFrame)}.
+_cache_proyecciones = {}
+# Índice ordenado por fecha de próximo pago de los socios que no están de baja. Se reconstruye
+# al instalar una caché nueva; cuando solo cambian algunas filas, se recolocan solo esas.
+_indice_vencimientos = None
+# Carga por bloques de filas: tamaño de bloque y número máximo de descargas simultáneas.
+CARGA_FILAS_POR_BLOQUE = int(os.environ.get("SOCIOS_FILAS_POR_BLOQUE", "5000"))
+CARGA_CONCURRENCIA = int(os.environ.get("SOCIOS_CARGA_CONCURRENCIA", "4"))
+_pool_carga = None
+# Transportes HTTP autorizados que se prestan a cada hilo durante una llamada a Google.
+POOL_HTTP_TAMANO = int(os.environ.get("SOCIOS_POOL_HTTP", "8"))
+_pool_http = None
+# Cerrojo propio de los pools: se toma con _data_lock o _servicios_lock ya tomados y nunca
+# toma otro dentro, así que no puede cruzarse con ellos.
+_pools_lock = threading.Lock()
+# Escritura diferida: guardar_datos confirma en cuanto las filas cambiadas quedan en el diario
+# local y un hilo agrupa lo pendiente (ventana de ESCRITURA_DIFERIDA_MS o ESCRITURA_DIFERIDA_MAX_OPS
+# operaciones) en una sola escritura. Con 0 ms se escribe en el acto, como antes.
+ESCRITURA_DIFERIDA_MS = float(os.environ.get("SOCIOS_ESCRITURA_DIFERIDA_MS", "200"))
+ESCRITURA_DIFERIDA_MAX_OPS = int(os.environ.get("SOCIOS_ESCRITURA_DIFERIDA_MAX_OPS", "20"))
+DIARIO_PATH = Path(os.environ.get("SOCIOS_DIARIO_PATH", BASE_DIR / "escrituras_pendientes.jsonl"))
+# Filas confirmadas y aún no escritas: {posición: valores}; _pendiente_df es la hoja con ellas
+# (y con el lote que se está escribiendo) aplicadas.
+_pendiente_filas = {}
+_pendiente_df = None
+# Lote que el escritor está enviando sin el candado de datos. Solo hay una escritura a la
+# vez (_escritura_en_curso), sea un lote o una escritura en el acto de guardar_datos o de un alta.
+_filas_en_vuelo = {}
+_escritura_en_curso = False
+# Escritura en el acto en curso (reescritura o alta): una descarga que termine entretanto no
+# sabe si la incluye y no se instala.
+_escritura_en_el_acto = False
+_pendiente_ops = 0
+_pendiente_desde = None
+_escritura_cond = threading.Condition(_data_lock)
+_escritor = None
+_escritura_stats = {
+    "operaciones": 0,
+    "lotes": 0,
+    "ops_lote_max": 0,
+    "filas_escritas": 0,
+    "ms_confirmacion_total": 0.0,
+    "ms_confirmacion_max": 0.0,
+    "ms_escritura_total": 0.0,
+    "a_cola_offline": 0,
+    "recuperadas_del_diario": 0,
+}
+# Filas sustituidas por una versión más reciente: {(posición, versión): valores}. Son la base
+# para rebasar lo que escribe una sesión que leyó una versión anterior.
+HISTORIAL_FILAS_MAX = int(os.environ.get("SOCIOS_HISTORIAL_FILAS", "20000"))
+REINTENTOS_CONFLICTO = 3
+_historial_filas = OrderedDict()
+_versiones_stats = {
+    "filas_escritas": 0,
+    "rebasadas": 0,
+    "obsoletas_descartadas": 0,
+    "sin_base": 0,
+    "conflictos_remotos": 0,
+}
 LAST_BACKUP_SHEETS_FILENAME = "last_backup_sheets.txt"
 
 
@@ -60,13 +205,85 @@ def _save_token_if_local(creds: Credentials):
             "client_secret": creds.client_secret,
             "scopes": creds.scopes,
         }
-        with open(TOKEN_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if creds.expiry:
+            # Sin caducidad guardada, al arrancar no se sabría cuándo renovar el token.
+            data["expiry"] = creds.expiry.strftime("%Y-%m-%dT%H:%M:%SZ")
+        # Escritura atómica: otro proceso puede estar leyendo token.json a la vez.
+        fd, tmp = tempfile.mkstemp(dir=TOKEN_PATH.parent, prefix=".token_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, TOKEN_PATH)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
     except Exception:
         # En entornos donde no se quiera escribir, simplemente se omite.
         pass
 
 
+class _CredencialesCompartidas(Credentials):
+    """Credenciales OAuth compartidas por todos los transportes: solo un hilo refresca a la vez."""
+
+    def refresh(self, request):
+        token_anterior = self.token
+        with _credenciales_lock:
+            # Otro hilo pudo renovar el token mientras este esperaba el candado.
+            if self.token != token_anterior and self.valid:
+                return
+            super().refresh(request)
+            if threading.current_thread() is not _refrescador_token:
+                # Refresco forzado en una petición (p. ej. un 401): el refrescador lo guarda
+                # en disco y reprograma el siguiente.
+                _token_stats["refrescos_en_peticion"] += 1
+                _token_despertar.set()
+
+
+def _segundos_hasta_refresco(creds: Credentials) -> float:
+    if creds.expiry is None:
+        # Token sin caducidad conocida (p. ej. token.json antiguo): se renueva ya.
+        return 0.0
+    restante = (creds.expiry - datetime.now(pytz.utc).replace(tzinfo=None)).total_seconds()
+    return max(0.0, restante - TOKEN_MARGEN_REFRESCO_SEGUNDOS)
+
+
+def _bucle_refresco_token() -> None:
+    """
+    Renueva el token antes de que caduque y lo guarda en disco, fuera de las peticiones.
+    Sin refresh token no hay nada que renovar: el hilo termina. Entre vueltas se espera al
+    menos TOKEN_REINTENTO_SEGUNDOS, para no girar en vacío si la caducidad no avanza
+    (p. ej. un token.json antiguo sin «expiry»).
+    """
+    token_guardado = None
+    espera = 0.0
+    while True:
+        if _token_despertar.wait(espera):
+            _token_despertar.clear()
+        creds = _credentials
+        if not creds.refresh_token:
+            return
+        try:
+            with _credenciales_lock:
+                if _segundos_hasta_refresco(creds) <= 0:
+                    creds.refresh(Request())
+                    _token_stats["refrescos_segundo_plano"] += 1
+            if creds.token != token_guardado:
+                _save_token_if_local(creds)
+                token_guardado = creds.token
+            espera = max(_segundos_hasta_refresco(creds), TOKEN_REINTENTO_SEGUNDOS)
+        except Exception as e:
+            _token_stats["fallos"] += 1
+            print(f"[WARN] No se pudo renovar el token OAuth: {e}")
+            espera = TOKEN_REINTENTO_SEGUNDOS
+
+
+def _iniciar_refrescador_token() -> None:
+    global _refrescador_token
+    if _refrescador_token is None and _credentials is not None and _credentials.refresh_token:
+        _refrescador_token = threading.Thread(target=_bucle_refresco_token, name="refresco_token", daemon=True)
+        _refrescador_token.start()
+
+
 def _load_credentials() -> Credentials:
     """
     Carga credenciales OAuth desde:
@@ -74,9 +291,21 @@ def _load_credentials() -> Credentials:
     - Archivos locales token.json y oauth_credentials.json.
     Refresca el token si es necesario.
     """
+    if _credentials and _credentials.valid:
+        return _credentials
+    with _credenciales_lock:
+        return _cargar_credenciales()
+
+
+def _cargar_credenciales() -> Credentials:
     global _credentials
     if _credentials and _credentials.valid:
         return _credentials
+    if _credentials and _credentials.refresh_token:
+        # El refrescador no llegó a tiempo (p. ej. sin red): se renueva aquí, en el mismo
+        # objeto que usan los transportes del pool.
+        _credentials.refresh(Request())
+        return _credentials
 
     token_data = _load_json_from_env("OAUTH_TOKEN_JSON")
     creds_info = _load_json_from_env("OAUTH_CREDENTIALS_JSON")
@@ -99,16 +328,18 @@ def _load_credentials() -> Credentials:
     if token_data is None:
         raise RuntimeError("No se encontraron credenciales OAuth (token.json / OAUTH_TOKEN_JSON). Ejecuta autoriza_oauth.py.")
 
-    creds = Credentials.from_authorized_user_info(token_data, scopes=SCOPES)
+    creds = _CredencialesCompartidas.from_authorized_user_info(token_data, scopes=SCOPES)
 
     if not creds.valid:
         if creds.expired and creds.refresh_token:
+            # Al arrancar con el token caducado no queda más remedio que esperar al refresco;
+            # el guardado en disco lo hace el refrescador.
             creds.refresh(Request())
-            _save_token_if_local(creds)
         else:
             raise RuntimeError("Credenciales OAuth inválidas o sin refresh token. Ejecuta autoriza_oauth.py de nuevo.")
 
     _credentials = creds
+    _iniciar_refrescador_token()
     return _credentials
 
 # --- Esquema fijo ---
@@ -135,7 +366,11 @@ COLUMNS = [
     "URL Doc Publicidad",
     "URL Doc Menor14",
     "URL Doc 14-18",
+    "Versión",
 ]
+# Contador de modificaciones de cada fila: una escritura solo se aplica sobre la versión
+# que leyó; si la fila cambió entretanto, se rebasa sobre la última (ver _rebasar_sesion).
+COLUMNA_VERSION = "Versión"
 
 COLUMN_SYNONYMS = {
     "plan": "Plan contratado",
@@ -150,6 +385,17 @@ PLAN_PERIODOS_MESES = {
     "Anual": 12,
 }
 
+# Versión del esquema de la hoja principal. Súbela al cambiar COLUMNS para que
+# migrar_esquema() reescriba la hoja una única vez.
+SCHEMA_VERSION = 2
+META_SHEET_TITLE = "Meta"
+_esquema_verificado = False
+
+# Intervalo mínimo entre revisiones automáticas de vencimientos de pago por proceso.
+REVISION_PAGOS_SEGUNDOS = 3600
+_ultima_revision_pagos = None
+_revisor_pagos = None
+
 
 def _load_queue():
     if QUEUE_PATH.exists():
@@ -191,184 +437,2055 @@ def _empty_dataframe() -> pd.DataFrame:
     return pd.DataFrame(columns=COLUMNS)
 
 
-def _canonical_column_name(nombre: str) -> str:
+def _canonical_column_name(nombre: str) -> str:
+    """
+    Limpia el nombre de columna y devuelve la forma canónica esperada.
+    Actualmente se enfoca en asegurar el uso único de «Plan contratado».
+    """
+    if not nombre:
+        return nombre
+    limpio = " ".join(nombre.strip().replace("_", " ").split())
+    clave = limpio.lower()
+    return COLUMN_SYNONYMS.get(clave, limpio)
+
+
+def _normalize_dataframe_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Renombra columnas con alias conocidos al esquema oficial y consolida duplicadas.
+    Evita que coexistan columnas como «Plan» y «Plan contratado».
+    Si todas las columnas ya son canónicas devuelve `df` sin copiarlo.
+    """
+    if df is None:
+        return df
+    if all(_canonical_column_name(col) == col for col in df.columns):
+        return df
+
+    df = df.copy()
+    columnas_originales = list(df.columns)
+    for col in columnas_originales:
+        canonica = _canonical_column_name(col)
+        if canonica == col:
+            continue
+        if canonica in df.columns:
+            destino = df[canonica]
+            mask = destino.isna() | (destino.astype(str).str.strip() == "")
+            df.loc[mask, canonica] = df.loc[mask, col]
+            df.drop(columns=[col], inplace=True)
+        else:
+            df.rename(columns={col: canonica}, inplace=True)
+    return df
+
+
+def _ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garantiza la presencia y el orden del esquema fijo. Si la cabecera ya es COLUMNS
+    devuelve `df` tal cual, sin copiarlo: quien lo modifique después debe copiarlo antes.
+    """
+    if df is None:
+        return _empty_dataframe()
+    if list(df.columns) == COLUMNS:
+        return df
+    df = _normalize_dataframe_columns(df)
+    faltan = {col: "" for col in COLUMNS if col not in df.columns}
+    if faltan:
+        df = df.assign(**faltan)
+    return df[COLUMNS]
+
+
+def _column_letter(indice: int) -> str:
+    """Convierte un índice de columna (0 = A) a la letra usada en los rangos A1."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+def _to_sheet_values(df: pd.DataFrame, referencia: tuple | None = None) -> pd.DataFrame:
+    """
+    Devuelve el DataFrame con el esquema fijo y todas las celdas como texto, tal y como se
+    guardan en la hoja. Es el único punto en que la representación tipada (ver _tipar)
+    vuelve a texto: las fechas con su formato de hoja y las categorías por su valor.
+
+    `referencia` es un par (tabla tipada, sus valores de hoja) alineado por posición, normalmente
+    la caché: las fechas que no cambian respecto a ella reutilizan su texto en lugar de
+    volver a formatearse.
+    """
+    df = _ensure_columns(df)
+    columnas = {}
+    for col, formato in COLUMNAS_FECHA.items():
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            columnas[col] = _fechas_a_texto(df[col], formato, referencia)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            columnas[col] = _categorias_a_texto(df[col])
+    if columnas:
+        df = df.assign(**columnas)
+    return df.fillna("").astype(str)
+
+
+def _set_snapshot(df: pd.DataFrame | None, recargada: bool = False) -> None:
+    """
+    Sustituye la foto de la hoja. El índice de DNIs se actualiza con las filas cuyo DNI
+    cambia respecto a la foto anterior; con `recargada` (la hoja leída entera) o sin foto
+    anterior se descarta y se reconstruye bajo demanda.
+    """
+    global _snapshot_df, _dni_index
+    anterior = _snapshot_df
+    _snapshot_df = None if df is None else _to_sheet_values(df).reset_index(drop=True)
+    if recargada or anterior is None or _snapshot_df is None:
+        _dni_index = None
+    elif _dni_index is not None:
+        _actualizar_indice_dni(anterior["DNI"].to_numpy(), _snapshot_df["DNI"].to_numpy())
+
+
+def _actualizar_indice_dni(anteriores, nuevos) -> None:
+    """
+    Lleva el índice de los DNIs `anteriores` a los `nuevos` (por posición): primero se quitan
+    los que cambian o desaparecen y después se añaden los que los sustituyen.
+    """
+    n = min(len(anteriores), len(nuevos))
+    cambiadas = (anteriores[:n] != nuevos[:n]).nonzero()[0]
+    if len(cambiadas) == 0 and len(anteriores) == len(nuevos):
+        return
+    _dni_index.difference_update(map(_normalizar_dni, [*anteriores[cambiadas], *anteriores[n:]]))
+    _dni_index.update(dni for dni in map(_normalizar_dni, [*nuevos[cambiadas], *nuevos[n:]]) if dni)
+
+
+def _normalizar_dni(dni) -> str:
+    return str(dni or "").strip().upper()
+
+
+def _get_dni_index() -> set:
+    """Devuelve el conjunto de DNIs registrados, reconstruyéndolo si se ha invalidado."""
+    global _dni_index
+    if _dni_index is None:
+        base = _snapshot_df if _snapshot_df is not None else cargar_datos()
+        _dni_index = {dni for dni in base["DNI"].map(_normalizar_dni) if dni}
+    return _dni_index
+
+
+def existe_dni(dni: str) -> bool:
+    """Comprueba si ya hay un socio con ese DNI sin recorrer la hoja."""
+    return _normalizar_dni(dni) in _get_dni_index()
+
+
+def _flush_dataframe(df: pd.DataFrame) -> None:
+    df = _to_sheet_values(df)
+    data_rows = df.values.tolist() if not df.empty else []
+    spreadsheet_id = _get_spreadsheet_id()
+    sheet_title = _get_sheet_title(spreadsheet_id)
+    service = _get_sheets_service()
+
+    values = [COLUMNS] + data_rows
+    service.spreadsheets().values().update(
+        spreadsheetId=spreadsheet_id,
+        range=f"{sheet_title}!A1",
+        valueInputOption="RAW",
+        body={"values": values},
+    ).execute()
+
+    # Limpiar solo lo que queda fuera del nuevo contenido (filas sobrantes y columnas antiguas),
+    # así la hoja nunca queda vacía entre la limpieza y la escritura.
+    ultima_fila = len(values)
+    siguiente_columna = _column_letter(len(COLUMNS))
+    service.spreadsheets().values().batchClear(
+        spreadsheetId=spreadsheet_id,
+        body={
+            "ranges": [
+                f"{sheet_title}!A{ultima_fila + 1}:Z",
+                f"{sheet_title}!{siguiente_columna}1:Z{ultima_fila}",
+            ]
+        },
+    ).execute()
+
+
+def _calcular_diferencias(anterior: pd.DataFrame, nuevo: pd.DataFrame, sheet_title: str):
+    """
+    Compara el contenido nuevo con la última foto conocida de la hoja.
+    Devuelve (rangos a escribir con values().batchUpdate, posiciones de las filas existentes
+    que cambian), o None si el orden de filas cambió (o hay filas eliminadas) y hace falta
+    reescribir la hoja.
+    """
+    filas_anteriores = len(anterior)
+    if len(nuevo) < filas_anteriores:
+        return None
+    nuevos = nuevo.values
+    comunes = nuevos[:filas_anteriores]
+    dni_idx = COLUMNS.index("DNI")
+    if (comunes[:, dni_idx] != anterior.values[:, dni_idx]).any():
+        return None
+
+    data = []
+    cambios = comunes != anterior.values
+    posiciones = cambios.any(axis=1).nonzero()[0]
+    for pos in posiciones:
+        columnas = cambios[pos].nonzero()[0]
+        inicio, fin = int(columnas[0]), int(columnas[-1])
+        fila = int(pos) + 2  # +1 por la cabecera y +1 porque las filas empiezan en 1
+        data.append(
+            {
+                "range": f"{sheet_title}!{_column_letter(inicio)}{fila}:{_column_letter(fin)}{fila}",
+                "values": [comunes[pos, inicio : fin + 1].tolist()],
+            }
+        )
+
+    if len(nuevo) > filas_anteriores:
+        primera = filas_anteriores + 2
+        ultima = len(nuevo) + 1
+        data.append(
+            {
+                "range": f"{sheet_title}!A{primera}:{_column_letter(len(COLUMNS) - 1)}{ultima}",
+                "values": nuevos[filas_anteriores:].tolist(),
+            }
+        )
+    return data, posiciones
+
+
+def _celda_leida(rango: dict, k: int) -> str:
+    """Valor de la fila `k` de un rango de una columna leído con batchGet; Sheets omite las celdas vacías del final."""
+    valores = rango.get("values", [])
+    return valores[k][0] if k < len(valores) and valores[k] else ""
+
+
+def _comprobar_versiones_hoja(spreadsheet_id: str, sheet_title: str, anterior: pd.DataFrame, posiciones) -> None:
+    """
+    Escritura condicional en Sheets: relee el DNI y la versión de las filas que se van a
+    escribir (y la fila siguiente a la última conocida, para detectar altas de otra instancia)
+    en una sola llamada y lanza ConflictoVersiones si no coinciden con `anterior`. El DNI
+    detecta filas desplazadas por bajas o reordenaciones de otra instancia aunque la versión
+    coincida. Sheets no tiene escrituras condicionales: esto reduce la ventana de carrera a
+    una llamada, no la cierra.
+    """
+    letras = [_column_letter(COLUMNS.index("DNI")), _column_letter(COLUMNS.index(COLUMNA_VERSION))]
+    tramos = _agrupar_contiguos(sorted(int(p) for p in posiciones))
+    siguiente = len(anterior) + 2
+    rangos = [f"{sheet_title}!{letra}{inicio + 2}:{letra}{fin + 2}" for inicio, fin in tramos for letra in letras]
+    rangos.append(f"{sheet_title}!A{siguiente}:{_column_letter(len(COLUMNS) - 1)}{siguiente}")
+    service = _get_sheets_service()
+    result = service.spreadsheets().values().batchGet(spreadsheetId=spreadsheet_id, ranges=rangos).execute()
+    leidos = result.get("valueRanges", [])
+    dnis = anterior["DNI"].tolist()
+    versiones = anterior[COLUMNA_VERSION].tolist()
+    distintas = []
+    for i, (inicio, fin) in enumerate(tramos):
+        rango_dni, rango_version = leidos[2 * i], leidos[2 * i + 1]
+        for k, pos in enumerate(range(inicio, fin + 1)):
+            if _celda_leida(rango_dni, k) != dnis[pos] or _celda_leida(rango_version, k) != versiones[pos]:
+                distintas.append(pos)
+    if len(leidos) > 2 * len(tramos) and any(any(fila) for fila in leidos[-1].get("values", [])):
+        distintas.append(len(anterior))
+    if distintas:
+        raise ConflictoVersiones(distintas)
+
+
+def _escribir_dataframe_sheets(anterior: pd.DataFrame | None, df: pd.DataFrame) -> None:
+    """
+    Persiste el DataFrame enviando solo las celdas que cambiaron respecto a `anterior`
+    (la última foto de la hoja). Si no hay foto o cambió el orden de filas, reescribe la hoja completa.
+    Con foto, antes de escribir se comprueba que las filas afectadas conservan su versión.
+    """
+    if anterior is None:
+        _flush_dataframe(df)
+        return
+
+    spreadsheet_id = _get_spreadsheet_id()
+    sheet_title = _get_sheet_title(spreadsheet_id)
+    diferencias = _calcular_diferencias(anterior, df, sheet_title)
+    if diferencias is None:
+        _comprobar_versiones_hoja(spreadsheet_id, sheet_title, anterior, range(len(anterior)))
+        _flush_dataframe(df)
+        return
+    data, posiciones = diferencias
+    if data:
+        _comprobar_versiones_hoja(spreadsheet_id, sheet_title, anterior, posiciones)
+        service = _get_sheets_service()
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "RAW", "data": data},
+        ).execute()
+
+
+def _escribir_dataframe(df: pd.DataFrame, completo: bool = False) -> None:
+    """Persiste el DataFrame en el backend activo (solo las diferencias salvo con `completo`)."""
+    df = _to_sheet_values(df).reset_index(drop=True)
+    _get_backend().escribir_socios(None if completo else _snapshot_df, df)
+    _set_snapshot(df)
+
+
+# --- Versiones de fila (concurrencia optimista) ---
+def _version(valor) -> int:
+    """Versión de una fila; vacía (filas anteriores al esquema 2) o inválida cuenta como 0."""
+    try:
+        return int(str(valor).strip() or 0)
+    except ValueError:
+        return 0
+
+
+def _filas_distintas(a: pd.DataFrame, b: pd.DataFrame):
+    """Posiciones, entre las filas comunes, en que `a` y `b` (valores de hoja) difieren fuera de la versión."""
+    n = min(len(a), len(b))
+    a = a.iloc[:n].reset_index(drop=True)
+    b = b.iloc[:n].reset_index(drop=True)
+    distintas = pd.Series(False, index=a.index)
+    for columna in COLUMNS:
+        if columna != COLUMNA_VERSION:
+            distintas |= a[columna] != b[columna]
+    return distintas.to_numpy().nonzero()[0]
+
+
+def _fusionar_fila(nuestra: list, base: list, suya: list) -> list | None:
+    """
+    Aplica sobre `suya` (la última versión de la fila) las celdas en que `nuestra` difiere de
+    `base` (la versión sobre la que se hicieron los cambios) y le asigna la versión siguiente.
+    None si no queda nada que cambiar.
+    """
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    fila = list(suya)
+    for i, (valor, original) in enumerate(zip(nuestra, base)):
+        if i != iv and valor != original:
+            fila[i] = valor
+    if fila == list(suya):
+        return None
+    fila[iv] = str(_version(suya[iv]) + 1)
+    return fila
+
+
+def _sustituir_filas(df: pd.DataFrame, filas: dict) -> pd.DataFrame:
+    """Copia de `df` con las filas {posición: valores} sustituidas."""
+    df = df.copy()
+    if filas:
+        df.iloc[list(filas)] = list(filas.values())
+    return df
+
+
+def _recordar_versiones(anterior: pd.DataFrame | None, nuevo: pd.DataFrame) -> None:
+    """Guarda en el historial las filas de `anterior` que `nuevo` sustituye por otra versión."""
+    if anterior is None or COLUMNA_VERSION not in anterior or COLUMNA_VERSION not in nuevo:
+        return
+    n = min(len(anterior), len(nuevo))
+    viejas = anterior[COLUMNA_VERSION].iloc[:n].reset_index(drop=True)
+    nuevas = nuevo[COLUMNA_VERSION].iloc[:n].reset_index(drop=True)
+    cambiadas = (viejas != nuevas).to_numpy().nonzero()[0]
+    if len(cambiadas) == 0:
+        return
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    if len(cambiadas) > 100:
+        filas = _to_sheet_values(anterior.iloc[cambiadas]).values.tolist()
+    else:
+        # Con pocas filas sale más barato pasar a texto celda a celda que columna a columna.
+        filas = [
+            [texto_en_hoja(col, valor) for col, valor in zip(COLUMNS, fila)]
+            for fila in anterior[COLUMNS].iloc[cambiadas].itertuples(index=False)
+        ]
+    for pos, fila in zip(cambiadas, filas):
+        _historial_filas[(int(pos), _version(fila[iv]))] = fila
+    while len(_historial_filas) > HISTORIAL_FILAS_MAX:
+        _historial_filas.popitem(last=False)
+
+
+def _rebasar_sesion(sesion: pd.DataFrame, ultima: pd.DataFrame) -> pd.DataFrame:
+    """
+    Escritura condicional por fila de lo que guarda una sesión (valores de hoja) sobre la
+    última tabla confirmada. Para cada fila que difiere:
+
+    - Si la sesión leyó la versión actual, sus valores se aplican con la versión siguiente.
+    - Si leyó una anterior, solo se aplican las celdas que la sesión cambió respecto a lo
+      que leyó (sacado del historial): se rebasa sobre la última y no pisa lo que otros
+      escribieron entretanto. Una fila que la sesión no tocó se queda como está.
+    - Sin esa versión en el historial no se puede saber qué cambió: gana lo que se guarda.
+
+    Las filas de `ultima` que la sesión no tiene (altas posteriores) se conservan. Si la
+    sesión eliminó o reordenó filas, no hay correspondencia por posición: se guarda tal cual
+    (reescritura completa, condicionada a que la tabla no haya cambiado).
+    """
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    n = min(len(sesion), len(ultima))
+    if len(sesion) < len(ultima) and not sesion["DNI"].equals(ultima["DNI"].iloc[:n]):
+        return sesion
+    # Se parte de la sesión: las filas que no difieren ya tienen el contenido de `ultima`,
+    # y de ella se toma la columna de versiones entera.
+    versiones = ultima[COLUMNA_VERSION].iloc[:n].to_numpy(dtype=object, copy=True)
+    obsoletas = {}
+    for pos in _filas_distintas(sesion, ultima):
+        pos = int(pos)
+        nuestra = sesion.iloc[pos].tolist()
+        suya = ultima.iloc[pos].tolist()
+        leida = _version(nuestra[iv])
+        base = suya
+        if leida < _version(suya[iv]):
+            base = _historial_filas.get((pos, leida))
+            if base is None:
+                _versiones_stats["sin_base"] += 1
+                base = suya
+        fila = _fusionar_fila(nuestra, base, suya)
+        if fila is None:
+            _versiones_stats["obsoletas_descartadas"] += 1
+            obsoletas[pos] = suya
+            continue
+        _versiones_stats["filas_escritas"] += 1
+        versiones[pos] = fila[iv]
+        if base is not suya:
+            _versiones_stats["rebasadas"] += 1
+        if fila != nuestra[:iv] + [fila[iv]] + nuestra[iv + 1 :]:
+            obsoletas[pos] = fila
+    objetivo = sesion.iloc[:n].copy()
+    objetivo[COLUMNA_VERSION] = pd.Series(versiones, index=objetivo.index, dtype=ultima[COLUMNA_VERSION].dtype)
+    objetivo = _sustituir_filas(objetivo, obsoletas)
+    if len(sesion) > n:
+        objetivo = pd.concat([objetivo, sesion.iloc[n:]], ignore_index=True)
+    elif len(ultima) > n:
+        objetivo = pd.concat([objetivo, ultima.iloc[n:]], ignore_index=True)
+    return objetivo
+
+
+def _escribir_lote(base: pd.DataFrame | None, objetivo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Escribe `objetivo` (valores de hoja) como diferencias condicionales sobre `base`. Si otra
+    instancia cambió alguna de las filas, relee la tabla, rebasa nuestros cambios (respecto a
+    `base`) sobre ella y reintenta. Devuelve lo escrito. No toca la foto ni la caché, así que
+    puede llamarse sin _data_lock.
+    """
+    for intento in range(REINTENTOS_CONFLICTO + 1):
+        try:
+            _get_backend().escribir_socios(base, objetivo)
+            return objetivo
+        except ConflictoVersiones as e:
+            if base is None or intento == REINTENTOS_CONFLICTO:
+                raise
+            with _data_lock:
+                _versiones_stats["conflictos_remotos"] += 1
+            print(f"[WARN] {e}; se relee la tabla y se rebasan los cambios.")
+            df, cabecera_ok = _descargar_socios()
+            if not cabecera_ok:
+                raise
+            suya = _to_sheet_values(df).reset_index(drop=True)
+            # Nuestras filas (con la base sobre la que se cambiaron) se aplican sobre la tabla
+            # releída; si otra instancia desplazó filas, cada una se busca por su DNI.
+            filas = {
+                int(pos): (objetivo.iloc[pos].tolist(), base.iloc[pos].tolist())
+                for pos in _filas_distintas(objetivo, base)
+            }
+            nuevas = objetivo.iloc[len(base):]
+            objetivo = _aplicar_filas(suya, filas)
+            if len(nuevas):
+                objetivo = pd.concat([objetivo, nuevas], ignore_index=True)
+            base = suya
+    return objetivo
+
+
+def _escribir_versionado(objetivo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Escribe `objetivo` sobre la foto (ver _escribir_lote) y la foto pasa a ser lo escrito.
+    Devuelve lo escrito. Llamar con _data_lock adquirido.
+    """
+    escrito = _escribir_lote(_snapshot_df, objetivo)
+    _set_snapshot(escrito)
+    return escrito
+
+
+FORMATO_FECHA_PAGO = "%d-%m-%Y %H:%M:%S"
+# Columna calculada en memoria (no se guarda en la hoja) con la fecha del próximo pago.
+COLUMNA_PROXIMO_PAGO = "Próximo pago"
+
+
+def _parse_fechas(serie: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de fechas en texto a datetime64 en una sola pasada.
+    Primero con el formato que escribe la aplicación y, para el resto, con el
+    análisis flexible de pandas. Las fechas vacías o inválidas quedan como NaT.
+    Si la columna ya está tipada (ver _tipar), se devuelve tal cual.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.fillna("").astype(str).str.strip()
+    fechas = pd.to_datetime(texto, format=FORMATO_FECHA_PAGO, errors="coerce")
+    pendientes = fechas.isna() & (texto != "")
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format="mixed", errors="coerce")
+    return fechas
+
+
+def _calcular_vencimientos(df: pd.DataFrame) -> pd.Series:
+    """Fecha del próximo pago de cada socio según su plan y su último pago (NaT si no aplica)."""
+    meses = df["Plan contratado"].fillna("").astype(str).str.strip().map(PLAN_PERIODOS_MESES)
+    ultimo_pago = _parse_fechas(df["Fecha último pago"])
+    vencimientos = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    for periodo in set(PLAN_PERIODOS_MESES.values()):
+        mask = (meses == periodo) & ultimo_pago.notna()
+        if mask.any():
+            vencimientos[mask] = ultimo_pago[mask] + pd.DateOffset(months=periodo)
+    return vencimientos
+
+
+def _aplicar_reglas_pago(df: pd.DataFrame):
+    """
+    Marca como «No pagado» a los socios con el pago vencido o sin fecha de pago válida
+    y normaliza estados desconocidos. Opera por columnas sobre todo el DataFrame.
+    Devuelve el DataFrame y una máscara booleana con las filas cuyo estado cambió.
+    """
+    now = pd.Timestamp.now()
+    original = df["Estado de pago"].fillna("").astype(str)
+    estado = original.str.strip().replace("", "No pagado")
+
+    con_plan = df["Plan contratado"].fillna("").astype(str).str.strip().isin(PLAN_PERIODOS_MESES.keys())
+    vencimientos = _calcular_vencimientos(df)
+
+    sin_plan_invalido = ~con_plan & ~estado.isin(["Pagado", "No pagado"])
+    con_plan_vencido = con_plan & (vencimientos.isna() | (vencimientos <= now))
+    forzar = (sin_plan_invalido | con_plan_vencido) & (estado != "No pagado")
+
+    nuevo = original.mask(original == "", "No pagado").mask(forzar, "No pagado")
+    cambios = nuevo != original
+    df["Estado de pago"] = nuevo
+    return df, cambios
+
+
+# --- Representación tipada en memoria ---
+# En la caché las columnas con pocos valores distintos son «category» y las fechas,
+# datetime64. La conversión a texto solo ocurre al escribir (_to_sheet_values).
+# «Precio» es categórica y no numérica: guarda etiquetas como «30€/mes».
+COLUMNAS_CATEGORICAS = ["Estado", "Estado de pago", "Disciplina", "Plan contratado", "Precio", "Banco", "Localidad"]
+FORMATO_FECHA_ISO = "%Y-%m-%d"
+# Columna de fecha → formato con que se escribe en la hoja.
+COLUMNAS_FECHA = {
+    "Fecha nacimiento": FORMATO_FECHA_ISO,
+    "Fecha de alta": FORMATO_FECHA_PAGO,
+    "Fecha último pago": FORMATO_FECHA_PAGO,
+}
+
+
+def _texto_a_fechas(texto: pd.Series, formato: str) -> pd.Series | None:
+    """
+    Convierte celdas de hoja con `formato` a datetime64 (las vacías, NaT). Devuelve None si
+    alguna celda no vuelve a dar exactamente el mismo texto (_fechas_a_texto): así una
+    columna tipada nunca cambia lo que se escribe en la hoja.
+    Los formatos conocidos se reordenan a ISO 8601, que pandas analiza sin pasar por strptime.
+    """
+    texto = texto.fillna("").astype(str)
+    try:
+        if formato == FORMATO_FECHA_PAGO:
+            iso = texto.str[6:10] + "-" + texto.str[3:5] + "-" + texto.str[0:2] + "T" + texto.str[11:19]
+            fechas = pd.to_datetime(iso, format="ISO8601", errors="coerce")
+        elif formato == FORMATO_FECHA_ISO:
+            fechas = pd.to_datetime(texto, format="ISO8601", errors="coerce")
+        else:
+            fechas = pd.to_datetime(texto, format=formato, errors="coerce")
+    except (TypeError, ValueError):
+        # Por ejemplo, fechas con zonas horarias distintas.
+        return None
+    if not pd.api.types.is_datetime64_dtype(fechas) or not (_fechas_a_texto(fechas, formato) == texto).all():
+        return None
+    return fechas
+
+
+def _fechas_a_texto(fechas: pd.Series, formato: str, referencia: tuple | None = None) -> pd.Series:
+    """
+    Escribe una columna datetime64 con `formato` (NaT → celda vacía). Con `referencia`
+    (ver _to_sheet_values) solo se formatean las fechas que difieren de ella.
+    """
+    if referencia is not None:
+        tipada, texto = referencia
+        previas = tipada[fechas.name] if fechas.name in tipada else None
+        if previas is not None and len(previas) == len(fechas) and pd.api.types.is_datetime64_any_dtype(previas):
+            a, b = fechas.to_numpy(), previas.to_numpy()
+            distintas = ((a != b) & ~(np.isnat(a) & np.isnat(b))).nonzero()[0]
+            resultado = texto[fechas.name].set_axis(fechas.index)
+            if len(distintas):
+                resultado = resultado.copy()
+                resultado.iloc[distintas] = _fechas_a_texto(fechas.iloc[distintas], formato).to_numpy()
+            return resultado
+    if formato not in (FORMATO_FECHA_PAGO, FORMATO_FECHA_ISO):
+        return fechas.dt.strftime(formato).fillna("")
+    # datetime_as_string + recortes es varias veces más rápido que dt.strftime.
+    iso = pd.Series(
+        np.datetime_as_string(fechas.to_numpy().astype("datetime64[s]"), unit="s"),
+        index=fechas.index,
+        dtype="str",
+    )
+    if formato == FORMATO_FECHA_PAGO:
+        texto = iso.str[8:10] + "-" + iso.str[5:7] + "-" + iso.str[0:4] + " " + iso.str[11:19]
+    else:
+        texto = iso.str[0:10]
+    return texto.where(fechas.notna(), "")
+
+
+def _categorias_a_texto(serie: pd.Series) -> pd.Series:
+    """Valores de una columna categórica como texto (cada categoría se convierte una sola vez)."""
+    categorias = serie.cat.categories.astype("str")
+    return pd.Series(
+        categorias.array.take(serie.cat.codes.to_numpy(), allow_fill=True),
+        index=serie.index,
+        name=serie.name,
+    )
+
+
+def _tipar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Representación en memoria de `df` (valores de hoja): COLUMNAS_CATEGORICAS como
+    «category» y COLUMNAS_FECHA como datetime64; el resto sigue siendo texto. Una columna
+    de fecha con alguna celda fuera de su formato se queda como texto. Las columnas ya
+    tipadas o que no cambian no se copian.
+    """
+    columnas = {}
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            columnas[col] = df[col].astype("category")
+    for col, formato in COLUMNAS_FECHA.items():
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            fechas = _texto_a_fechas(df[col], formato)
+            if fechas is not None:
+                columnas[col] = fechas
+    return df.assign(**columnas) if columnas else df
+
+
+def _retipar_filas(tipada: pd.DataFrame, anterior: pd.DataFrame, nuevo: pd.DataFrame, posiciones) -> pd.DataFrame | None:
+    """
+    `tipada` (representación en memoria de `anterior`, valores de hoja) con las filas
+    `posiciones` de `nuevo` ya tipadas, sin volver a convertir la tabla entera. Solo se
+    sustituyen las columnas que cambian en esas filas. None si alguna fecha nueva no
+    cabe en su columna tipada: entonces hay que tipar `nuevo` desde cero.
+    """
+    columnas = {}
+    viejas, nuevas = anterior.iloc[posiciones], nuevo.iloc[posiciones]
+    for col in COLUMNS:
+        if viejas[col].equals(nuevas[col]):
+            continue
+        serie, valores = tipada[col], nuevas[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            valores = _texto_a_fechas(valores, COLUMNAS_FECHA[col])
+            if valores is None:
+                return None
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            faltan = pd.Index(valores.unique()).difference(serie.cat.categories)
+            serie = serie.cat.add_categories(faltan) if len(faltan) else serie.copy()
+        else:
+            serie = serie.copy()
+        serie.iloc[posiciones] = valores.to_numpy()
+        columnas[col] = serie
+    return tipada.assign(**columnas) if columnas else tipada.copy()
+
+
+def valor_tipado(columna: str, valor):
+    """
+    Convierte un valor escrito como en la hoja al tipo de `columna` en memoria: Timestamp
+    (NaT si está vacío) en las columnas de fecha; cualquier otro valor se devuelve tal cual.
+    Lanza ValueError si el texto no tiene el formato de fecha de la columna.
+    """
+    if columna not in COLUMNAS_FECHA or not isinstance(valor, str):
+        return valor
+    fechas = _texto_a_fechas(pd.Series([valor.strip()], dtype="str"), COLUMNAS_FECHA[columna])
+    if fechas is None:
+        raise ValueError(f"«{valor}» no es una fecha válida para «{columna}» ({COLUMNAS_FECHA[columna]})")
+    return fechas.iloc[0]
+
+
+def texto_en_hoja(columna: str, valor) -> str:
+    """Texto con que se escribe `valor` en la celda de `columna` (las fechas, con su formato)."""
+    if valor is None or (pd.api.types.is_scalar(valor) and pd.isna(valor)):
+        return ""
+    if columna in COLUMNAS_FECHA and hasattr(valor, "strftime"):
+        return valor.strftime(COLUMNAS_FECHA[columna])
+    return str(valor)
+
+
+def _http_autorizado() -> AuthorizedHttp:
+    # Timeout explícito: sin él, httplib2 espera indefinidamente a un servidor que no contesta.
+    return AuthorizedHttp(_load_credentials(), http=httplib2.Http(timeout=llamadas_api.TIMEOUT_SEGUNDOS))
+
+
+class _PoolTransportes:
+    """
+    Transportes HTTP autorizados que se prestan a un hilo mientras dura una llamada.
+    httplib2 no es seguro entre hilos, así que cada sesión de Streamlit y cada hilo de
+    carga usa el suyo; todos comparten las mismas credenciales. Cada transporte mantiene
+    abiertas sus conexiones (keep-alive), por eso se presta primero el último devuelto.
+    Con todos prestados y el pool lleno, el hilo espera a que se libere uno.
+    """
+
+    def __init__(self, tamano_maximo: int, fabrica):
+        self.tamano_maximo = max(1, tamano_maximo)
+        self._fabrica = fabrica
+        self._libres = []
+        self._creados = 0
+        self._condicion = threading.Condition()
+        self._hilo = threading.local()
+        self._stats = {"prestamos": 0, "esperas": 0, "segundos_espera": 0.0, "espera_maxima": 0.0}
+
+    @contextmanager
+    def prestar(self):
+        propio = getattr(self._hilo, "http", None)
+        if propio is not None:
+            # Llamada anidada en el mismo hilo: sigue con el transporte que ya tiene.
+            yield propio
+            return
+        http = self._tomar()
+        self._hilo.http = http
+        try:
+            yield http
+        finally:
+            self._hilo.http = None
+            with self._condicion:
+                self._libres.append(http)
+                self._condicion.notify()
+
+    def _tomar(self):
+        inicio = time.monotonic()
+        with self._condicion:
+            esperado = False
+            while not self._libres and self._creados >= self.tamano_maximo:
+                esperado = True
+                self._condicion.wait()
+            http = self._libres.pop() if self._libres else None
+            if http is None:
+                self._creados += 1
+            espera = time.monotonic() - inicio
+            self._stats["prestamos"] += 1
+            if esperado:
+                self._stats["esperas"] += 1
+                self._stats["segundos_espera"] += espera
+                self._stats["espera_maxima"] = max(self._stats["espera_maxima"], espera)
+        if http is not None:
+            return http
+        try:
+            return self._fabrica()
+        except Exception:
+            with self._condicion:
+                self._creados -= 1
+                self._condicion.notify()
+            raise
+
+    def metricas(self) -> dict:
+        with self._condicion:
+            return {
+                "tamano_maximo": self.tamano_maximo,
+                "creados": self._creados,
+                "en_uso": self._creados - len(self._libres),
+                "libres": len(self._libres),
+                "prestamos": self._stats["prestamos"],
+                "esperas": self._stats["esperas"],
+                "segundos_espera": round(self._stats["segundos_espera"], 3),
+                "espera_maxima": round(self._stats["espera_maxima"], 3),
+            }
+
+
+def _get_pool_http() -> _PoolTransportes | None:
+    # El simulador es seguro entre hilos y no usa transporte HTTP.
+    global _pool_http
+    if USAR_FAKE_GOOGLE:
+        return None
+    with _pools_lock:
+        if _pool_http is None:
+            _pool_http = _PoolTransportes(POOL_HTTP_TAMANO, _http_autorizado)
+        return _pool_http
+
+
+def _transporte_prestado():
+    """Contexto que presta un transporte del pool (None con el simulador)."""
+    pool = _get_pool_http()
+    return pool.prestar() if pool is not None else nullcontext(None)
+
+
+def _get_pool_carga() -> ThreadPoolExecutor:
+    # Pool persistente: los hilos conservan su transporte (y sus conexiones) entre cargas.
+    global _pool_carga
+    with _pools_lock:
+        if _pool_carga is None:
+            _pool_carga = ThreadPoolExecutor(max_workers=CARGA_CONCURRENCIA, thread_name_prefix="carga_socios")
+        return _pool_carga
+
+
+def _leer_bloque(spreadsheet_id: str, sheet_title: str, primera: int, ultima: int, http=None) -> list:
+    """Descarga las filas [primera, ultima] (numeración de la hoja) de las columnas A:Z."""
+    service = _get_sheets_service()
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f"{sheet_title}!A{primera}:Z{ultima}",
+    ).execute(http=http)
+    return result.get("values", [])
+
+
+def _leer_bloque_en_hilo(spreadsheet_id: str, sheet_title: str, primera: int, ultima: int) -> list:
+    filas = _leer_bloque(spreadsheet_id, sheet_title, primera, ultima)
+    # La API omite las filas vacías del final del rango; se rellenan para no desplazar
+    # las posiciones de los bloques siguientes.
+    return filas + [[]] * ((ultima - primera + 1) - len(filas))
+
+
+def _contar_filas_hoja(spreadsheet_id: str, sheet_title: str, http=None) -> int:
+    service = _get_sheets_service()
+    meta = service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        ranges=[sheet_title],
+        fields="sheets(properties(gridProperties(rowCount)))",
+    ).execute(http=http)
+    return meta["sheets"][0]["properties"]["gridProperties"]["rowCount"]
+
+
+def _normalizar_bloque(rows: list, header: list) -> pd.DataFrame:
+    # Normaliza el número de columnas por fila para evitar errores de longitud.
+    safe_rows = []
+    num_cols = len(header)
+    for r in rows:
+        if len(r) < num_cols:
+            r = r + [""] * (num_cols - len(r))
+        elif len(r) > num_cols:
+            r = r[:num_cols]
+        safe_rows.append(r)
+    return pd.DataFrame(safe_rows, columns=header)
+
+
+def _descargar_socios_sheets(http=None) -> tuple:
+    """
+    Descarga la hoja principal y la convierte al esquema fijo en memoria.
+    Nunca escribe: la migración de esquema y los vencimientos de pago son operaciones aparte.
+    Devuelve (DataFrame, cabecera_ok); cabecera_ok indica si la cabecera de la hoja ya es COLUMNS.
+
+    Se lee por bloques de CARGA_FILAS_POR_BLOQUE filas. Si el primer bloque no llega
+    lleno, basta con una petición; si no, el resto se pide en paralelo (como mucho
+    CARGA_CONCURRENCIA a la vez) y cada bloque se normaliza en cuanto llega.
+    """
+    spreadsheet_id = _get_spreadsheet_id()
+    sheet_title = _get_sheet_title(spreadsheet_id)
+    primer_bloque = _leer_bloque(spreadsheet_id, sheet_title, 1, CARGA_FILAS_POR_BLOQUE + 1, http=http)
+
+    if not primer_bloque:
+        return _empty_dataframe(), False
+
+    header = primer_bloque[0]
+    bloques = [_normalizar_bloque(primer_bloque[1:], header)]
+    del primer_bloque
+
+    if len(bloques[0]) >= CARGA_FILAS_POR_BLOQUE:
+        total_filas = _contar_filas_hoja(spreadsheet_id, sheet_title, http=http)
+        pool = _get_pool_carga()
+        futuros = [
+            # Con el contexto del llamante, para que las llamadas cuenten en su ejecución.
+            pool.submit(
+                contextvars.copy_context().run,
+                _leer_bloque_en_hilo,
+                spreadsheet_id,
+                sheet_title,
+                inicio,
+                inicio + CARGA_FILAS_POR_BLOQUE - 1,
+            )
+            for inicio in range(CARGA_FILAS_POR_BLOQUE + 2, total_filas + 1, CARGA_FILAS_POR_BLOQUE)
+        ]
+        for futuro in futuros:
+            bloques.append(_normalizar_bloque(futuro.result(), header))
+        df = pd.concat(bloques, ignore_index=True)
+        # Quitar el relleno de filas vacías posterior a la última fila con datos.
+        con_datos = (df != "").any(axis=1).to_numpy().nonzero()[0]
+        df = df.iloc[: (con_datos[-1] + 1) if len(con_datos) else 0]
+    else:
+        df = bloques[0]
+
+    return _ensure_columns(df), header == COLUMNS
+
+
+def _descargar_socios(http=None) -> tuple:
+    return _get_backend().descargar_socios(http=http)
+
+
+def _invalidar_cache() -> None:
+    """Marca la caché como obsoleta tras una escritura hecha desde este proceso."""
+    global _data_version
+    with _data_lock:
+        _data_version += 1
+    _olvidar_memo_ejecucion()
+
+
+class ContextoPeticion:
+    """
+    Estado de una ejecución del script de Streamlit (un rerun): memoiza las lecturas que se
+    repiten dentro de la ejecución y cuenta las llamadas a Google que hace, incluidas las de
+    los hilos de carga que trabajan para ella. Cualquier escritura vacía el memo.
+    """
+
+    def __init__(self):
+        self.memo = {}
+        self.llamadas = Counter()
+        self.lecturas_reutilizadas = 0
+        self.cerrado = False
+
+    @property
+    def total_llamadas(self) -> int:
+        return sum(self.llamadas.values())
+
+    def cerrar(self) -> None:
+        """Suma la ejecución a las métricas del proceso (una sola vez)."""
+        if self.cerrado:
+            return
+        self.cerrado = True
+        with _data_lock:
+            _ejecuciones_stats["ejecuciones"] += 1
+            _ejecuciones_stats["llamadas"] += self.total_llamadas
+            _ejecuciones_stats["llamadas_max"] = max(_ejecuciones_stats["llamadas_max"], self.total_llamadas)
+            _ejecuciones_stats["lecturas_reutilizadas"] += self.lecturas_reutilizadas
+
+
+def iniciar_contexto_peticion() -> ContextoPeticion:
+    """Abre el contexto de la ejecución en curso para el hilo que ejecuta el script."""
+    contexto = ContextoPeticion()
+    _contexto_peticion.set(contexto)
+    llamadas_api.fijar_contador_ejecucion(contexto.llamadas)
+    return contexto
+
+
+def _memo_ejecucion(clave: tuple, leer):
+    """Devuelve `leer()` memoizado en el contexto de la ejecución (sin contexto, lee siempre)."""
+    contexto = _contexto_peticion.get()
+    if contexto is None:
+        return leer()
+    if clave in contexto.memo:
+        contexto.lecturas_reutilizadas += 1
+        return contexto.memo[clave]
+    valor = leer()
+    contexto.memo[clave] = valor
+    return valor
+
+
+def _olvidar_memo_ejecucion() -> None:
+    contexto = _contexto_peticion.get()
+    if contexto is not None:
+        contexto.memo.clear()
+
+
+def _vencimientos_indexables(df: pd.DataFrame) -> pd.Series:
+    """Próximos pagos conocidos de los socios que no están de baja, ordenados por fecha."""
+    return df[COLUMNA_PROXIMO_PAGO][df["Estado"] != "Baja"].dropna().sort_values(kind="stable")
+
+
+def _construir_indice_vencimientos(df: pd.DataFrame):
+    """Ordena los próximos pagos indexables; devuelve (fechas ordenadas, etiquetas de fila)."""
+    vencimientos = _vencimientos_indexables(df)
+    return vencimientos.to_numpy(), vencimientos.index.to_numpy()
+
+
+def _actualizar_indice_vencimientos(indice: tuple, df: pd.DataFrame, cambiadas) -> tuple:
+    """
+    `indice` con solo las filas `cambiadas` (etiquetas de `df`) recolocadas: se quitan sus
+    entradas y las que sigan siendo indexables se insertan por búsqueda binaria, sin volver
+    a ordenar el resto.
+    """
+    fechas, etiquetas = indice
+    quedan = ~np.isin(etiquetas, cambiadas)
+    fechas, etiquetas = fechas[quedan], etiquetas[quedan]
+    nuevas = _vencimientos_indexables(df.loc[cambiadas])
+    posiciones = fechas.searchsorted(nuevas.to_numpy(), side="right")
+    return np.insert(fechas, posiciones, nuevas.to_numpy()), np.insert(etiquetas, posiciones, nuevas.index.to_numpy())
+
+
+def _filas_con_otro_vencimiento(anterior: pd.DataFrame, df: pd.DataFrame):
+    """Etiquetas de las filas cuyo estado o próximo pago difiere entre dos cachés con las mismas filas."""
+    antes, ahora = anterior[COLUMNA_PROXIMO_PAGO], df[COLUMNA_PROXIMO_PAGO]
+    otra_fecha = (antes != ahora) & ~(antes.isna() & ahora.isna())
+    # «Estado» es categórica y las categorías pueden no coincidir: se compara como texto.
+    otro_estado = anterior["Estado"].astype(object).to_numpy() != df["Estado"].astype(object).to_numpy()
+    return df.index[otra_fecha.to_numpy() | otro_estado].to_numpy()
+
+
+def _cache_vigente(version: int, cargado_en: float) -> bool:
+    return version == _data_version and time.monotonic() - cargado_en < CACHE_TTL_SEGUNDOS
+
+
+def _descarga_instalable(version: int) -> bool:
+    """
+    True si una descarga empezada en `version` puede pasar a ser la caché: nadie escribió
+    mientras tanto ni hay una escritura en el acto a medias. Llamar con _data_lock adquirido.
+    """
+    return version == _data_version and not _escritura_en_el_acto
+
+
+def _firma_drive(http=None) -> str | None:
+    """
+    Versión del spreadsheet según Drive: cambia con cualquier edición, propia o externa.
+    Es mucho más barata que descargar los valores.
+    """
+    service = _get_drive_service()
+    meta = service.files().get(
+        fileId=_get_spreadsheet_id(),
+        fields="version",
+        supportsAllDrives=True,
+    ).execute(http=http)
+    return meta.get("version")
+
+
+def _firma_hoja(http=None) -> str | None:
+    """Firma de los datos en el backend activo; None si no se puede consultar."""
+    try:
+        firma = _get_backend().firma(http=http)
+        _cache_stats["comprobaciones_cambio"] += 1
+        return firma
+    except Exception:
+        return None
+
+
+def _sin_cambios(version: int, firma_guardada: str | None, firma_actual: str | None) -> bool:
+    """True si una entrada caducada solo por tiempo sigue coincidiendo con la hoja."""
+    if version != _data_version or firma_actual is None or firma_actual != firma_guardada:
+        return False
+    _cache_stats["descargas_evitadas"] += 1
+    return True
+
+
+def _agrupar_contiguos(indices: list) -> list:
+    """Agrupa índices de columna ordenados en tramos contiguos [(inicio, fin), ...]."""
+    tramos = []
+    for idx in indices:
+        if tramos and idx == tramos[-1][1] + 1:
+            tramos[-1] = (tramos[-1][0], idx)
+        else:
+            tramos.append((idx, idx))
+    return tramos
+
+
+def _columnas_proyeccion(columnas) -> list:
+    """Valida la lista de columnas pedida y añade siempre el DNI, que identifica cada fila."""
+    desconocidas = [c for c in columnas if c not in COLUMNS]
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {', '.join(desconocidas)}")
+    resultado = list(dict.fromkeys(columnas))
+    if "DNI" not in resultado:
+        resultado.insert(0, "DNI")
+    return resultado
+
+
+def _leer_columnas(columnas: list) -> pd.DataFrame:
+    """
+    Descarga solo las columnas indicadas con un único values().batchGet.
+    Lanza ValueError si la cabecera de la hoja no coincide con el esquema fijo.
+    """
+    spreadsheet_id = _get_spreadsheet_id()
+    sheet_title = _get_sheet_title(spreadsheet_id)
+    service = _get_sheets_service()
+    tramos = _agrupar_contiguos(sorted(COLUMNS.index(c) for c in columnas))
+    result = service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=[f"{sheet_title}!{_column_letter(a)}:{_column_letter(b)}" for a, b in tramos],
+        majorDimension="COLUMNS",
+    ).execute()
+
+    datos = {}
+    for (inicio, fin), rango in zip(tramos, result.get("valueRanges", [])):
+        valores = rango.get("values", [])
+        for desplazamiento, idx in enumerate(range(inicio, fin + 1)):
+            columna = valores[desplazamiento] if desplazamiento < len(valores) else []
+            if not columna or columna[0] != COLUMNS[idx]:
+                raise ValueError(f"La cabecera de la columna {_column_letter(idx)} no es «{COLUMNS[idx]}»")
+            datos[COLUMNS[idx]] = columna[1:]
+
+    filas = max((len(v) for v in datos.values()), default=0)
+    return pd.DataFrame({c: datos[c] + [""] * (filas - len(datos[c])) for c in columnas})
+
+
+def _guardar_snapshot_disco(df: pd.DataFrame, firma: str | None, descargado_en: float) -> None:
+    """
+    Escribe la foto de la hoja en SNAPSHOT_PATH de forma atómica (fichero temporal + os.replace),
+    para que otros procesos del servidor nunca lean un fichero a medio escribir.
+    """
+    global _snapshot_disco_mtime
+    tmp = None
+    try:
+        datos = {"df": _to_sheet_values(df), "firma": firma, "descargado_en": descargado_en}
+        fd, tmp = tempfile.mkstemp(dir=SNAPSHOT_PATH.parent, prefix=".socios_snapshot_", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, SNAPSHOT_PATH)
+        _snapshot_disco_mtime = SNAPSHOT_PATH.stat().st_mtime
+    except Exception as e:
+        print(f"[WARN] No se pudo guardar la foto local de socios: {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _persistir_snapshot_tras_escritura() -> None:
+    """Tras escribir en la hoja, la foto en memoria (_snapshot_df) refleja su contenido: se comparte en disco."""
+    if _snapshot_df is not None:
+        _guardar_snapshot_disco(_snapshot_df, None, time.time())
+
+
+def _publicar_escritura() -> pd.DataFrame | None:
+    """
+    Tras una escritura confirmada, la caché de proceso pasa a ser la foto de lo escrito
+    (_snapshot_df) sin volver a leer la hoja: las demás sesiones del proceso la ven al
+    instante y las otras instancias, por la foto en disco. Llamar con _data_lock adquirido.
+    """
+    _invalidar_cache()
+    if _snapshot_df is None:
+        return None
+    _instalar_cache(_snapshot_df.copy(), _data_version, None, time.time())
+    return _cache_df
+
+
+def _instalar_cache(
+    df: pd.DataFrame,
+    version: int,
+    firma: str | None,
+    descargado_en: float,
+    cabecera_ok: bool = True,
+    foto_hoja: bool = True,
+    vencimientos: pd.Series | None = None,
+    recargada: bool = False,
+    cambiadas=None,
+) -> None:
+    """
+    Sustituye la caché de proceso y los índices derivados. Llamar con _data_lock adquirido.
+    Con `foto_hoja`, `df` es el contenido de la hoja: pasa a ser la foto base de las
+    diferencias (en texto) y se le superponen las escrituras diferidas aún pendientes.
+    La caché guarda la representación tipada (_tipar).
+    `vencimientos` evita recalcular «Próximo pago» si quien llama ya lo tiene.
+    `recargada` indica que `df` es la hoja leída entera (ver _set_snapshot).
+    `cambiadas` son las únicas filas (posiciones) en que `df` difiere de la caché actual:
+    con ellas el índice de vencimientos se actualiza en lugar de reconstruirse. Si no se
+    indican y las filas son las mismas (al publicar una escritura), se deducen comparando
+    estado y próximo pago con la caché anterior; solo una relectura entera o un cambio de
+    filas reconstruyen el índice.
+    """
+    global _cache_df, _cache_version, _cache_cargado_en, _cache_firma, _cache_descargado_en, _indice_vencimientos
+    global _pendiente_df
+    if foto_hoja:
+        # La foto base para escribir diferencias solo es válida si la cabecera de la hoja ya es COLUMNS.
+        _set_snapshot(df if cabecera_ok else None, recargada)
+        if (_filas_en_vuelo or _pendiente_filas) and _snapshot_df is not None:
+            # Primero el lote en curso y encima lo confirmado después, en ese orden.
+            _pendiente_df = _aplicar_filas(_aplicar_filas(_snapshot_df, _filas_en_vuelo), _pendiente_filas)
+            df = _pendiente_df.copy()
+            vencimientos, cambiadas = None, None
+    anterior = _cache_df
+    _recordar_versiones(anterior, df)
+    df = _tipar(df)
+    df[COLUMNA_PROXIMO_PAGO] = _calcular_vencimientos(df) if vencimientos is None else vencimientos
+    _cache_df = df
+    _cache_version = version
+    _cache_cargado_en = time.monotonic() - max(0.0, time.time() - descargado_en)
+    _cache_firma = firma
+    _cache_descargado_en = descargado_en
+    if cambiadas is None and not recargada and anterior is not None and anterior.index.equals(df.index):
+        cambiadas = _filas_con_otro_vencimiento(anterior, df)
+    if cambiadas is not None and _indice_vencimientos is not None:
+        _indice_vencimientos = _actualizar_indice_vencimientos(_indice_vencimientos, df, cambiadas)
+    else:
+        _indice_vencimientos = _construir_indice_vencimientos(df)
+
+
+def _cache_es(tabla: pd.DataFrame | None) -> bool:
+    """
+    True si la caché es `tabla` (valores de hoja) tipada: mismas filas con las mismas
+    versiones. Llamar con _data_lock adquirido.
+    """
+    return (
+        _cache_df is not None
+        and tabla is not None
+        and len(_cache_df) == len(tabla)
+        and _cache_df[COLUMNA_VERSION].reset_index(drop=True).equals(tabla[COLUMNA_VERSION].reset_index(drop=True))
+    )
+
+
+def _adoptar_snapshot_disco() -> bool:
+    """
+    Carga la foto en disco si es más reciente que los datos en memoria (por ejemplo,
+    porque otro proceso acaba de leer o escribir la hoja). Llamar con _data_lock adquirido.
+    """
+    global _snapshot_disco_mtime
+    try:
+        modificado = SNAPSHOT_PATH.stat().st_mtime
+    except OSError:
+        return False
+    if modificado == _snapshot_disco_mtime:
+        # Es el fichero que ya escribimos o leímos: no hay nada nuevo.
+        return False
+    try:
+        with open(SNAPSHOT_PATH, "rb") as f:
+            datos = pickle.load(f)
+    except Exception:
+        return False
+    _snapshot_disco_mtime = modificado
+    if _cache_descargado_en is not None and datos["descargado_en"] <= _cache_descargado_en:
+        return False
+    _instalar_cache(datos["df"], _data_version, datos["firma"], datos["descargado_en"], recargada=True)
+    _cache_stats["servidas_desde_disco"] += 1
+    return True
+
+
+def _revalidar_en_segundo_plano() -> None:
+    """Comprueba la hoja sin bloquear a los lectores y, si cambió, sustituye la caché."""
+    global _refresco_en_curso, _cache_cargado_en
+    try:
+        with _data_lock:
+            version = _data_version
+            firma_guardada = _cache_firma
+        firma = _firma_hoja()
+        if firma is not None and firma == firma_guardada:
+            with _data_lock:
+                if _cache_version == version == _data_version:
+                    _cache_cargado_en = time.monotonic()
+                    _cache_stats["descargas_evitadas"] += 1
+            return
+        df, cabecera_ok = _descargar_socios()
+        descargado_en = time.time()
+        with _data_lock:
+            # Si alguien escribió durante la descarga, el resultado ya no sirve.
+            if not _descarga_instalable(version):
+                return
+            _instalar_cache(df, version, firma, descargado_en, cabecera_ok, recargada=True)
+            _cache_stats["revalidaciones"] += 1
+        _guardar_snapshot_disco(df, firma, descargado_en)
+    except Exception as e:
+        print(f"[WARN] No se pudo revalidar la caché de socios: {e}")
+    finally:
+        _refresco_en_curso = False
+
+
+def _lanzar_revalidacion() -> None:
+    global _refresco_en_curso
+    if _refresco_en_curso:
+        return
+    _refresco_en_curso = True
+    threading.Thread(target=_revalidar_en_segundo_plano, name="revalidar_socios", daemon=True).start()
+
+
+def _cache_servible() -> pd.DataFrame | None:
+    """
+    La caché de proceso si se puede servir sin descargar la hoja; None si no.
+    Llamar con _data_lock adquirido.
+
+    - Vigente: se sirve tal cual.
+    - Caducada solo por tiempo (o vacía con foto en disco): se sirve lo que hay y se
+      revalida contra Sheets en segundo plano (stale-while-revalidate).
+    - Tras una escritura de este proceso, o sin nada que servir: hay que descargar.
+    """
+    if _cache_df is not None and _cache_vigente(_cache_version, _cache_cargado_en):
+        _cache_stats["hits"] += 1
+        return _cache_df
+
+    if _cache_df is None or _cache_version == _data_version:
+        _adoptar_snapshot_disco()
+        if _cache_df is not None and _cache_vigente(_cache_version, _cache_cargado_en):
+            _cache_stats["hits"] += 1
+            return _cache_df
+        if _cache_df is not None and _cache_version == _data_version:
+            _cache_stats["servidas_obsoletas"] += 1
+            _lanzar_revalidacion()
+            return _cache_df
+    return None
+
+
+def _socios_en_cache() -> pd.DataFrame | None:
+    """
+    Devuelve el DataFrame de la caché de proceso (sin copiar; las tablas publicadas no se
+    modifican). Si no se puede servir (ver _cache_servible), lo descarga. Si la hoja no
+    responde, se sirve la foto en disco; None si tampoco la hay.
+
+    Las llamadas a la hoja se hacen sin _data_lock: las demás sesiones siguen leyendo y
+    escribiendo. Solo una descarga a la vez; las demás esperan y se sirven de ella. Si
+    alguien escribe durante la descarga, el resultado se descarta: la escritura publica
+    su propia caché, o se vuelve a descargar. Quien llame con _data_lock ya adquirido (las
+    tareas de mantenimiento) lo conserva durante la descarga.
+    """
+    global _descarga_en_curso
+    for _ in range(REINTENTOS_CONFLICTO + 1):
+        with _data_lock:
+            while True:
+                servida = _cache_servible()
+                if servida is not None:
+                    return servida
+                if not _descarga_en_curso:
+                    break
+                _descarga_cond.wait()
+            _descarga_en_curso = True
+            version = _data_version
+            _cache_stats["misses"] += 1
+
+        df = None
+        try:
+            # La firma se pide antes de descargar: si la hoja cambia durante la descarga,
+            # la próxima comprobación verá una firma distinta y volverá a leer.
+            firma = _firma_hoja()
+            df, cabecera_ok = _descargar_socios()
+            descargado_en = time.time()
+        except Exception:
+            # La hoja no responde: abajo se recurre a la foto en disco.
+            pass
+        finally:
+            with _data_lock:
+                _descarga_en_curso = False
+                _descarga_cond.notify_all()
+                if df is None:
+                    _adoptar_snapshot_disco()
+                    servida = _cache_df
+                elif _descarga_instalable(version):
+                    _instalar_cache(df, version, firma, descargado_en, cabecera_ok, recargada=True)
+                    servida = _cache_df
+        if df is None:
+            return servida
+        if servida is not None:
+            _guardar_snapshot_disco(df, firma, descargado_en)
+            return servida
+    with _data_lock:
+        return _cache_df
+
+
+def antiguedad_datos() -> float | None:
+    """Segundos desde que los datos en memoria se leyeron de Google Sheets (None si aún no hay)."""
+    with _data_lock:
+        if _cache_descargado_en is None:
+            return None
+        return max(0.0, time.time() - _cache_descargado_en)
+
+
+def cargar_datos(columns: list | None = None) -> pd.DataFrame:
+    """
+    Obtiene todos los registros del Sheet garantizando el esquema fijo.
+    Sirve una copia de la caché de proceso mientras siga vigente; solo una
+    sesión a la vez descarga la hoja cuando hay que refrescarla.
+    Incluye la columna calculada «Próximo pago», que no se guarda en la hoja.
+
+    Las columnas van tipadas (ver _tipar): COLUMNAS_CATEGORICAS son «category» y
+    COLUMNAS_FECHA y «Próximo pago», datetime64 (NaT si la celda está vacía; una columna
+    con alguna fecha fuera de formato se queda como texto); las demás, texto. Asignar con
+    .loc un valor que no está entre las categorías lanza TypeError: para modificar socios
+    se usa obtener_socio_store(), que acepta los valores tal como se escriben en la hoja.
+    texto_en_hoja() da el texto de cualquier celda.
+
+    Con `columns` devuelve solo esas columnas (más el DNI) y, si la caché completa
+    no está vigente, descarga únicamente esos rangos. El resultado es de solo lectura:
+    no debe pasarse a guardar_datos.
+
+    Dentro de una ejecución con contexto (iniciar_contexto_peticion), las lecturas
+    repetidas se sirven del memo de la ejecución sin volver a consultar la caché ni Sheets.
+    """
+    clave = ("cargar_datos", tuple(columns) if columns is not None else None)
+    return _memo_ejecucion(clave, lambda: _cargar_datos(columns)).copy()
+
+
+def _cargar_datos(columns: list | None) -> pd.DataFrame:
+    # Las llamadas a la hoja (firma y descarga) se hacen sin _data_lock.
+    if columns is None:
+        df = _socios_en_cache()
+        return _empty_dataframe() if df is None else df.copy()
+
+    columnas = _columnas_proyeccion(columns)
+    clave = tuple(columnas)
+    with _data_lock:
+        if _cache_df is None:
+            _adoptar_snapshot_disco()
+        # Caché completa vigente, o caducada por tiempo (se sirve y se revalida en segundo plano).
+        completa = _cache_df is not None and _cache_version == _data_version
+        entrada = _cache_proyecciones.get(clave)
+        if not completa and entrada is not None and _cache_vigente(entrada[0], entrada[1]):
+            _cache_stats["hits"] += 1
+            return entrada[3].copy()
+        version = _data_version
+
+    if not completa:
+        firma = _firma_hoja()
+        with _data_lock:
+            if entrada is not None and _sin_cambios(entrada[0], entrada[2], firma):
+                _cache_proyecciones[clave] = (entrada[0], time.monotonic(), firma, entrada[3])
+                return entrada[3].copy()
+        try:
+            df = _tipar(_get_backend().descargar_columnas(columnas))
+        except Exception:
+            # Cabecera inesperada o la hoja no responde: se recurre a la lectura completa,
+            # que normaliza columnas y, sin conexión, sirve la foto en disco.
+            df = None
+        if df is not None:
+            with _data_lock:
+                _cache_stats["misses"] += 1
+                _cache_stats["lecturas_parciales"] += 1
+                # Si alguien escribió durante la descarga, se sirve pero no se guarda.
+                if version == _data_version:
+                    _cache_proyecciones[clave] = (version, time.monotonic(), firma, df)
+            return df.copy()
+
+    df = _socios_en_cache()
+    if df is None:
+        return _empty_dataframe()[columnas]
+    return df[columnas].copy()
+
+
+def obtener_socio_store():
+    """
+    Devuelve un SocioStore sobre una copia de todos los socios, como cargar_datos().
+    Los índices por DNI y estado se construyen una vez por contenido de la caché de proceso
+    y se comparten entre sesiones: cada llamada solo copia la tabla.
+    """
+    from core.socio_store import SocioStore
+
+    global _socio_store
+    df = _socios_en_cache()
+    if df is None:
+        return SocioStore(_empty_dataframe())
+    with _data_lock:
+        if _socio_store is None or _socio_store.df is not df:
+            _socio_store = SocioStore(df)
+        return _socio_store.copia()
+
+
+def socios_por_vencer(dias: int = 7) -> pd.DataFrame:
+    """
+    Socios cuyo próximo pago vence entre ahora y dentro de `dias` días, ordenados por fecha.
+    Usa el índice ordenado de vencimientos: búsqueda binaria más las k filas del rango.
+    """
+    return _memo_ejecucion(("socios_por_vencer", dias), lambda: _socios_por_vencer(dias)).copy()
+
+
+def _socios_por_vencer(dias: int) -> pd.DataFrame:
+    if _socios_en_cache() is None:
+        return _empty_dataframe()
+    with _data_lock:
+        # La caché y su índice se instalan juntos: se toman a la vez.
+        df, indice = _cache_df, _indice_vencimientos
+    if indice is None:
+        return _empty_dataframe()
+    fechas, etiquetas = indice
+    desde = pd.Timestamp.now()
+    hasta = desde + pd.Timedelta(days=dias)
+    inicio = fechas.searchsorted(desde.to_datetime64(), side="left")
+    fin = fechas.searchsorted(hasta.to_datetime64(), side="right")
+    return df.loc[etiquetas[inicio:fin]].copy()
+
+
+def actualizar_estados_pago(forzar: bool = False) -> int:
+    """
+    Aplica las reglas de vencimiento y guarda solo las filas cuyo estado de pago cambió.
+    Sin `forzar`, se ejecuta como mucho una vez cada REVISION_PAGOS_SEGUNDOS por proceso.
+    Devuelve el número de socios actualizados.
+    """
+    global _ultima_revision_pagos
+    with _data_lock:
+        ahora = time.monotonic()
+        if (
+            not forzar
+            and _ultima_revision_pagos is not None
+            and ahora - _ultima_revision_pagos < REVISION_PAGOS_SEGUNDOS
+        ):
+            return 0
+        _ultima_revision_pagos = ahora
+
+    # Sin el candado: guardar_datos rebasa sobre lo que otras sesiones guarden entretanto.
+    df = cargar_datos()
+    if df.empty:
+        return 0
+    df, cambios = _aplicar_reglas_pago(df)
+    if not cambios.any():
+        return 0
+    guardar_datos(df)
+    return int(cambios.sum())
+
+
+def _bucle_revision_pagos() -> None:
+    """Revisa los vencimientos al arrancar y después cada REVISION_PAGOS_SEGUNDOS, fuera de las ejecuciones de la página."""
+    while True:
+        try:
+            actualizados = actualizar_estados_pago()
+            if actualizados:
+                print(f"[INFO] Estado de pago actualizado en {actualizados} socio(s).")
+        except Exception as e:
+            print(f"[WARN] No se pudieron revisar los vencimientos de pago: {e}")
+        time.sleep(REVISION_PAGOS_SEGUNDOS)
+
+
+def _iniciar_revisor_pagos() -> None:
+    global _revisor_pagos
+    if _revisor_pagos is None:
+        _revisor_pagos = threading.Thread(target=_bucle_revision_pagos, name="revision_pagos", daemon=True)
+        _revisor_pagos.start()
+
+
+def obtener_metricas() -> dict:
+    """Contadores de acceso a datos para el panel de administración."""
+    with _data_lock:
+        edad = time.monotonic() - _cache_cargado_en if _cache_df is not None else None
+        return {
+            "cache": {
+                "hits": _cache_stats["hits"],
+                "misses": _cache_stats["misses"],
+                "lecturas_parciales": _cache_stats["lecturas_parciales"],
+                "comprobaciones_cambio": _cache_stats["comprobaciones_cambio"],
+                "descargas_evitadas": _cache_stats["descargas_evitadas"],
+                "servidas_obsoletas": _cache_stats["servidas_obsoletas"],
+                "servidas_desde_disco": _cache_stats["servidas_desde_disco"],
+                "revalidaciones": _cache_stats["revalidaciones"],
+                "lecturas_ahorradas": _cache_stats["hits"] + _cache_stats["descargas_evitadas"],
+                "version_datos": _data_version,
+                "edad_segundos": round(edad, 1) if edad is not None else None,
+                "ttl_segundos": CACHE_TTL_SEGUNDOS,
+                "memoria_mb": (
+                    round(_cache_df.memory_usage(deep=True).sum() / 2**20, 2) if _cache_df is not None else None
+                ),
+            },
+            "api": llamadas_api.obtener_estadisticas(),
+            "ejecuciones": {
+                **_ejecuciones_stats,
+                "llamadas_media": (
+                    round(_ejecuciones_stats["llamadas"] / _ejecuciones_stats["ejecuciones"], 2)
+                    if _ejecuciones_stats["ejecuciones"]
+                    else None
+                ),
+            },
+            "escritura_diferida": {
+                "ventana_ms": ESCRITURA_DIFERIDA_MS,
+                "operaciones_pendientes": _pendiente_ops,
+                "filas_pendientes": len(_pendiente_filas),
+                "operaciones": _escritura_stats["operaciones"],
+                "lotes": _escritura_stats["lotes"],
+                "operaciones_por_lote": (
+                    round(_escritura_stats["operaciones"] / _escritura_stats["lotes"], 2) if _escritura_stats["lotes"] else None
+                ),
+                "operaciones_lote_max": _escritura_stats["ops_lote_max"],
+                "filas_escritas": _escritura_stats["filas_escritas"],
+                # Desde la primera operación confirmada del lote hasta que queda escrito en la hoja.
+                "latencia_media_ms": (
+                    round(_escritura_stats["ms_confirmacion_total"] / _escritura_stats["lotes"], 1)
+                    if _escritura_stats["lotes"]
+                    else None
+                ),
+                "latencia_max_ms": round(_escritura_stats["ms_confirmacion_max"], 1),
+                "escritura_media_ms": (
+                    round(_escritura_stats["ms_escritura_total"] / _escritura_stats["lotes"], 1)
+                    if _escritura_stats["lotes"]
+                    else None
+                ),
+                "a_cola_offline": _escritura_stats["a_cola_offline"],
+                "recuperadas_del_diario": _escritura_stats["recuperadas_del_diario"],
+            },
+            "versiones": {**_versiones_stats, "historial_filas": len(_historial_filas)},
+            "pool_http": _get_pool_http().metricas() if not USAR_FAKE_GOOGLE else None,
+            "token": {
+                **_token_stats,
+                "expira_en_segundos": (
+                    round((_credentials.expiry - datetime.now(pytz.utc).replace(tzinfo=None)).total_seconds())
+                    if _credentials is not None and _credentials.expiry
+                    else None
+                ),
+            },
+        }
+
+
+def guardar_datos(df_nuevos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Guarda el DataFrame proporcionado en la hoja.
+    Solo se envían las celdas modificadas; si cambió el orden o el número de filas
+    existentes se reescribe la hoja completa.
+
+    La escritura es condicional por fila (columna «Versión»): las filas que la sesión leyó
+    en una versión anterior se rebasan sobre la última en lugar de pisarla, y las que no
+    tocó se quedan como están (ver _rebasar_sesion). Dos sesiones que cambian socios
+    distintos nunca chocan.
+
+    Si solo cambian celdas de filas existentes, la escritura es diferida: se confirma en
+    cuanto las filas cambiadas quedan en el diario local y el hilo escritor las envía
+    agrupadas con las demás operaciones de la ventana (ver _diferir_escritura).
+
+    Devuelve la tabla tal y como queda (con «Próximo pago»), que pasa a ser la caché
+    de todas las sesiones: no hace falta volver a leerla. Si la escritura queda en la
+    cola offline, devuelve `df_nuevos`.
+    """
+    if df_nuevos is None:
+        df_nuevos = _empty_dataframe()
+
+    with _data_lock:
+        ultima = _pendiente_df if _pendiente_df is not None else _snapshot_df
+        referencia = (_cache_df, ultima) if _cache_es(ultima) else None
+        sesion = _to_sheet_values(df_nuevos, referencia).reset_index(drop=True)
+        objetivo = sesion if ultima is None else _rebasar_sesion(sesion, ultima)
+        publicada = _diferir_escritura(objetivo)
+        if publicada is not None:
+            return publicada.copy()
+
+    # Escritura en el acto: primero lo pendiente, que se confirmó antes. La llamada a la
+    # hoja se hace sin el candado, en el turno de escritura (ver _tomar_turno_escritura).
+    _vaciar_escrituras_pendientes()
+    with _data_lock:
+        _tomar_turno_escritura()
+        base = _snapshot_df
+        if base is not None:
+            objetivo = _rebasar_sesion(sesion, base)
+    error = None
+    try:
+        escrito = _escribir_lote(base, objetivo)
+    except Exception as e:
+        error = e
+
+    with _data_lock:
+        try:
+            if error is not None:
+                _encolar_escritura(base, objetivo, error)
+                print(f"[WARN] Guardar datos en cola offline: {error}")
+                _invalidar_cache()
+                return df_nuevos
+            _set_snapshot(escrito)
+            _persistir_snapshot_tras_escritura()
+            if not _load_queue():
+                _clear_offline_flag()
+            return _publicar_escritura().copy()
+        finally:
+            _ceder_turno_escritura()
+
+
+# --- Escritura diferida (write-behind) ---
+def _aplicar_filas(tabla: pd.DataFrame, filas: dict) -> pd.DataFrame:
+    """
+    Copia de `tabla` con las filas pendientes {posición: (valores, base)} aplicadas. `base` es
+    la fila sobre la que se hicieron los cambios: si la tabla ya no la tiene (otra instancia
+    la modificó), los cambios se rebasan sobre la fila actual (_fusionar_fila). Si en esa
+    posición ya no está el mismo DNI, la fila se busca por DNI; si el socio ya no existe,
+    se descarta.
+    """
+    dnis = tabla["DNI"].tolist()
+    i_dni = COLUMNS.index("DNI")
+    aplicadas, por_dni = {}, None
+    for pos, (fila, base) in filas.items():
+        if pos >= len(dnis) or dnis[pos] != fila[i_dni]:
+            if por_dni is None:
+                por_dni = {dni: i for i, dni in enumerate(dnis)}
+            pos = por_dni.get(fila[i_dni])
+            if pos is None:
+                continue
+        if base is not None:
+            actual = tabla.iloc[pos].tolist()
+            if actual != base:
+                fila = _fusionar_fila(fila, base, actual)
+                if fila is None:
+                    continue
+        aplicadas[pos] = fila
+    return _sustituir_filas(tabla, aplicadas)
+
+
+def _cambios_de_filas(base: pd.DataFrame, objetivo: pd.DataFrame) -> list | None:
     """
-    Limpia el nombre de columna y devuelve la forma canónica esperada.
-    Actualmente se enfoca en asegurar el uso único de «Plan contratado».
+    Filas de `objetivo` que difieren de `base` (valores de hoja), como cambios para la cola
+    offline: {"pos", "DNI", "version" (la de `base`), "campos" (solo las celdas cambiadas)}.
+    None si cambió el número u orden de filas y no hay correspondencia por posición.
     """
-    if not nombre:
-        return nombre
-    limpio = " ".join(nombre.strip().replace("_", " ").split())
-    clave = limpio.lower()
-    return COLUMN_SYNONYMS.get(clave, limpio)
+    if len(base) != len(objetivo) or not base["DNI"].equals(objetivo["DNI"]):
+        return None
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    i_dni = COLUMNS.index("DNI")
+    anteriores = base[COLUMNS].values
+    nuevos = objetivo[COLUMNS].values
+    cambios = []
+    for pos in _filas_distintas(objetivo, base):
+        pos = int(pos)
+        campos = {
+            columna: nuevos[pos, i]
+            for i, columna in enumerate(COLUMNS)
+            if i != iv and nuevos[pos, i] != anteriores[pos, i]
+        }
+        cambios.append({"pos": pos, "DNI": anteriores[pos, i_dni], "version": anteriores[pos, iv], "campos": campos})
+    return cambios
 
 
-def _normalize_dataframe_columns(df: pd.DataFrame) -> pd.DataFrame:
+def _aplicar_cambios_encolados(tabla: pd.DataFrame, cambios: list) -> pd.DataFrame:
     """
-    Renombra columnas con alias conocidos al esquema oficial y consolida duplicadas.
-    Evita que coexistan columnas como «Plan» y «Plan contratado».
+    Copia de `tabla` (valores de hoja) con los cambios de la cola offline aplicados (ver
+    _cambios_de_filas). La fila se busca en su posición si conserva el DNI y, si no, por DNI;
+    si el socio ya no existe, el cambio se descarta. Si la fila sigue en la versión sobre la
+    que se hizo el cambio, los campos se aplican sin más; si otra instancia la cambió después,
+    solo se aplican los campos cambiados y el resto conserva lo que escribió la otra instancia.
+    La fila pasa a la versión siguiente a la actual.
     """
-    if df is None:
-        return df
+    dnis = tabla["DNI"].tolist()
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    aplicadas, por_dni = {}, None
+    for cambio in cambios:
+        pos = int(cambio["pos"])
+        if pos >= len(dnis) or dnis[pos] != cambio["DNI"]:
+            if por_dni is None:
+                por_dni = {dni: i for i, dni in enumerate(dnis)}
+            pos = por_dni.get(cambio["DNI"])
+            if pos is None:
+                continue
+        actual = tabla.iloc[pos].tolist()
+        if _version(actual[iv]) != _version(cambio["version"]):
+            _versiones_stats["rebasadas"] += 1
+        fila = list(aplicadas.get(pos, actual))
+        for columna, valor in cambio["campos"].items():
+            if columna in COLUMNS:
+                fila[COLUMNS.index(columna)] = valor
+        fila[iv] = actual[iv]
+        if fila != actual:
+            fila[iv] = str(_version(actual[iv]) + 1)
+            aplicadas[pos] = fila
+    return _sustituir_filas(tabla, aplicadas)
+
+
+def _encolar_escritura(base: pd.DataFrame | None, objetivo: pd.DataFrame, error: Exception) -> None:
+    """
+    Pasa a la cola offline una escritura fallida de `objetivo` sobre `base`: solo las filas
+    cambiadas, que al sincronizar se aplican con la misma comprobación de DNI y versión. Si
+    cambió el número u orden de filas, se encola la tabla entera.
+    """
+    cambios = None if base is None else _cambios_de_filas(base, objetivo)
+    if cambios is None:
+        _enqueue_operation("guardar_datos", {"data": objetivo.to_dict("records"), "error": str(error)})
+    elif cambios:
+        _enqueue_operation("guardar_filas", {"filas": cambios, "error": str(error)})
 
-    df = df.copy()
-    columnas_originales = list(df.columns)
-    for col in columnas_originales:
-        canonica = _canonical_column_name(col)
-        if canonica == col:
-            continue
-        if canonica in df.columns:
-            destino = df[canonica]
-            mask = destino.isna() | (destino.astype(str).str.strip() == "")
-            df.loc[mask, canonica] = df.loc[mask, col]
-            df.drop(columns=[col], inplace=True)
-        else:
-            df.rename(columns={col: canonica}, inplace=True)
-    return df
 
+def _anotar_en_diario(filas: dict) -> None:
+    """Añade las filas {posición: (valores, base)} al diario local y espera a que lleguen al disco (fsync)."""
+    with open(DIARIO_PATH, "a", encoding="utf-8") as f:
+        for pos, (fila, base) in filas.items():
+            f.write(json.dumps({"pos": pos, "fila": fila, "base": base}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
 
-def _ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Garantiza la presencia y el orden del esquema fijo."""
-    if df is None:
-        df = _empty_dataframe()
-    df = _normalize_dataframe_columns(df)
-    df = df.copy()
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = ""
-    return df[COLUMNS]
 
+def _leer_diario() -> tuple:
+    """
+    Filas anotadas en el diario ({posición: (valores, base)}: gana la última anotación y se
+    conserva la primera base) y número de operaciones.
+    """
+    filas, lineas = {}, 0
+    try:
+        with open(DIARIO_PATH, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Una línea a medio escribir (caída durante la anotación) no llegó a confirmarse.
+                    continue
+                pos = int(entrada["pos"])
+                base = filas[pos][1] if pos in filas else entrada.get("base")
+                filas[pos] = (entrada["fila"], base)
+                lineas += 1
+    except FileNotFoundError:
+        pass
+    return filas, lineas
 
-def _flush_dataframe(df: pd.DataFrame) -> None:
-    df = _ensure_columns(df)
-    data_rows = df.fillna("").astype(str).values.tolist() if not df.empty else []
-    spreadsheet_id = _get_spreadsheet_id()
-    sheet_title = _get_sheet_title(spreadsheet_id)
-    service = _get_sheets_service()
 
-    # Limpiar rango actual (encabezados + datos)
-    service.spreadsheets().values().clear(
-        spreadsheetId=spreadsheet_id,
-        range=f"{sheet_title}!A:Z",
-    ).execute()
+def _diferir_escritura(objetivo: pd.DataFrame) -> pd.DataFrame | None:
+    """
+    Si `objetivo` (valores de hoja) solo cambia celdas de filas existentes respecto a lo
+    confirmado, anota las filas cambiadas en el diario, las publica en la caché y deja la
+    escritura al hilo escritor. Devuelve la caché publicada, o None si hay que escribir en
+    el acto (altas, bajas, reordenaciones o escritura diferida desactivada).
+    Llamar con _data_lock adquirido.
+    """
+    global _pendiente_df, _pendiente_ops, _pendiente_desde
+    base = _pendiente_df if _pendiente_df is not None else _snapshot_df
+    if (
+        ESCRITURA_DIFERIDA_MS <= 0
+        or base is None
+        or len(base) != len(objetivo)
+        or not base["DNI"].equals(objetivo["DNI"])
+    ):
+        return None
+    # Tras _rebasar_sesion toda fila con contenido nuevo lleva versión nueva: basta comparar esa columna.
+    cambiadas = (base[COLUMNA_VERSION] != objetivo[COLUMNA_VERSION]).to_numpy().nonzero()[0]
+    if len(cambiadas) == 0 and _cache_df is not None:
+        return _cache_df
+    # Cada fila pendiente guarda la versión confirmada sobre la que se cambió.
+    filas = {
+        int(pos): (
+            objetivo.iloc[pos].tolist(),
+            _pendiente_filas[int(pos)][1] if int(pos) in _pendiente_filas else base.iloc[pos].tolist(),
+        )
+        for pos in cambiadas
+    }
+    if filas:
+        try:
+            _anotar_en_diario(filas)
+        except OSError as e:
+            print(f"[WARN] No se pudo anotar en el diario de escrituras; se escribe en el acto: {e}")
+            return None
+        if not _pendiente_filas:
+            _pendiente_desde = time.monotonic()
+        _pendiente_filas.update(filas)
+        _pendiente_df = objetivo
+        _pendiente_ops += 1
+        _escritura_stats["operaciones"] += 1
+        _iniciar_escritor()
+        _escritura_cond.notify_all()
+    tabla, vencimientos, filas_tipadas = None, None, None
+    if _cache_es(base):
+        # La caché es `base` tipada: solo se convierten las filas tocadas, y «Próximo pago»
+        # solo cambia en ellas.
+        tabla = _retipar_filas(_cache_df.reset_index(drop=True), base, objetivo, cambiadas)
+        vencimientos = _cache_df[COLUMNA_PROXIMO_PAGO].reset_index(drop=True)
+        vencimientos.iloc[cambiadas] = _calcular_vencimientos(objetivo.iloc[cambiadas]).to_numpy()
+        if tabla is not None and tabla.index.equals(_cache_df.index):
+            filas_tipadas = cambiadas
+    _invalidar_cache()
+    _instalar_cache(
+        objetivo.copy() if tabla is None else tabla,
+        _data_version,
+        None,
+        time.time(),
+        foto_hoja=False,
+        vencimientos=vencimientos,
+        cambiadas=filas_tipadas,
+    )
+    return _cache_df
 
-    if data_rows:
-        values = [COLUMNS] + data_rows
-    else:
-        values = [COLUMNS]
 
-    service.spreadsheets().values().update(
-        spreadsheetId=spreadsheet_id,
-        range=f"{sheet_title}!A1",
-        valueInputOption="RAW",
-        body={"values": values},
-    ).execute()
+def _incorporar_lote(base: pd.DataFrame, escrito: pd.DataFrame) -> None:
+    """
+    La foto pasa a incluir el lote escrito sobre `base`. Si entretanto se sustituyó (una
+    revalidación o la foto de otra instancia), se le aplican las filas del lote que aún tenga
+    en una versión anterior. Llamar con _data_lock adquirido.
+    """
+    if _snapshot_df is base:
+        _set_snapshot(escrito)
+        return
+    if _snapshot_df is None:
+        return
+    iv = COLUMNS.index(COLUMNA_VERSION)
+    i_dni = COLUMNS.index("DNI")
+    actual = _snapshot_df.values
+    filas = {}
+    for pos in _filas_distintas(escrito, base):
+        pos = int(pos)
+        fila = escrito.iloc[pos].tolist()
+        if pos < len(actual) and actual[pos, i_dni] == fila[i_dni] and _version(actual[pos, iv]) < _version(fila[iv]):
+            filas[pos] = fila
+    if filas:
+        _set_snapshot(_sustituir_filas(_snapshot_df, filas))
+
+
+def _tomar_turno_escritura() -> None:
+    """
+    Turno para una escritura en el acto (guardar_datos sin diferir, altas): espera a que
+    termine la escritura en curso y la reserva, así las escrituras de este proceso llegan
+    a la hoja de una en una aunque se hagan sin _data_lock. Llamar con _data_lock
+    adquirido; devolver el turno con _ceder_turno_escritura.
+    """
+    global _escritura_en_curso, _escritura_en_el_acto
+    while _escritura_en_curso:
+        _escritura_cond.wait()
+    _escritura_en_curso = True
+    _escritura_en_el_acto = True
 
 
-def _aplicar_reglas_pago(df: pd.DataFrame):
-    actualizado = False
-    now = pd.Timestamp.now()
+def _ceder_turno_escritura() -> None:
+    """Libera el turno de escritura. Llamar con _data_lock adquirido."""
+    global _escritura_en_curso, _escritura_en_el_acto
+    _escritura_en_curso = False
+    _escritura_en_el_acto = False
+    _escritura_cond.notify_all()
 
-    if "Estado de pago" not in df.columns:
-        df["Estado de pago"] = "No pagado"
-        actualizado = True
-    else:
-        df["Estado de pago"] = df["Estado de pago"].replace("", "No pagado")
 
-    if "Fecha último pago" not in df.columns:
-        df["Fecha último pago"] = ""
-        actualizado = True
+def _vaciar_escrituras_pendientes() -> int:
+    """
+    Escribe ya todo lo pendiente en una sola escritura de diferencias (un batchUpdate en
+    Sheets). Si falla, pasa a la cola offline. Devuelve las operaciones que llevaba el lote.
 
-    for idx, row in df.iterrows():
-        plan = str(row.get("Plan contratado", "")).strip()
-        estado_actual = str(row.get("Estado de pago", "")).strip() or "No pagado"
-        fecha_pago = str(row.get("Fecha último pago", "")).strip()
+    El candado de datos solo se toma para sacar el lote y para publicar el resultado: durante
+    la llamada a Sheets las sesiones siguen leyendo y confirmando, y lo que confirmen va al
+    lote siguiente. Si quien llama ya tiene el candado, lo conserva toda la escritura.
+    """
+    global _pendiente_df, _pendiente_ops, _pendiente_desde, _filas_en_vuelo, _escritura_en_curso
+    with _data_lock:
+        # Un lote a la vez: las filas del que está en curso ya no están en _pendiente_filas.
+        while _escritura_en_curso:
+            _escritura_cond.wait()
+        if not _pendiente_filas:
+            return 0
+        if _snapshot_df is None:
+            # Sin foto de la hoja no hay base sobre la que aplicar las filas: se conservan
+            # (y el diario) y se reintenta pasado el enfriamiento del cortacircuitos.
+            _pendiente_desde = time.monotonic() + llamadas_api.ENFRIAMIENTO_CIRCUITO_SEGUNDOS
+            return 0
+        filas = dict(_pendiente_filas)
+        ops, desde = _pendiente_ops, _pendiente_desde
+        _pendiente_filas.clear()
+        _pendiente_ops = 0
+        _pendiente_desde = None
+        # _pendiente_df se conserva: sigue siendo lo confirmado, base de las operaciones que lleguen.
+        _filas_en_vuelo = filas
+        _escritura_en_curso = True
+        inicio = time.monotonic()
+        base = _snapshot_df
+        objetivo = _aplicar_filas(base, filas)
+
+    error = None
+    try:
+        escrito = _escribir_lote(base, objetivo)
+    except Exception as e:
+        error = e
 
-        if plan not in PLAN_PERIODOS_MESES:
-            if estado_actual not in ("Pagado", "No pagado"):
-                df.at[idx, "Estado de pago"] = "No pagado"
-                actualizado = True
-            continue
+    with _data_lock:
+        try:
+            _filas_en_vuelo = {}
+            if error is None:
+                _incorporar_lote(base, escrito)
+                if not _pendiente_filas:
+                    _pendiente_df = None
+                if escrito is not objetivo or _snapshot_df is not base:
+                    # Se rebasó sobre cambios de otra instancia, o la foto cambió durante la
+                    # escritura: la caché pasa a ser la foto con lo pendiente encima.
+                    _publicar_escritura()
+                _persistir_snapshot_tras_escritura()
+                if not _load_queue():
+                    _clear_offline_flag()
+            else:
+                if not _pendiente_filas:
+                    _pendiente_df = None
+                _encolar_escritura(base, objetivo, error)
+                print(f"[WARN] Escritura diferida en cola offline ({ops} operaciones): {error}")
+                _escritura_stats["a_cola_offline"] += ops
+        finally:
+            _ceder_turno_escritura()
+        # Lo anotado ya está en la hoja o en la cola offline. Si durante la escritura se anotaron
+        # operaciones nuevas, el diario se conserva: reaplicar lo ya escrito no cambia nada.
+        if not _pendiente_filas:
+            DIARIO_PATH.unlink(missing_ok=True)
+        fin = time.monotonic()
+        confirmacion_ms = (fin - desde) * 1000 if desde is not None else 0.0
+        _escritura_stats["lotes"] += 1
+        _escritura_stats["ops_lote_max"] = max(_escritura_stats["ops_lote_max"], ops)
+        _escritura_stats["filas_escritas"] += len(filas)
+        _escritura_stats["ms_confirmacion_total"] += confirmacion_ms
+        _escritura_stats["ms_confirmacion_max"] = max(_escritura_stats["ms_confirmacion_max"], confirmacion_ms)
+        _escritura_stats["ms_escritura_total"] += (fin - inicio) * 1000
+        return ops
+
+
+def vaciar_escrituras_pendientes() -> int:
+    """Fuerza la escritura de lo pendiente (también se llama al cerrar el proceso)."""
+    return _vaciar_escrituras_pendientes()
+
+
+def _bucle_escritor() -> None:
+    """
+    Espera a la primera operación pendiente y escribe el lote al cerrar la ventana o llenarse.
+    La escritura se lanza fuera de la condición, para no retener el candado durante la llamada.
+    """
+    while True:
+        with _escritura_cond:
+            while not _pendiente_filas:
+                _escritura_cond.wait()
+            while _pendiente_filas:
+                restante = _pendiente_desde + ESCRITURA_DIFERIDA_MS / 1000 - time.monotonic()
+                lleno = _pendiente_ops >= ESCRITURA_DIFERIDA_MAX_OPS and _pendiente_desde <= time.monotonic()
+                if restante <= 0 or lleno:
+                    break
+                _escritura_cond.wait(restante)
+        try:
+            _vaciar_escrituras_pendientes()
+        except Exception as e:
+            print(f"[WARN] Falló el hilo de escritura diferida: {e}")
 
-        if not fecha_pago:
-            if estado_actual != "No pagado":
-                df.at[idx, "Estado de pago"] = "No pagado"
-                actualizado = True
-            continue
 
-        fecha_dt = pd.to_datetime(fecha_pago, errors="coerce")
-        if pd.isna(fecha_dt):
-            if estado_actual != "No pagado":
-                df.at[idx, "Estado de pago"] = "No pagado"
-                actualizado = True
-            continue
+def _iniciar_escritor() -> None:
+    global _escritor
+    if _escritor is not None:
+        return
+    _escritor = threading.Thread(target=_bucle_escritor, name="escritura_diferida", daemon=True)
+    _escritor.start()
+    # El hilo es daemon: al salir, lo confirmado y aún no escrito se escribe aquí.
+    atexit.register(_vaciar_escrituras_pendientes)
 
-        meses = PLAN_PERIODOS_MESES[plan]
-        next_due = fecha_dt + pd.DateOffset(months=meses)
-        if now >= next_due and estado_actual != "No pagado":
-            df.at[idx, "Estado de pago"] = "No pagado"
-            actualizado = True
 
-    return df, actualizado
+def _recuperar_diario() -> int:
+    """
+    Reaplica lo que quedó en el diario si el proceso anterior terminó sin escribirlo
+    (los valores son absolutos: reaplicar algo ya escrito no cambia nada).
+    """
+    global _pendiente_df, _pendiente_ops, _pendiente_desde
+    filas, lineas = _leer_diario()
+    if not filas:
+        DIARIO_PATH.unlink(missing_ok=True)
+        return 0
+    # Foto base de la hoja (o, sin conexión, la de disco) sobre la que aplicar las filas.
+    _socios_en_cache()
+    with _data_lock:
+        _pendiente_filas.update(filas)
+        _pendiente_ops += lineas
+        _pendiente_desde = _pendiente_desde or time.monotonic()
+        _escritura_stats["recuperadas_del_diario"] += lineas
+        if _snapshot_df is not None:
+            _pendiente_df = _aplicar_filas(_snapshot_df, _pendiente_filas)
+        _publicar_escritura()
+    if not _vaciar_escrituras_pendientes():
+        _iniciar_escritor()
+    with _data_lock:
+        _publicar_escritura()
+    print(f"[INFO] Recuperadas {len(filas)} filas del diario de escrituras.")
+    return lineas
+
+
+def _append_fila_sheets(fila: list) -> None:
+    spreadsheet_id = _get_spreadsheet_id()
+    sheet_title = _get_sheet_title(spreadsheet_id)
+    service = _get_sheets_service()
+    service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id,
+        range=f"{sheet_title}!A:{_column_letter(len(COLUMNS) - 1)}",
+        valueInputOption="RAW",
+        insertDataOption="INSERT_ROWS",
+        body={"values": [fila]},
+    ).execute()
 
 
-def cargar_datos() -> pd.DataFrame:
+def _incorporar_alta(fila: list) -> None:
     """
-    Obtiene todos los registros del Sheet garantizando el esquema fijo.
+    La fila añadida al final de la tabla de socios pasa a la foto local y su DNI, al índice.
+    Llamar con _data_lock adquirido.
     """
-    try:
-        spreadsheet_id = _get_spreadsheet_id()
-        sheet_title = _get_sheet_title(spreadsheet_id)
-        service = _get_sheets_service()
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range=f"{sheet_title}!A:Z",
-        ).execute()
-        values = result.get("values", [])
-    except Exception:
-        return _empty_dataframe()
-
-    if not values:
-        return _empty_dataframe()
+    global _snapshot_df
+    if _snapshot_df is not None:
+        _snapshot_df = pd.concat(
+            [_snapshot_df, pd.DataFrame([fila], columns=COLUMNS)],
+            ignore_index=True,
+        )
+    if _dni_index is not None:
+        _dni_index.add(_normalizar_dni(fila[COLUMNS.index("DNI")]))
 
-    header = values[0]
-    rows = values[1:] if len(values) > 1 else []
-    # Normaliza el número de columnas por fila para evitar errores de longitud.
-    safe_rows = []
-    num_cols = len(header)
-    for r in rows:
-        if len(r) < num_cols:
-            r = r + [""] * (num_cols - len(r))
-        elif len(r) > num_cols:
-            r = r[:num_cols]
-        safe_rows.append(r)
 
-    df = pd.DataFrame(safe_rows, columns=header)
-    columnas_faltantes = [col for col in COLUMNS if col not in df.columns]
-    df = _ensure_columns(df)
-    df, actualizado = _aplicar_reglas_pago(df)
-    if actualizado or columnas_faltantes:
-        _flush_dataframe(df)
-    return df
+def _append_fila_socio(fila: list) -> None:
+    """Añade una fila al final de la tabla de socios y la incorpora a la foto local."""
+    _get_backend().insertar_socio(fila)
+    with _data_lock:
+        _incorporar_alta(fila)
 
 
-def guardar_datos(df_nuevos: pd.DataFrame) -> None:
+def insertar_socio(socio: dict) -> bool:
     """
-    Sobrescribe la hoja con el DataFrame proporcionado.
+    Da de alta un socio nuevo añadiendo una única fila al final de la hoja.
+    Devuelve False (sin escribir nada) si el DNI ya está registrado.
+    La fila nueva se incorpora a la caché compartida sin volver a leer la hoja.
     """
-    if df_nuevos is None:
-        df_nuevos = _empty_dataframe()
-
+    dni = _normalizar_dni(socio.get("DNI"))
+    # Las filas nacen en la versión 1: las escrituras condicionales las distinguen de una fila vacía.
+    fila = _to_sheet_values(pd.DataFrame([{**socio, COLUMNA_VERSION: "1"}])).iloc[0].tolist()
+    if not dni or existe_dni(dni):
+        return False
+    # El alta cambia el número de filas: lo pendiente tiene que estar escrito antes. La
+    # llamada a la hoja se hace sin el candado, en el turno de escritura.
+    _vaciar_escrituras_pendientes()
+    with _data_lock:
+        _tomar_turno_escritura()
+        if existe_dni(dni):
+            # Otra sesión dio de alta el mismo DNI mientras tanto.
+            _ceder_turno_escritura()
+            return False
+    error = None
     try:
-        _flush_dataframe(df_nuevos)
-        if not _load_queue():
-            _clear_offline_flag()
+        _get_backend().insertar_socio(fila)
     except Exception as e:
-        _enqueue_operation(
-            "guardar_datos",
-            {"data": df_nuevos.fillna("").to_dict("records"), "error": str(e)},
-        )
-        print(f"[WARN] Guardar datos en cola offline: {e}")
+        error = e
+
+    with _data_lock:
+        try:
+            if error is not None:
+                _enqueue_operation("insertar_socio", {"fila": fila, "error": str(error)})
+                print(f"[WARN] Alta de socio en cola offline ({dni}): {error}")
+                _get_dni_index().add(dni)
+                _invalidar_cache()
+                return True
+            _incorporar_alta(fila)
+            _persistir_snapshot_tras_escritura()
+            if not _load_queue():
+                _clear_offline_flag()
+            _publicar_escritura()
+        finally:
+            _ceder_turno_escritura()
+    return True
 
 
 def registrar_log(usuario: str, accion: str, dni: str, detalle: str = "") -> None:
@@ -376,15 +2493,8 @@ def registrar_log(usuario: str, accion: str, dni: str, detalle: str = "") -> Non
     try:
         timestamp = pd.Timestamp.now(tz=pytz.timezone("Europe/Madrid")).strftime("%d-%m-%Y %H:%M:%S")
         fila = [timestamp, usuario or "desconocido", accion, dni, detalle]
-        spreadsheet_id = _get_spreadsheet_id()
-        _ensure_logs_sheet(spreadsheet_id)
-        service = _get_sheets_service()
-        service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range="Logs!A:E",
-            valueInputOption="RAW",
-            body={"values": [fila]},
-        ).execute()
+        _get_backend().registrar_log(fila)
+        _olvidar_memo_ejecucion()
     except Exception as e:
         _enqueue_operation(
             "log",
@@ -400,6 +2510,15 @@ def registrar_log(usuario: str, accion: str, dni: str, detalle: str = "") -> Non
 
 
 def sincronizar_pendientes():
+    # Con Google caído cada operación de la cola fallaría igual: se espera a que se recupere.
+    if not hay_pendientes_offline() or llamadas_api.circuito_abierto():
+        return 0
+    with _data_lock:
+        return _sincronizar_cola()
+
+
+def _sincronizar_cola():
+    _vaciar_escrituras_pendientes()
     queue = _load_queue()
     if not queue:
         return 0
@@ -408,9 +2527,21 @@ def sincronizar_pendientes():
     procesadas = 0
     for op in queue:
         try:
-            if op["type"] == "guardar_datos":
-                df = pd.DataFrame(op["payload"]["data"])
-                _flush_dataframe(df)
+            if op["type"] == "guardar_filas":
+                if _snapshot_df is None:
+                    _socios_en_cache()
+                if _snapshot_df is None:
+                    raise RuntimeError("No hay foto de la hoja sobre la que aplicar los cambios.")
+                _escribir_versionado(_aplicar_cambios_encolados(_snapshot_df, op["payload"]["filas"]))
+            elif op["type"] == "guardar_datos":
+                sesion = _to_sheet_values(pd.DataFrame(op["payload"]["data"])).reset_index(drop=True)
+                if _snapshot_df is None:
+                    _escribir_dataframe(sesion, completo=True)
+                else:
+                    # Lo encolado se rebasa fila a fila: no pisa lo que otros escribieron mientras tanto.
+                    _escribir_versionado(_rebasar_sesion(sesion, _snapshot_df))
+            elif op["type"] == "insertar_socio":
+                _append_fila_socio(op["payload"]["fila"])
             elif op["type"] == "log":
                 timestamp = pd.Timestamp.now(tz=pytz.timezone("Europe/Madrid")).strftime("%d-%m-%Y %H:%M:%S")
                 fila = [
@@ -432,6 +2563,9 @@ def sincronizar_pendientes():
             restantes.append(op)
 
     _save_queue(restantes)
+    if procesadas:
+        _persistir_snapshot_tras_escritura()
+        _publicar_escritura()
     if not restantes:
         _clear_offline_flag()
     return procesadas
@@ -441,44 +2575,159 @@ def hay_pendientes_offline() -> bool:
     return bool(_load_queue())
 
 
+def google_no_disponible() -> bool:
+    """True si Google se da por caído: lecturas desde la copia local y escrituras a la cola offline."""
+    return STORAGE_BACKEND != "sqlite" and llamadas_api.circuito_abierto()
+
+
 def obtener_historial_logs(dni: str, limite: int = 5):
     try:
-        spreadsheet_id = _get_spreadsheet_id()
-        _ensure_logs_sheet(spreadsheet_id)
-        service = _get_sheets_service()
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range="Logs!A:E",
-        ).execute()
-        values = result.get("values", [])
-        if not values or len(values) < 2:
-            return []
-        header = values[0]
-        rows = values[1:]
-        registros = [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in rows]
+        return list(_memo_ejecucion(("historial_logs", dni, limite), lambda: _get_backend().historial_logs(dni, limite)))
     except Exception:
         return []
+
+
+def _registrar_log_sheets(fila: list) -> None:
+    spreadsheet_id = _get_spreadsheet_id()
+    _ensure_logs_sheet(spreadsheet_id)
+    service = _get_sheets_service()
+    service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id,
+        range="Logs!A:E",
+        valueInputOption="RAW",
+        body={"values": [fila]},
+    ).execute()
+
+
+def _historial_logs_sheets(dni: str, limite: int) -> list:
+    spreadsheet_id = _get_spreadsheet_id()
+    _ensure_logs_sheet(spreadsheet_id)
+    service = _get_sheets_service()
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range="Logs!A:E",
+    ).execute()
+    values = result.get("values", [])
+    if not values or len(values) < 2:
+        return []
+    header = values[0]
+    rows = values[1:]
+    registros = [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in rows]
     filtrados = [r for r in registros if str(r.get("DNI")) == str(dni)]
     filtrados.sort(key=lambda x: x.get("Fecha", ""), reverse=True)
     return filtrados[:limite]
 
 
+class SheetsBackend(BackendSocios):
+    """Backend original: la hoja de cálculo de Google es la fuente de verdad."""
+
+    nombre = "sheets"
+
+    def descargar_socios(self, http=None) -> tuple:
+        return _descargar_socios_sheets(http=http)
+
+    def descargar_columnas(self, columnas: list) -> pd.DataFrame:
+        return _leer_columnas(columnas)
+
+    def firma(self, http=None) -> str | None:
+        return _firma_drive(http=http)
+
+    def escribir_socios(self, anterior: pd.DataFrame | None, nuevo: pd.DataFrame) -> None:
+        _escribir_dataframe_sheets(anterior, nuevo)
+
+    def insertar_socio(self, fila: list) -> None:
+        _append_fila_sheets(fila)
+
+    def registrar_log(self, fila: list) -> None:
+        _registrar_log_sheets(fila)
+
+    def historial_logs(self, dni: str, limite: int) -> list:
+        return _historial_logs_sheets(dni, limite)
+
+
+def _get_backend() -> BackendSocios:
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            _backend = SQLiteBackend(SQLITE_PATH, COLUMNS, LOG_COLUMNS, COLUMNA_VERSION)
+        else:
+            _backend = SheetsBackend()
+    return _backend
+
+
+def exportar_a_sheets() -> int:
+    """
+    Con el backend SQLite, vuelca la tabla de socios completa a la hoja de Google
+    (exportación en un solo sentido: la hoja no se vuelve a leer). Devuelve las filas exportadas.
+    """
+    with _data_lock:
+        _vaciar_escrituras_pendientes()
+        df, _ = _get_backend().descargar_socios()
+        _flush_dataframe(df)
+    return len(df)
+
+
+def importar_desde_sheets() -> int:
+    """Copia la hoja de Google en la base local (al pasar a SQLite). Devuelve las filas importadas."""
+    with _data_lock:
+        _vaciar_escrituras_pendientes()
+        df, _ = _descargar_socios_sheets()
+        _escribir_dataframe(df, completo=True)
+        _persistir_snapshot_tras_escritura()
+        _invalidar_cache()
+    return len(df)
+
+
+def backend_local_vacio() -> bool:
+    backend = _get_backend()
+    return isinstance(backend, SQLiteBackend) and backend.esta_vacia()
+
+
+def _get_fake_google():
+    """Simulador de Google compartido por Sheets y Drive, con la hoja principal ya creada."""
+    global _fake_google
+    with _servicios_lock:
+        if _fake_google is None:
+            from core.fake_google import FakeGoogle
+
+            _fake_google = FakeGoogle.desde_entorno()
+            _fake_google.crear_hoja_calculo(SHEET_NAME, SPREADSHEET_ID)
+        return _fake_google
+
+
+def _construir_servicio(nombre: str, version: str):
+    # Documento de descubrimiento estático (el que trae googleapiclient): sin descargarlo de Google.
+    # Las llamadas no usan el transporte del servicio sino uno prestado por el pool.
+    return llamadas_api.ServicioControlado(
+        build(nombre, version, http=_http_autorizado(), cache_discovery=False, static_discovery=True),
+        transportes=_get_pool_http(),
+    )
+
+
 def _get_drive_service():
     global _drive_service
     if _drive_service:
         return _drive_service
-    creds = _load_credentials()
-    _drive_service = build("drive", "v3", credentials=creds, cache_discovery=False)
-    return _drive_service
+    with _servicios_lock:
+        if _drive_service is None:
+            if USAR_FAKE_GOOGLE:
+                _drive_service = llamadas_api.ServicioControlado(_get_fake_google().drive())
+            else:
+                _drive_service = _construir_servicio("drive", "v3")
+        return _drive_service
 
 
 def _get_sheets_service():
     global _sheets_service
     if _sheets_service:
         return _sheets_service
-    creds = _load_credentials()
-    _sheets_service = build("sheets", "v4", credentials=creds, cache_discovery=False)
-    return _sheets_service
+    with _servicios_lock:
+        if _sheets_service is None:
+            if USAR_FAKE_GOOGLE:
+                _sheets_service = llamadas_api.ServicioControlado(_get_fake_google().sheets())
+            else:
+                _sheets_service = _construir_servicio("sheets", "v4")
+        return _sheets_service
 
 
 def _find_spreadsheet_id_by_name(name: str) -> str:
@@ -504,33 +2753,39 @@ def _get_spreadsheet_id() -> str:
     return _spreadsheet_id_cache
 
 
-def _get_sheet_title(spreadsheet_id: str) -> str:
+def _leer_pestanas(spreadsheet_id: str) -> list:
+    """Títulos de las pestañas (una sola lectura de metadatos); fija también la pestaña principal."""
     global _sheet_title_cache
-    if _sheet_title_cache:
-        return _sheet_title_cache
     service = _get_sheets_service()
-    meta = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-    sheets = meta.get("sheets", [])
-    if not sheets:
+    meta = service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields="sheets.properties.title").execute()
+    titulos = [s["properties"]["title"] for s in meta.get("sheets", [])]
+    if not titulos:
         raise RuntimeError("La hoja de cálculo no tiene pestañas.")
-    _sheet_title_cache = sheets[0]["properties"]["title"]
-    return _sheet_title_cache
+    _sheet_title_cache = titulos[0]
+    _pestanas_existentes.update(titulos)
+    return titulos
 
 
-def _ensure_logs_sheet(spreadsheet_id: str, logs_title: str = "Logs"):
-    service = _get_sheets_service()
-    meta = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-    sheets = meta.get("sheets", [])
-    exists = any(s["properties"]["title"] == logs_title for s in sheets)
-    if exists:
+def _get_sheet_title(spreadsheet_id: str) -> str:
+    if _sheet_title_cache:
+        return _sheet_title_cache
+    return _leer_pestanas(spreadsheet_id)[0]
+
+
+def _ensure_aux_sheet(spreadsheet_id: str, title: str, headers: list):
+    """Crea la pestaña auxiliar `title` con sus cabeceras si aún no existe."""
+    if title in _pestanas_existentes:
+        return
+    if title in _leer_pestanas(spreadsheet_id):
         return
+    service = _get_sheets_service()
     body = {
         "requests": [
             {
                 "addSheet": {
                     "properties": {
-                        "title": logs_title,
-                        "gridProperties": {"rowCount": 1000, "columnCount": 5},
+                        "title": title,
+                        "gridProperties": {"rowCount": 1000, "columnCount": len(headers)},
                     }
                 }
             }
@@ -540,10 +2795,93 @@ def _ensure_logs_sheet(spreadsheet_id: str, logs_title: str = "Logs"):
     # Añadir cabeceras
     service.spreadsheets().values().update(
         spreadsheetId=spreadsheet_id,
-        range=f"{logs_title}!A1:E1",
+        range=f"{title}!A1:{_column_letter(len(headers) - 1)}1",
         valueInputOption="RAW",
-        body={"values": [["Fecha", "Usuario", "Acción", "DNI", "Detalle"]]},
+        body={"values": [headers]},
+    ).execute()
+    _pestanas_existentes.add(title)
+
+
+def _ensure_logs_sheet(spreadsheet_id: str, logs_title: str = "Logs"):
+    _ensure_aux_sheet(spreadsheet_id, logs_title, LOG_COLUMNS)
+
+
+def _leer_meta(spreadsheet_id: str) -> dict:
+    """Lee los pares clave/valor de la pestaña de metadatos de la aplicación."""
+    _ensure_aux_sheet(spreadsheet_id, META_SHEET_TITLE, ["Clave", "Valor"])
+    service = _get_sheets_service()
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f"{META_SHEET_TITLE}!A:B",
+    ).execute()
+    values = result.get("values", [])
+    return {row[0]: (row[1] if len(row) > 1 else "") for row in values[1:] if row}
+
+
+def _escribir_meta(spreadsheet_id: str, clave: str, valor: str) -> None:
+    """Actualiza (o añade) una clave en la pestaña de metadatos."""
+    service = _get_sheets_service()
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f"{META_SHEET_TITLE}!A:A",
     ).execute()
+    claves = [row[0] if row else "" for row in result.get("values", [])]
+    if clave in claves:
+        fila = claves.index(clave) + 1
+        service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range=f"{META_SHEET_TITLE}!A{fila}:B{fila}",
+            valueInputOption="RAW",
+            body={"values": [[clave, valor]]},
+        ).execute()
+    else:
+        service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=f"{META_SHEET_TITLE}!A:B",
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": [[clave, valor]]},
+        ).execute()
+
+
+def migrar_esquema() -> bool:
+    """
+    Lleva la hoja principal al esquema actual (COLUMNS) si la versión guardada en la
+    pestaña de metadatos es anterior a SCHEMA_VERSION. Se ejecuta una vez por proceso;
+    devuelve True si hubo que reescribir la hoja.
+    """
+    global _esquema_verificado
+    if _esquema_verificado:
+        return False
+    with _data_lock:
+        if _esquema_verificado:
+            return False
+        spreadsheet_id = _get_spreadsheet_id()
+        meta = _leer_meta(spreadsheet_id)
+        try:
+            version_actual = int(meta.get("schema_version") or 0)
+        except ValueError:
+            version_actual = 0
+        migrada = False
+        if version_actual < SCHEMA_VERSION:
+            sheet_title = _get_sheet_title(spreadsheet_id)
+            service = _get_sheets_service()
+            result = service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=f"{sheet_title}!A1:Z1",
+            ).execute()
+            cabecera = (result.get("values") or [[]])[0]
+            if cabecera != COLUMNS:
+                _vaciar_escrituras_pendientes()
+                df = _descargar_socios_sheets()[0]
+                _flush_dataframe(df)
+                _set_snapshot(df)
+                _persistir_snapshot_tras_escritura()
+                _invalidar_cache()
+                migrada = True
+            _escribir_meta(spreadsheet_id, "schema_version", str(SCHEMA_VERSION))
+        _esquema_verificado = True
+        return migrada
 
 
 def _ensure_drive_folder(folder_name: str) -> str:
@@ -573,6 +2911,10 @@ def _ensure_drive_folder(folder_name: str) -> str:
 
 def _ensure_drive_folder_named(folder_name: str, parent_id: str | None = None) -> str:
     """Crea/obtiene una carpeta por nombre (opcionalmente dentro de un parent)."""
+    return _memo_ejecucion(("carpeta_drive", folder_name, parent_id), lambda: _buscar_o_crear_carpeta(folder_name, parent_id))
+
+
+def _buscar_o_crear_carpeta(folder_name: str, parent_id: str | None) -> str:
     service = _get_drive_service()
     parent_clause = f" and '{parent_id}' in parents" if parent_id else ""
     query = (
@@ -592,6 +2934,10 @@ def _ensure_drive_folder_named(folder_name: str, parent_id: str | None = None) -
 
 def leer_fecha_ultimo_backup() -> str | None:
     """Lee la fecha del último backup desde last_backup_sheets.txt en Drive. Devuelve None si no existe."""
+    return _memo_ejecucion(("fecha_ultimo_backup",), _leer_fecha_ultimo_backup)
+
+
+def _leer_fecha_ultimo_backup() -> str | None:
     try:
         service = _get_drive_service()
         backup_folder = _ensure_drive_folder_named(BACKUP_SHEETS_FOLDER_NAME)
@@ -606,10 +2952,14 @@ def leer_fecha_ultimo_backup() -> str | None:
         file_id = files[0]["id"]
         request = service.files().get_media(fileId=file_id)
         file_bytes = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_bytes, request)
         done = False
-        while not done:
-            _, done = downloader.next_chunk()
+        with _transporte_prestado() as http:
+            # La descarga por trozos usa request.http: se le da un transporte del pool.
+            if http is not None:
+                request.http = http
+            downloader = MediaIoBaseDownload(file_bytes, request)
+            while not done:
+                _, done = llamadas_api.llamar("drive.files.get_media", downloader.next_chunk)
         file_bytes.seek(0)
         contenido = file_bytes.read().decode("utf-8").strip()
         return contenido or None
@@ -637,6 +2987,7 @@ def guardar_fecha_ultimo_backup(fecha_str: str) -> None:
             service.files().delete(fileId=files[0]["id"]).execute()
 
         service.files().create(body=metadata, media_body=media, fields="id").execute()
+        _olvidar_memo_ejecucion()
     except Exception as e:
         print(f"[WARN] No se pudo guardar la fecha del último backup: {e}")
 
@@ -741,7 +3092,7 @@ def limpiar_backups_antiguos():
         service = _get_drive_service()
         # Sheets (30 días)
         folder_sheets = _ensure_drive_folder_named(BACKUP_SHEETS_FOLDER_NAME)
-        limite_sheets = datetime.utcnow() - timedelta(days=30)
+        limite_sheets = datetime.now(pytz.utc) - timedelta(days=30)
         res = service.files().list(
             q=f"'{folder_sheets}' in parents and trashed = false",
             fields="files(id, name, createdTime)",
@@ -752,21 +3103,85 @@ def limpiar_backups_antiguos():
         for f in res.get("files", []):
             try:
                 fecha = datetime.fromisoformat(f["createdTime"].replace("Z", "+00:00"))
-                if fecha < limite_sheets:
-                    service.files().delete(fileId=f["id"], supportsAllDrives=True).execute()
-            except Exception:
+            except (KeyError, ValueError):
+                continue
+            if fecha >= limite_sheets:
                 continue
+            try:
+                service.files().delete(fileId=f["id"], supportsAllDrives=True).execute()
+            except Exception as e:
+                print(f"[WARN] No se pudo borrar el backup {f.get('name', f['id'])}: {e}")
     except Exception as e:
         print(f"[WARN] Limpieza de backups falló: {e}")
 
 
-# --- Inicialización sencilla para validar conexión al arranque ---
-try:
-    _get_sheets_service()
-    _get_spreadsheet_id()
-    _get_sheet_title(_get_spreadsheet_id())
-    _ensure_logs_sheet(_get_spreadsheet_id())
-except Exception as e:
-    import streamlit as st
-    st.error(f"Error al conectar con Google Sheets: {e}")
-    st.stop()
+# --- Inicialización del almacenamiento (una vez por proceso, fuera del import) ---
+def _inicializar_almacenamiento() -> None:
+    """Valida la conexión y prepara la hoja, lanzando en paralelo los pasos independientes."""
+    if STORAGE_BACKEND == "sqlite":
+        # Los datos viven en local: Google solo hace falta para documentos, backups y exportar.
+        _get_backend()
+        _recuperar_diario()
+        _iniciar_revisor_pagos()
+        return
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="arranque") as pool:
+        # Construir los servicios y localizar la hoja (búsqueda en Drive sin SPREADSHEET_ID) no dependen entre sí.
+        for tarea in [pool.submit(_get_sheets_service), pool.submit(_get_drive_service), pool.submit(_get_spreadsheet_id)]:
+            tarea.result()
+        spreadsheet_id = _get_spreadsheet_id()
+        # Una sola lectura de metadatos sirve a la pestaña principal, Logs y metadatos del esquema.
+        _leer_pestanas(spreadsheet_id)
+        for tarea in [pool.submit(_ensure_logs_sheet, spreadsheet_id), pool.submit(migrar_esquema)]:
+            tarea.result()
+    _recuperar_diario()
+    # Vencimientos de pago: escritura explícita y acotada, en su propio hilo y no en cada ejecución de la página.
+    _iniciar_revisor_pagos()
+
+
+def iniciar_almacenamiento() -> Future:
+    """
+    Lanza la inicialización en segundo plano si no está hecha ni en curso, sin esperar.
+    Si la anterior falló, se vuelve a intentar.
+    """
+    global _inicializacion
+    with _inicializacion_lock:
+        if _inicializacion is not None and not (_inicializacion.done() and _inicializacion.exception()):
+            return _inicializacion
+        futuro = Future()
+
+        def ejecutar():
+            try:
+                _inicializar_almacenamiento()
+                futuro.set_result(None)
+            except Exception as e:
+                futuro.set_exception(e)
+
+        _inicializacion = futuro
+        threading.Thread(target=ejecutar, name="inicializar_almacenamiento", daemon=True).start()
+        return futuro
+
+
+def esperar_almacenamiento(timeout: float | None = None) -> None:
+    """Espera a que el almacenamiento esté listo; relanza el error si la inicialización falló."""
+    iniciar_almacenamiento().result(timeout)
+
+
+def _es_fallo_de_red(error: Exception) -> bool:
+    """Google o la red no responden; las credenciales y la configuración no son el problema."""
+    if isinstance(error, HttpError):
+        return error.resp.status >= 500 or error.resp.status == 429
+    return isinstance(error, (ConnectionError, TimeoutError, httplib2.ServerNotFoundError, TransportError))
+
+
+def arrancar_sin_google(error: Exception) -> bool:
+    """
+    Decide si la app puede seguir tras un fallo de esperar_almacenamiento(): solo si Google no
+    respondía (red, timeout, 5xx o circuito abierto) y hay foto local de los socios que servir.
+    Las lecturas salen de esa foto, las escrituras van a la cola offline y la inicialización
+    se reintenta en la siguiente ejecución. Con errores de credenciales o configuración devuelve False.
+    """
+    if STORAGE_BACKEND == "sqlite" or not _es_fallo_de_red(error):
+        return False
+    with _data_lock:
+        _adoptar_snapshot_disco()
+        return _cache_df is not None
@@ -0,0 +1,570 @@
+# core/fake_google.py
+"""
+Sustituto en memoria de los servicios de Google Sheets (v4) y Drive (v3).
+
+Implementa solo la parte de la API que usa data_manager, con la misma forma de llamada
+(`service.spreadsheets().values().get(...).execute()`), para poder medir y probar la capa
+de datos sin credenciales ni red. Permite inyectar latencia y fallos aleatorios, y cuenta
+llamadas y bytes por método.
+
+Se activa con SOCIOS_FAKE_GOOGLE=1; la latencia y los fallos se configuran con
+FAKE_GOOGLE_LATENCIA_MS, FAKE_GOOGLE_TASA_FALLOS y FAKE_GOOGLE_SEMILLA.
+"""
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from core import llamadas_api
+
+MIME_HOJA_CALCULO = "application/vnd.google-apps.spreadsheet"
+FILAS_POR_DEFECTO = 1000
+COLUMNAS_POR_DEFECTO = 26
+_INFINITO = 10**9
+
+
+def _error_http(status: int, mensaje: str) -> HttpError:
+    resp = httplib2.Response({"status": str(status)})
+    resp.reason = mensaje
+    contenido = json.dumps({"error": {"code": status, "message": mensaje}}).encode("utf-8")
+    return HttpError(resp, contenido)
+
+
+def _indice_columna(letras: str) -> int:
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - ord("A") + 1
+    return indice - 1
+
+
+def _tamano(datos) -> int:
+    """Tamaño aproximado en bytes de un cuerpo o respuesta, como lo serializaría la API."""
+    if datos is None:
+        return 0
+    if isinstance(datos, bytes):
+        return len(datos)
+    return len(json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _recortar(fila: list) -> list:
+    fila = list(fila)
+    while fila and fila[-1] == "":
+        fila.pop()
+    return fila
+
+
+def _a_texto(valor) -> str:
+    return "" if valor is None else str(valor)
+
+
+class _Hoja:
+    def __init__(self, titulo: str, sheet_id: int, indice: int, filas: int = FILAS_POR_DEFECTO, columnas: int = COLUMNAS_POR_DEFECTO):
+        self.titulo = titulo
+        self.sheet_id = sheet_id
+        self.indice = indice
+        self.filas = filas
+        self.columnas = columnas
+        self.celdas = []
+
+    def propiedades(self) -> dict:
+        return {
+            "sheetId": self.sheet_id,
+            "title": self.titulo,
+            "index": self.indice,
+            "sheetType": "GRID",
+            "gridProperties": {
+                "rowCount": max(self.filas, len(self.celdas)),
+                "columnCount": max([self.columnas] + [len(f) for f in self.celdas]),
+            },
+        }
+
+    def leer(self, r1, c1, r2, c2) -> list:
+        filas = [fila[c1 : c2 + 1] for fila in self.celdas[r1 : r2 + 1]]
+        filas = [_recortar(f) for f in filas]
+        while filas and not filas[-1]:
+            filas.pop()
+        return filas
+
+    def escribir(self, r1, c1, valores: list) -> int:
+        celdas = 0
+        for i, fila in enumerate(valores):
+            while len(self.celdas) <= r1 + i:
+                self.celdas.append([])
+            destino = self.celdas[r1 + i]
+            if len(destino) < c1 + len(fila):
+                destino.extend([""] * (c1 + len(fila) - len(destino)))
+            for j, valor in enumerate(fila):
+                destino[c1 + j] = _a_texto(valor)
+                celdas += 1
+        return celdas
+
+    def limpiar(self, r1, c1, r2, c2) -> None:
+        for fila in self.celdas[r1 : r2 + 1]:
+            for j in range(c1, min(c2 + 1, len(fila))):
+                fila[j] = ""
+
+    def ultima_fila_con_datos(self, c1, c2) -> int:
+        """Índice (desde 0) de la última fila con algún valor entre las columnas c1..c2; -1 si no hay."""
+        for i in range(len(self.celdas) - 1, -1, -1):
+            if any(v != "" for v in self.celdas[i][c1 : c2 + 1]):
+                return i
+        return -1
+
+
+class _HojaCalculo:
+    def __init__(self, spreadsheet_id: str, nombre: str):
+        self.id = spreadsheet_id
+        self.nombre = nombre
+        self.hojas = {}
+        self._ids_hoja = itertools.count()
+
+    def anadir_hoja(self, titulo: str, filas: int = FILAS_POR_DEFECTO, columnas: int = COLUMNAS_POR_DEFECTO) -> _Hoja:
+        if titulo in self.hojas:
+            raise _error_http(400, f"Invalid requests[0].addSheet: A sheet with the name \"{titulo}\" already exists.")
+        hoja = _Hoja(titulo, next(self._ids_hoja), len(self.hojas), filas, columnas)
+        self.hojas[titulo] = hoja
+        return hoja
+
+    def rango(self, a1: str):
+        """Devuelve (hoja, fila1, col1, fila2, col2) con índices desde 0 e inclusivos."""
+        titulo, separador, celdas = a1.rpartition("!")
+        if not separador:
+            titulo, celdas = a1, ""
+        titulo = titulo.strip("'").replace("''", "'")
+        hoja = self.hojas.get(titulo)
+        if hoja is None:
+            raise _error_http(400, f"Unable to parse range: {a1}")
+        if not celdas:
+            return hoja, 0, 0, _INFINITO, _INFINITO
+        m = re.fullmatch(r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", celdas)
+        if m is None:
+            raise _error_http(400, f"Unable to parse range: {a1}")
+        col1, fila1, col2, fila2 = m.groups()
+        es_intervalo = ":" in celdas
+        c1 = _indice_columna(col1) if col1 else 0
+        r1 = int(fila1) - 1 if fila1 else 0
+        if es_intervalo:
+            c2 = _indice_columna(col2) if col2 else _INFINITO
+            r2 = int(fila2) - 1 if fila2 else _INFINITO
+        else:
+            c2 = c1 if col1 else _INFINITO
+            r2 = r1 if fila1 else _INFINITO
+        return hoja, r1, c1, r2, c2
+
+
+class _Peticion:
+    """Equivalente a googleapiclient.http.HttpRequest: no hace nada hasta execute()."""
+
+    def __init__(self, fake, metodo: str, funcion, cuerpo=None):
+        self._fake = fake
+        self._metodo = metodo
+        self.methodId = metodo
+        self._funcion = funcion
+        self._cuerpo = cuerpo
+
+    def execute(self, http=None, num_retries=0):
+        self._fake._antes_de_llamar(self._metodo, self._cuerpo)
+        with self._fake._lock:
+            respuesta = self._funcion()
+        self._fake._despues_de_llamar(respuesta)
+        return respuesta
+
+
+class _HttpDescarga:
+    """Transporte mínimo para que MediaIoBaseDownload funcione con files().get_media()."""
+
+    def __init__(self, fake, file_id: str):
+        self._fake = fake
+        self._file_id = file_id
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self._fake._antes_de_llamar("drive.files.get_media", None)
+        with self._fake._lock:
+            fichero = self._fake._fichero(self._file_id)
+            contenido = fichero.get("contenido", b"")
+        self._fake._despues_de_llamar(contenido)
+        return httplib2.Response({"status": "200", "content-length": str(len(contenido))}), contenido
+
+
+class _PeticionMedia:
+    def __init__(self, fake, file_id: str):
+        self.uri = f"https://fake.googleapis.com/drive/v3/files/{file_id}?alt=media"
+        self.headers = {}
+        self.http = _HttpDescarga(fake, file_id)
+
+
+class _Valores:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def get(self, spreadsheetId, range, majorDimension="ROWS", **kwargs):
+        return _Peticion(self._fake, "sheets.spreadsheets.values.get", lambda: self._fake._leer_rango(spreadsheetId, range, majorDimension))
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension="ROWS", **kwargs):
+        def ejecutar():
+            return {
+                "spreadsheetId": spreadsheetId,
+                "valueRanges": [self._fake._leer_rango(spreadsheetId, r, majorDimension) for r in ranges],
+            }
+
+        return _Peticion(self._fake, "sheets.spreadsheets.values.batchGet", ejecutar)
+
+    def update(self, spreadsheetId, range, body, valueInputOption="RAW", **kwargs):
+        return _Peticion(
+            self._fake,
+            "sheets.spreadsheets.values.update",
+            lambda: self._fake._escribir_rango(spreadsheetId, range, body.get("values", [])),
+            body,
+        )
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def ejecutar():
+            celdas = sum(
+                self._fake._escribir_rango(spreadsheetId, d["range"], d.get("values", []))["updatedCells"]
+                for d in body.get("data", [])
+            )
+            return {"spreadsheetId": spreadsheetId, "totalUpdatedCells": celdas}
+
+        return _Peticion(self._fake, "sheets.spreadsheets.values.batchUpdate", ejecutar, body)
+
+    def append(self, spreadsheetId, range, body, valueInputOption="RAW", insertDataOption="OVERWRITE", **kwargs):
+        return _Peticion(
+            self._fake,
+            "sheets.spreadsheets.values.append",
+            lambda: self._fake._anadir_filas(spreadsheetId, range, body.get("values", [])),
+            body,
+        )
+
+    def clear(self, spreadsheetId, range, body=None, **kwargs):
+        return _Peticion(self._fake, "sheets.spreadsheets.values.clear", lambda: self._fake._limpiar_rango(spreadsheetId, range))
+
+    def batchClear(self, spreadsheetId, body, **kwargs):
+        def ejecutar():
+            rangos = [self._fake._limpiar_rango(spreadsheetId, r)["clearedRange"] for r in body.get("ranges", [])]
+            return {"spreadsheetId": spreadsheetId, "clearedRanges": rangos}
+
+        return _Peticion(self._fake, "sheets.spreadsheets.values.batchClear", ejecutar, body)
+
+
+class _HojasDeCalculo:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def values(self) -> _Valores:
+        return _Valores(self._fake)
+
+    def get(self, spreadsheetId, ranges=None, fields=None, includeGridData=False, **kwargs):
+        def ejecutar():
+            libro = self._fake._hoja_calculo(spreadsheetId)
+            titulos = None
+            if ranges:
+                titulos = {libro.rango(r)[0].titulo for r in ranges}
+            hojas = [h for h in libro.hojas.values() if titulos is None or h.titulo in titulos]
+            return {
+                "spreadsheetId": libro.id,
+                "properties": {"title": libro.nombre},
+                "sheets": [{"properties": h.propiedades()} for h in hojas],
+            }
+
+        return _Peticion(self._fake, "sheets.spreadsheets.get", ejecutar)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def ejecutar():
+            libro = self._fake._hoja_calculo(spreadsheetId)
+            respuestas = []
+            for peticion in body.get("requests", []):
+                if "addSheet" in peticion:
+                    props = peticion["addSheet"].get("properties", {})
+                    rejilla = props.get("gridProperties", {})
+                    hoja = libro.anadir_hoja(
+                        props["title"],
+                        rejilla.get("rowCount", FILAS_POR_DEFECTO),
+                        rejilla.get("columnCount", COLUMNAS_POR_DEFECTO),
+                    )
+                    respuestas.append({"addSheet": {"properties": hoja.propiedades()}})
+                else:
+                    raise _error_http(400, f"Petición no soportada por el servicio simulado: {list(peticion)}")
+            self._fake._marcar_modificado(spreadsheetId)
+            return {"spreadsheetId": spreadsheetId, "replies": respuestas}
+
+        return _Peticion(self._fake, "sheets.spreadsheets.batchUpdate", ejecutar, body)
+
+
+class _ServicioSheets:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def spreadsheets(self) -> _HojasDeCalculo:
+        return _HojasDeCalculo(self._fake)
+
+
+class _Ficheros:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def list(self, q="", fields=None, pageSize=100, **kwargs):
+        def ejecutar():
+            condiciones = self._fake._parsear_consulta(q)
+            encontrados = [f for f in self._fake._ficheros.values() if all(c(f) for c in condiciones)]
+            return {"files": [self._fake._metadatos(f) for f in encontrados[:pageSize]]}
+
+        return _Peticion(self._fake, "drive.files.list", ejecutar)
+
+    def get(self, fileId, fields=None, **kwargs):
+        return _Peticion(self._fake, "drive.files.get", lambda: self._fake._metadatos(self._fake._fichero(fileId)))
+
+    def get_media(self, fileId, **kwargs) -> _PeticionMedia:
+        return _PeticionMedia(self._fake, fileId)
+
+    def create(self, body, media_body=None, fields=None, **kwargs):
+        def ejecutar():
+            contenido = b""
+            mime = body.get("mimeType", "application/octet-stream")
+            if media_body is not None:
+                contenido = media_body.getbytes(0, media_body.size())
+                mime = body.get("mimeType") or media_body.mimetype()
+            fichero = self._fake._crear_fichero(body.get("name", ""), mime, body.get("parents", []), contenido)
+            return {"id": fichero["id"]}
+
+        return _Peticion(self._fake, "drive.files.create", ejecutar, body)
+
+    def delete(self, fileId, **kwargs):
+        def ejecutar():
+            self._fake._fichero(fileId)
+            del self._fake._ficheros[fileId]
+            self._fake._libros.pop(fileId, None)
+            return ""
+
+        return _Peticion(self._fake, "drive.files.delete", ejecutar)
+
+
+class _ServicioDrive:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def files(self) -> _Ficheros:
+        return _Ficheros(self._fake)
+
+
+class FakeGoogle:
+    """
+    Estado compartido por los servicios simulados de Sheets y Drive.
+    `latencia_ms` se añade a cada llamada (con hasta un 20 % de variación) y
+    `tasa_fallos` es la probabilidad de que una llamada falle con HttpError 503.
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, tasa_fallos: float = 0.0, semilla: int | None = None):
+        self.latencia_ms = latencia_ms
+        self.tasa_fallos = tasa_fallos
+        self._azar = random.Random(semilla)
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._ficheros = {}
+        self._libros = {}
+        self._fallos_forzados = 0
+        self.caido = False
+        self.colgado = False
+        self.llamadas = Counter()
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "FakeGoogle":
+        semilla = os.environ.get("FAKE_GOOGLE_SEMILLA")
+        return cls(
+            latencia_ms=float(os.environ.get("FAKE_GOOGLE_LATENCIA_MS", "0")),
+            tasa_fallos=float(os.environ.get("FAKE_GOOGLE_TASA_FALLOS", "0")),
+            semilla=int(semilla) if semilla else None,
+        )
+
+    # --- API pública del simulador ---
+
+    def sheets(self) -> _ServicioSheets:
+        return _ServicioSheets(self)
+
+    def drive(self) -> _ServicioDrive:
+        return _ServicioDrive(self)
+
+    def crear_hoja_calculo(self, nombre: str, spreadsheet_id: str | None = None, titulo_hoja: str = "Hoja 1") -> str:
+        """Crea un spreadsheet (y su fichero en Drive) con una primera pestaña vacía. Devuelve su id."""
+        with self._lock:
+            fichero = self._crear_fichero(nombre, MIME_HOJA_CALCULO, [], b"", spreadsheet_id, titulo_hoja)
+            return fichero["id"]
+
+    def valores(self, spreadsheet_id: str, titulo_hoja: str) -> list:
+        """Contenido actual de una pestaña (para comprobaciones en pruebas)."""
+        with self._lock:
+            hoja = self._hoja_calculo(spreadsheet_id).hojas[titulo_hoja]
+            return [list(f) for f in hoja.celdas]
+
+    def fallar_siguientes(self, n: int = 1) -> None:
+        """Hace que las próximas `n` llamadas fallen con HttpError 503, sin depender del azar."""
+        with self._lock:
+            self._fallos_forzados += n
+
+    def simular_caida(self, caido: bool = True) -> None:
+        """Mientras dure, todas las llamadas fallan con TimeoutError, como con la red caída."""
+        with self._lock:
+            self.caido = caido
+
+    def simular_cuelgue(self, colgado: bool = True) -> None:
+        """
+        Mientras dure, Google acepta la conexión y no responde: cada llamada se queda esperando
+        llamadas_api.TIMEOUT_SEGUNDOS (el timeout del transporte real) y falla con TimeoutError.
+        """
+        with self._lock:
+            self.colgado = colgado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "llamadas": dict(self.llamadas),
+                "total_llamadas": sum(self.llamadas.values()),
+                "bytes_enviados": self.bytes_enviados,
+                "bytes_recibidos": self.bytes_recibidos,
+            }
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._lock:
+            self.llamadas.clear()
+            self.bytes_enviados = 0
+            self.bytes_recibidos = 0
+
+    # --- Latencia, fallos y contadores ---
+
+    def _antes_de_llamar(self, metodo: str, cuerpo) -> None:
+        with self._lock:
+            self.llamadas[metodo] += 1
+            self.bytes_enviados += _tamano(cuerpo)
+            fallar = self._fallos_forzados > 0 or (self.tasa_fallos and self._azar.random() < self.tasa_fallos)
+            if self._fallos_forzados > 0:
+                self._fallos_forzados -= 1
+            espera = self.latencia_ms * (0.8 + 0.4 * self._azar.random()) / 1000 if self.latencia_ms else 0.0
+        if self.colgado:
+            espera = max(espera, llamadas_api.TIMEOUT_SEGUNDOS)
+        if espera:
+            time.sleep(espera)
+        if self.caido or self.colgado:
+            raise TimeoutError(f"timed out ({metodo})")
+        if fallar:
+            raise _error_http(503, f"The service is currently unavailable ({metodo}).")
+
+    def _despues_de_llamar(self, respuesta) -> None:
+        with self._lock:
+            self.bytes_recibidos += _tamano(respuesta)
+
+    # --- Drive ---
+
+    def _crear_fichero(
+        self,
+        nombre: str,
+        mime: str,
+        padres: list,
+        contenido: bytes,
+        file_id: str | None = None,
+        titulo_hoja: str = "Hoja 1",
+    ) -> dict:
+        file_id = file_id or f"fake-{next(self._ids):06d}"
+        fichero = {
+            "id": file_id,
+            "name": nombre,
+            "mimeType": mime,
+            "parents": list(padres),
+            "createdTime": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "trashed": False,
+            "version": 1,
+            "contenido": contenido,
+        }
+        self._ficheros[file_id] = fichero
+        if mime == MIME_HOJA_CALCULO:
+            libro = _HojaCalculo(file_id, nombre)
+            libro.anadir_hoja(titulo_hoja)
+            self._libros[file_id] = libro
+        return fichero
+
+    def _fichero(self, file_id: str) -> dict:
+        fichero = self._ficheros.get(file_id)
+        if fichero is None:
+            raise _error_http(404, f"File not found: {file_id}.")
+        return fichero
+
+    def _metadatos(self, fichero: dict) -> dict:
+        datos = {k: v for k, v in fichero.items() if k != "contenido"}
+        datos["version"] = str(fichero["version"])
+        datos["size"] = str(len(fichero["contenido"]))
+        return datos
+
+    def _parsear_consulta(self, q: str) -> list:
+        """Traduce el subconjunto de la sintaxis `q` de Drive que usa la aplicación a predicados."""
+        condiciones = []
+        for clausula in re.split(r"\s+and\s+", q.strip(), flags=re.IGNORECASE) if q.strip() else []:
+            clausula = clausula.strip()
+            m = re.fullmatch(r"(name|mimeType)\s*=\s*'((?:[^'\\]|\\.)*)'", clausula)
+            if m:
+                campo, valor = m.group(1), m.group(2).replace("\\'", "'")
+                condiciones.append(lambda f, campo=campo, valor=valor: f[campo] == valor)
+                continue
+            m = re.fullmatch(r"trashed\s*=\s*(true|false)", clausula, flags=re.IGNORECASE)
+            if m:
+                valor = m.group(1).lower() == "true"
+                condiciones.append(lambda f, valor=valor: f["trashed"] == valor)
+                continue
+            m = re.fullmatch(r"'([^']*)'\s+in\s+parents", clausula)
+            if m:
+                condiciones.append(lambda f, padre=m.group(1): padre in f["parents"])
+                continue
+            raise _error_http(400, f"Invalid Value: consulta no soportada por el servicio simulado: {clausula}")
+        return condiciones
+
+    # --- Sheets ---
+
+    def _hoja_calculo(self, spreadsheet_id: str) -> _HojaCalculo:
+        libro = self._libros.get(spreadsheet_id)
+        if libro is None:
+            raise _error_http(404, f"Requested entity was not found: {spreadsheet_id}.")
+        return libro
+
+    def _marcar_modificado(self, spreadsheet_id: str) -> None:
+        self._ficheros[spreadsheet_id]["version"] += 1
+
+    def _leer_rango(self, spreadsheet_id: str, a1: str, dimension: str = "ROWS") -> dict:
+        hoja, r1, c1, r2, c2 = self._hoja_calculo(spreadsheet_id).rango(a1)
+        filas = hoja.leer(r1, c1, r2, c2)
+        respuesta = {"range": a1, "majorDimension": dimension}
+        if dimension == "COLUMNS":
+            ancho = max((len(f) for f in filas), default=0)
+            columnas = [_recortar([f[j] if j < len(f) else "" for f in filas]) for j in range(ancho)]
+            filas = columnas
+        if filas:
+            respuesta["values"] = filas
+        return respuesta
+
+    def _escribir_rango(self, spreadsheet_id: str, a1: str, valores: list) -> dict:
+        hoja, r1, c1, _, _ = self._hoja_calculo(spreadsheet_id).rango(a1)
+        celdas = hoja.escribir(r1, c1, valores)
+        self._marcar_modificado(spreadsheet_id)
+        return {"spreadsheetId": spreadsheet_id, "updatedRange": a1, "updatedRows": len(valores), "updatedCells": celdas}
+
+    def _anadir_filas(self, spreadsheet_id: str, a1: str, valores: list) -> dict:
+        hoja, _, c1, _, c2 = self._hoja_calculo(spreadsheet_id).rango(a1)
+        destino = hoja.ultima_fila_con_datos(c1, c2) + 1
+        celdas = hoja.escribir(destino, c1, valores)
+        self._marcar_modificado(spreadsheet_id)
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "updates": {"updatedRange": f"{hoja.titulo}!A{destino + 1}", "updatedRows": len(valores), "updatedCells": celdas},
+        }
+
+    def _limpiar_rango(self, spreadsheet_id: str, a1: str) -> dict:
+        hoja, r1, c1, r2, c2 = self._hoja_calculo(spreadsheet_id).rango(a1)
+        hoja.limpiar(r1, c1, r2, c2)
+        self._marcar_modificado(spreadsheet_id)
+        return {"spreadsheetId": spreadsheet_id, "clearedRange": a1}
@@ -0,0 +1,322 @@
+# core/llamadas_api.py
+"""
+Punto único por el que pasan todas las llamadas a las APIs de Google.
+
+- Limitador de ritmo por grupo de cuota (lecturas de Sheets, escrituras de Sheets y Drive),
+  compartido por todas las sesiones del proceso: las cuotas de Sheets son por usuario y minuto.
+- Tope de llamadas simultáneas por endpoint.
+- Reintentos con espera exponencial aleatoria (full jitter) ante 429, 5xx y cortes de conexión.
+  Las llamadas que no son idempotentes (append, create) solo se reintentan ante 429,
+  que garantiza que la petición no se aplicó.
+- Cortacircuitos: tras varios fallos seguidos de red o 5xx se deja de llamar a Google
+  durante un enfriamiento y las llamadas fallan al instante con CircuitoAbierto; pasado
+  el enfriamiento, una única llamada de prueba decide si se cierra o vuelve a abrirse.
+  Un timeout no se reintenta si el siguiente fallo abriría el circuito: otro timeout
+  completo solo retrasaría el paso a la cola offline.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from googleapiclient.errors import HttpError
+
+# Cuota de Sheets: 60 lecturas y 60 escrituras por minuto y usuario. 0 desactiva el límite.
+CUOTA_SHEETS_POR_MINUTO = float(os.environ.get("SOCIOS_API_CUOTA_POR_MINUTO", "60"))
+CUOTA_DRIVE_POR_MINUTO = float(os.environ.get("SOCIOS_API_CUOTA_DRIVE_POR_MINUTO", "600"))
+CONCURRENCIA_POR_ENDPOINT = int(os.environ.get("SOCIOS_API_CONCURRENCIA", "4"))
+REINTENTOS_MAXIMOS = int(os.environ.get("SOCIOS_API_REINTENTOS", "4"))
+# Tiempo máximo de espera de cada llamada (timeout del socket de los transportes HTTP).
+# httplib2 lo aplica a cada operación del socket (conectar, cada lectura), no a la respuesta
+# entera: una descarga grande que sigue recibiendo datos no se corta.
+TIMEOUT_SEGUNDOS = float(os.environ.get("SOCIOS_API_TIMEOUT", "5"))
+UMBRAL_FALLOS_CIRCUITO = int(os.environ.get("SOCIOS_CIRCUITO_FALLOS", "3"))
+ENFRIAMIENTO_CIRCUITO_SEGUNDOS = float(os.environ.get("SOCIOS_CIRCUITO_ENFRIAMIENTO", "30"))
+ESPERA_BASE_SEGUNDOS = 0.5
+ESPERA_MAXIMA_SEGUNDOS = 16.0
+
+CODIGOS_REINTENTABLES = {500, 502, 503, 504}
+METODOS_NO_IDEMPOTENTES = {
+    "sheets.spreadsheets.values.append",
+    "drive.files.create",
+}
+
+
+class CircuitoAbierto(ConnectionError):
+    """Google se da por caído: la llamada ni siquiera se intenta."""
+
+
+class _Circuito:
+    """Cortacircuitos cerrado → abierto → semiabierto (una sola llamada de prueba) → cerrado."""
+
+    def __init__(self, umbral: int, enfriamiento: float):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.estado = "cerrado"
+        self.aperturas = 0
+        self.rechazadas = 0
+        self._fallos = 0
+        self._abierto_en = 0.0
+        self._sonda_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> None:
+        """Lanza CircuitoAbierto si la llamada no debe intentarse."""
+        with self._lock:
+            if self.estado == "cerrado":
+                return
+            if self.estado == "abierto" and time.monotonic() - self._abierto_en >= self.enfriamiento:
+                self.estado = "semiabierto"
+                self._sonda_en_curso = False
+            if self.estado == "semiabierto" and not self._sonda_en_curso:
+                self._sonda_en_curso = True
+                return
+            self.rechazadas += 1
+        raise CircuitoAbierto("Google no responde; se volverá a intentar en unos segundos.")
+
+    def exito(self) -> None:
+        with self._lock:
+            self.estado = "cerrado"
+            self._fallos = 0
+            self._sonda_en_curso = False
+
+    def fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self.estado == "semiabierto" or self._fallos >= self.umbral:
+                if self.estado != "abierto":
+                    self.aperturas += 1
+                self.estado = "abierto"
+                self._abierto_en = time.monotonic()
+                self._sonda_en_curso = False
+
+    def falta_un_fallo(self) -> bool:
+        """True si un fallo más abriría el circuito."""
+        with self._lock:
+            return self.estado == "semiabierto" or self._fallos >= self.umbral - 1
+
+    def abierto(self) -> bool:
+        with self._lock:
+            return self.estado == "abierto" and time.monotonic() - self._abierto_en < self.enfriamiento
+
+
+_circuito = _Circuito(UMBRAL_FALLOS_CIRCUITO, ENFRIAMIENTO_CIRCUITO_SEGUNDOS)
+
+
+class _CuboTokens:
+    """Limitador token bucket: `por_minuto` llamadas sostenidas con ráfagas de hasta un minuto de cuota."""
+
+    def __init__(self, por_minuto: float):
+        self.por_segundo = por_minuto / 60
+        self.capacidad = max(1.0, por_minuto)
+        self._tokens = self.capacidad
+        self._actualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self) -> float:
+        """Toma un token, esperando si no quedan. Devuelve los segundos de espera."""
+        if self.por_segundo <= 0:
+            return 0.0
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._actualizado) * self.por_segundo)
+                self._actualizado = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return esperado
+                falta = (1 - self._tokens) / self.por_segundo
+            time.sleep(falta)
+            esperado += falta
+
+
+_cubos = {
+    "sheets.lectura": _CuboTokens(CUOTA_SHEETS_POR_MINUTO),
+    "sheets.escritura": _CuboTokens(CUOTA_SHEETS_POR_MINUTO),
+    "drive": _CuboTokens(CUOTA_DRIVE_POR_MINUTO),
+}
+_semaforos = {}
+_semaforos_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "llamadas": 0,
+    "limitadas": 0,
+    "segundos_limitadas": 0.0,
+    "reintentos": 0,
+    "fallidas": 0,
+}
+_llamadas_por_endpoint = Counter()
+# Contador de la ejecución en curso (un rerun de Streamlit); lo fija core.data_manager.
+_contador_ejecucion = contextvars.ContextVar("contador_ejecucion", default=None)
+
+
+def fijar_contador_ejecucion(contador: Counter | None) -> None:
+    """Las llamadas hechas desde este contexto (y los que se copien de él) se suman a `contador`."""
+    _contador_ejecucion.set(contador)
+
+
+def _grupo_cuota(metodo: str) -> str:
+    if metodo.startswith("drive."):
+        return "drive"
+    if metodo.endswith((".get", ".batchGet")):
+        return "sheets.lectura"
+    return "sheets.escritura"
+
+
+def _semaforo(metodo: str) -> threading.BoundedSemaphore:
+    with _semaforos_lock:
+        semaforo = _semaforos.get(metodo)
+        if semaforo is None:
+            semaforo = _semaforos[metodo] = threading.BoundedSemaphore(CONCURRENCIA_POR_ENDPOINT)
+        return semaforo
+
+
+def _contar(clave: str, cantidad=1) -> None:
+    with _stats_lock:
+        _stats[clave] += cantidad
+
+
+def _es_fallo_de_servicio(error: Exception) -> bool:
+    """Errores que indican que Google (o la red) no está disponible; un 4xx sí es una respuesta."""
+    if isinstance(error, HttpError):
+        return error.resp.status >= 500
+    return True
+
+
+def _es_reintentable(error: Exception, idempotente: bool) -> bool:
+    if isinstance(error, HttpError):
+        estado = error.resp.status
+        if estado == 429:
+            return True
+        if estado == 403 and "ratelimitexceeded" in str(error).lower():
+            return True
+        return idempotente and estado in CODIGOS_REINTENTABLES
+    return idempotente and isinstance(error, (TimeoutError, ConnectionResetError))
+
+
+def _espera_reintento(intento: int, error: Exception) -> float:
+    """Espera antes del reintento `intento` (desde 1): la que pida el servidor o full jitter."""
+    if isinstance(error, HttpError):
+        retry_after = error.resp.get("retry-after")
+        if retry_after:
+            try:
+                return min(ESPERA_MAXIMA_SEGUNDOS, float(retry_after))
+            except ValueError:
+                pass
+    return random.uniform(0, min(ESPERA_MAXIMA_SEGUNDOS, ESPERA_BASE_SEGUNDOS * 2**intento))
+
+
+def llamar(metodo: str, funcion, idempotente: bool | None = None):
+    """Ejecuta `funcion()` (una llamada a la API `metodo`) con cuota, tope de concurrencia y reintentos."""
+    if idempotente is None:
+        idempotente = metodo not in METODOS_NO_IDEMPOTENTES
+    cubo = _cubos[_grupo_cuota(metodo)]
+    intento = 0
+    while True:
+        _circuito.permitir()
+        espera = cubo.adquirir()
+        if espera:
+            with _stats_lock:
+                _stats["limitadas"] += 1
+                _stats["segundos_limitadas"] += espera
+        with _semaforo(metodo):
+            with _stats_lock:
+                _stats["llamadas"] += 1
+                _llamadas_por_endpoint[metodo] += 1
+                contador = _contador_ejecucion.get()
+                if contador is not None:
+                    contador[metodo] += 1
+            try:
+                resultado = funcion()
+                _circuito.exito()
+                return resultado
+            except Exception as e:
+                if _es_fallo_de_servicio(e):
+                    _circuito.fallo()
+                else:
+                    _circuito.exito()
+                # Si este fallo abre el circuito no tiene sentido esperar para reintentar; tras un
+                # timeout tampoco si el reintento, de volver a agotar el timeout, lo abriría.
+                if (
+                    intento >= REINTENTOS_MAXIMOS
+                    or not _es_reintentable(e, idempotente)
+                    or _circuito.abierto()
+                    or (isinstance(e, TimeoutError) and _circuito.falta_un_fallo())
+                ):
+                    _contar("fallidas")
+                    raise
+                error = e
+        intento += 1
+        _contar("reintentos")
+        time.sleep(_espera_reintento(intento, error))
+
+
+class PeticionControlada:
+    """
+    Envuelve un HttpRequest para que execute() pase por llamar(); el resto de atributos se delega.
+    Si hay `transportes` (un pool con prestar()) y no se pasa `http`, cada intento usa un
+    transporte prestado por el pool en lugar del compartido del servicio.
+    """
+
+    def __init__(self, peticion, transportes=None):
+        self._peticion = peticion
+        self._transportes = transportes
+
+    def __getattr__(self, nombre):
+        return getattr(self._peticion, nombre)
+
+    def execute(self, http=None, num_retries=0):
+        metodo = getattr(self._peticion, "methodId", None) or "desconocido"
+        if http is None and self._transportes is not None:
+            return llamar(metodo, self._ejecutar_con_transporte_prestado)
+        return llamar(metodo, lambda: self._peticion.execute(http=http))
+
+    def _ejecutar_con_transporte_prestado(self):
+        with self._transportes.prestar() as http:
+            return self._peticion.execute(http=http)
+
+
+class ServicioControlado:
+    """
+    Envuelve un servicio de googleapiclient (o el simulador) sin cambiar su forma de uso:
+    `servicio.spreadsheets().values().get(...).execute()` sigue funcionando igual.
+    """
+
+    def __init__(self, recurso, transportes=None):
+        self._recurso = recurso
+        self._transportes = transportes
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._recurso, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def llamada(*args, **kwargs):
+            resultado = atributo(*args, **kwargs)
+            if hasattr(resultado, "execute"):
+                return PeticionControlada(resultado, self._transportes)
+            return ServicioControlado(resultado, self._transportes)
+
+        return llamada
+
+
+def circuito_abierto() -> bool:
+    """True mientras Google se da por caído (hasta que pase el enfriamiento)."""
+    return _circuito.abierto()
+
+
+def obtener_estadisticas() -> dict:
+    with _stats_lock:
+        return {
+            **_stats,
+            "segundos_limitadas": round(_stats["segundos_limitadas"], 3),
+            "por_endpoint": dict(_llamadas_por_endpoint),
+            "circuito": {
+                "estado": _circuito.estado,
+                "aperturas": _circuito.aperturas,
+                "rechazadas": _circuito.rechazadas,
+            },
+        }
@@ -0,0 +1,136 @@
+# core/socio_store.py
+from collections import defaultdict
+
+import pandas as pd
+
+from core.data_manager import texto_en_hoja, valor_tipado
+
+INDICES_SECUNDARIOS = ("Estado", "Estado de pago")
+
+
+def _clave(valor) -> str:
+    return str(valor if valor is not None else "").strip()
+
+
+def _clave_dni(dni) -> str:
+    return _clave(dni).upper()
+
+
+class SocioStore:
+    """
+    Envuelve el DataFrame de socios con un índice hash por DNI y índices secundarios
+    por «Estado» y «Estado de pago», para no recorrer la tabla en cada acción.
+    Todas las modificaciones deben pasar por update/set_status para mantener los índices.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._por_dni = {}
+        self._secundarios = {col: defaultdict(set) for col in INDICES_SECUNDARIOS}
+        self._indices_compartidos = False
+        for etiqueta, dni in df["DNI"].items():
+            # Ante DNIs repetidos se conserva la primera fila, como en la hoja.
+            self._por_dni.setdefault(_clave_dni(dni), etiqueta)
+        for col, indice in self._secundarios.items():
+            for etiqueta, valor in df[col].items():
+                indice[_clave(valor)].add(etiqueta)
+
+    def copia(self) -> "SocioStore":
+        """
+        Store sobre una copia de la tabla que comparte los índices con este hasta la primera
+        modificación, así que construirlo no recorre la tabla.
+        """
+        nuevo = SocioStore.__new__(SocioStore)
+        nuevo.df = self.df.copy()
+        nuevo._por_dni = self._por_dni
+        nuevo._secundarios = self._secundarios
+        nuevo._indices_compartidos = True
+        return nuevo
+
+    def _indices_propios(self) -> None:
+        """Copia los índices compartidos antes de modificarlos (ver copia)."""
+        if self._indices_compartidos:
+            self._por_dni = dict(self._por_dni)
+            self._secundarios = {
+                col: defaultdict(set, {clave: set(etiquetas) for clave, etiquetas in indice.items()})
+                for col, indice in self._secundarios.items()
+            }
+            self._indices_compartidos = False
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __contains__(self, dni) -> bool:
+        return _clave_dni(dni) in self._por_dni
+
+    def _etiqueta(self, dni):
+        etiqueta = self._por_dni.get(_clave_dni(dni))
+        if etiqueta is None:
+            raise KeyError(f"No existe ningún socio con DNI {dni}")
+        return etiqueta
+
+    def get(self, dni) -> dict | None:
+        """Devuelve la ficha del socio como diccionario, o None si no existe."""
+        etiqueta = self._por_dni.get(_clave_dni(dni))
+        if etiqueta is None:
+            return None
+        return self.df.loc[etiqueta].to_dict()
+
+    def _asignar(self, etiqueta, campo, valor) -> None:
+        """Escribe una celda respetando el tipo de la columna (categorías nuevas, fechas en texto)."""
+        if campo in self.df.columns:
+            serie = self.df[campo]
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                valor = valor_tipado(campo, valor)
+            elif isinstance(serie.dtype, pd.CategoricalDtype) and pd.notna(valor) and valor not in serie.cat.categories:
+                self.df[campo] = serie.cat.add_categories([valor])
+        self.df.at[etiqueta, campo] = valor
+
+    def update(self, dni, campos: dict) -> dict:
+        """
+        Aplica `campos` (valores como se escriben en la hoja) a la fila del socio y mantiene
+        los índices. Devuelve solo los campos que cambiaron como {campo: (anterior, nuevo)},
+        en texto de hoja. Lanza KeyError si el DNI no existe y ValueError si una fecha no
+        tiene el formato de su columna.
+        """
+        etiqueta = self._etiqueta(dni)
+        cambios = {}
+        for campo, nuevo in campos.items():
+            anterior = texto_en_hoja(campo, self.df.at[etiqueta, campo]) if campo in self.df.columns else ""
+            if anterior == texto_en_hoja(campo, nuevo):
+                continue
+            self._asignar(etiqueta, campo, nuevo)
+            cambios[campo] = (anterior, texto_en_hoja(campo, nuevo))
+            if campo == "DNI" or campo in self._secundarios:
+                self._indices_propios()
+            if campo == "DNI":
+                del self._por_dni[_clave_dni(anterior)]
+                self._por_dni[_clave_dni(nuevo)] = etiqueta
+            elif campo in self._secundarios:
+                indice = self._secundarios[campo]
+                indice[_clave(anterior)].discard(etiqueta)
+                indice[_clave(nuevo)].add(etiqueta)
+        return cambios
+
+    def set_status(self, dni, estado: str | None = None, estado_pago: str | None = None, fecha_pago: str | None = None) -> dict:
+        """Atajo para cambiar el estado del socio y/o su estado de pago (con la fecha del pago)."""
+        campos = {}
+        if estado is not None:
+            campos["Estado"] = estado
+        if estado_pago is not None:
+            campos["Estado de pago"] = estado_pago
+        if fecha_pago is not None:
+            campos["Fecha último pago"] = fecha_pago
+        return self.update(dni, campos)
+
+    def filtrar(self, estado: str | None = None, estado_pago: str | None = None) -> pd.DataFrame:
+        """Socios con el estado y/o estado de pago indicados, en el orden de la hoja."""
+        conjuntos = []
+        if estado is not None:
+            conjuntos.append(self._secundarios["Estado"].get(_clave(estado), set()))
+        if estado_pago is not None:
+            conjuntos.append(self._secundarios["Estado de pago"].get(_clave(estado_pago), set()))
+        if not conjuntos:
+            return self.df
+        etiquetas = set.intersection(*conjuntos)
+        return self.df.loc[sorted(etiquetas)] if etiquetas else self.df.iloc[0:0]
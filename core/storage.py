@@ -0,0 +1,229 @@
+# core/storage.py
+"""
+Backends de almacenamiento de socios y logs.
+
+data_manager conserva la caché de proceso, la foto para escribir diferencias y la cola
+offline; un backend solo sabe leer y escribir filas de texto con el esquema que recibe.
+"""
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+FORMATO_FECHA = "%d-%m-%Y %H:%M:%S"
+
+
+class BackendSocios(ABC):
+    """
+    Interfaz común de almacenamiento. Las filas viajan siempre como texto y en el orden
+    de las columnas del esquema; el DataFrame de socios conserva el orden de inserción.
+    """
+
+    nombre = ""
+
+    @abstractmethod
+    def descargar_socios(self, http=None) -> tuple:
+        """Devuelve (DataFrame con todas las filas, cabecera_ok)."""
+
+    @abstractmethod
+    def descargar_columnas(self, columnas: list) -> pd.DataFrame:
+        """Devuelve solo las columnas indicadas, en el orden de las filas."""
+
+    def firma(self, http=None) -> str | None:
+        """Identificador barato que cambia con cualquier escritura; None si no se puede obtener."""
+        return None
+
+    @abstractmethod
+    def escribir_socios(self, anterior: pd.DataFrame | None, nuevo: pd.DataFrame) -> None:
+        """
+        Persiste `nuevo`; `anterior` es el último contenido conocido (None obliga a reescribir todo).
+        Con `anterior`, la escritura es condicional: si alguna fila que cambia ya no tiene en el
+        almacenamiento la versión de `anterior` (o hay filas nuevas de otra instancia), lanza
+        ConflictoVersiones sin escribir nada.
+        """
+
+    @abstractmethod
+    def insertar_socio(self, fila: list) -> None:
+        """Añade la fila al final."""
+
+    @abstractmethod
+    def registrar_log(self, fila: list) -> None:
+        """Añade un evento al registro."""
+
+    @abstractmethod
+    def historial_logs(self, dni: str, limite: int) -> list:
+        """Últimos `limite` eventos del DNI, del más reciente al más antiguo."""
+
+
+class ConflictoVersiones(Exception):
+    """
+    Alguna fila que se iba a escribir ya no tiene la versión de la foto `anterior`: otra
+    instancia la modificó entretanto. No se ha escrito nada; hay que releer y rebasar.
+    """
+
+    def __init__(self, posiciones: list):
+        super().__init__(f"Filas modificadas por otra instancia: {posiciones[:10]}")
+        self.posiciones = posiciones
+
+
+def _fecha_iso(valor: str) -> str:
+    """Convierte «dd-mm-aaaa hh:mm:ss» a ISO para ordenar los logs por fecha; "" si no es una fecha."""
+    try:
+        return datetime.strptime(str(valor).strip(), FORMATO_FECHA).isoformat(sep=" ")
+    except ValueError:
+        return ""
+
+
+def _ident(nombre: str) -> str:
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+class SQLiteBackend(BackendSocios):
+    """
+    Base de datos local en un único fichero. Pensada para un gimnasio con un solo servidor:
+    la tabla de socios se lee entera a la caché del proceso y las búsquedas por DNI o estado
+    las resuelve SocioStore en memoria, así que la tabla no lleva índices secundarios.
+    Cada hilo usa su propia conexión; el modo WAL permite leer mientras otro proceso escribe.
+    """
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta: Path, columnas: list, columnas_log: list, columna_version: str | None = None):
+        self.ruta = Path(ruta)
+        self.columnas = list(columnas)
+        self.columnas_log = list(columnas_log)
+        self.columna_version = columna_version
+        self._local = threading.local()
+        self._crear_esquema()
+
+    def _conexion(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _crear_esquema(self) -> None:
+        columnas = ", ".join(f"{_ident(c)} TEXT NOT NULL DEFAULT ''" for c in self.columnas)
+        columnas_log = ", ".join(f"{_ident(c)} TEXT NOT NULL DEFAULT ''" for c in self.columnas_log)
+        con = self._conexion()
+        with con:
+            con.execute(f"CREATE TABLE IF NOT EXISTS socios (pos INTEGER PRIMARY KEY, {columnas})")
+            # Bases creadas con un esquema anterior: las columnas nuevas se añaden vacías.
+            existentes = {fila[1] for fila in con.execute("PRAGMA table_info(socios)")}
+            for col in self.columnas:
+                if col not in existentes:
+                    con.execute(f"ALTER TABLE socios ADD COLUMN {_ident(col)} TEXT NOT NULL DEFAULT ''")
+            con.execute(f"CREATE TABLE IF NOT EXISTS logs (id INTEGER PRIMARY KEY AUTOINCREMENT, {columnas_log}, fecha_iso TEXT NOT NULL DEFAULT '')")
+            con.execute("CREATE INDEX IF NOT EXISTS logs_idx_dni ON logs (DNI, fecha_iso)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+            con.execute("INSERT OR IGNORE INTO meta VALUES ('revision', '0')")
+
+    def _subir_revision(self, con: sqlite3.Connection) -> None:
+        con.execute("UPDATE meta SET valor = CAST(valor AS INTEGER) + 1 WHERE clave = 'revision'")
+
+    def _filas_socios(self, df: pd.DataFrame) -> list:
+        """Tuplas (pos, columnas...); la posición es la etiqueta de la fila en `df`."""
+        return [(int(pos), *fila) for pos, fila in zip(df.index, df[self.columnas].values.tolist())]
+
+    def _sql_insertar_socios(self) -> str:
+        nombres = ", ".join(["pos", *map(_ident, self.columnas)])
+        marcas = ", ".join("?" * (len(self.columnas) + 1))
+        return f"INSERT INTO socios ({nombres}) VALUES ({marcas})"
+
+    def esta_vacia(self) -> bool:
+        return self._conexion().execute("SELECT NOT EXISTS (SELECT 1 FROM socios)").fetchone()[0] == 1
+
+    def descargar_socios(self, http=None) -> tuple:
+        cursor = self._conexion().execute(
+            f"SELECT {', '.join(map(_ident, self.columnas))} FROM socios ORDER BY pos"
+        )
+        return pd.DataFrame(cursor.fetchall(), columns=self.columnas), True
+
+    def descargar_columnas(self, columnas: list) -> pd.DataFrame:
+        cursor = self._conexion().execute(f"SELECT {', '.join(map(_ident, columnas))} FROM socios ORDER BY pos")
+        return pd.DataFrame(cursor.fetchall(), columns=columnas)
+
+    def firma(self, http=None) -> str | None:
+        fila = self._conexion().execute("SELECT valor FROM meta WHERE clave = 'revision'").fetchone()
+        return fila[0] if fila else None
+
+    def _comprobar_versiones(self, con: sqlite3.Connection, anterior: pd.DataFrame) -> None:
+        """Lanza ConflictoVersiones si la tabla ya no es `anterior` (filas añadidas, con otro DNI o con otra versión)."""
+        actuales = con.execute(f"SELECT DNI, {_ident(self.columna_version)} FROM socios ORDER BY pos").fetchall()
+        esperadas = list(zip(anterior["DNI"].tolist(), anterior[self.columna_version].tolist()))
+        if len(actuales) != len(esperadas):
+            raise ConflictoVersiones(list(range(min(len(actuales), len(esperadas)), max(len(actuales), len(esperadas)))))
+        distintas = [pos for pos, (a, e) in enumerate(zip(actuales, esperadas)) if a != e]
+        if distintas:
+            raise ConflictoVersiones(distintas)
+
+    def escribir_socios(self, anterior: pd.DataFrame | None, nuevo: pd.DataFrame) -> None:
+        nuevo = nuevo[self.columnas].reset_index(drop=True)
+        condicional = anterior is not None and self.columna_version is not None
+        con = self._conexion()
+        with con:
+            if condicional:
+                # Bloquea la base para escribir desde ya: otro proceso no puede colarse entre la comprobación y la escritura.
+                con.execute("BEGIN IMMEDIATE")
+            comunes = 0 if anterior is None else len(anterior)
+            dni_idx = self.columnas.index("DNI")
+            reescribir = (
+                anterior is None
+                or len(nuevo) < comunes
+                or (nuevo.values[:comunes, dni_idx] != anterior.values[:, dni_idx]).any()
+            )
+            if reescribir:
+                if condicional:
+                    self._comprobar_versiones(con, anterior)
+                con.execute("DELETE FROM socios")
+                con.executemany(self._sql_insertar_socios(), self._filas_socios(nuevo))
+            else:
+                cambiadas = (nuevo.values[:comunes] != anterior.values).any(axis=1).nonzero()[0]
+                if condicional and len(nuevo) > comunes:
+                    (total,) = con.execute("SELECT COUNT(*) FROM socios").fetchone()
+                    if total != comunes:
+                        raise ConflictoVersiones(list(range(comunes, total)))
+                if len(cambiadas):
+                    asignaciones = ", ".join(f"{_ident(c)} = ?" for c in self.columnas)
+                    filas = [(*fila[1:], fila[0]) for fila in self._filas_socios(nuevo.iloc[cambiadas])]
+                    sql = f"UPDATE socios SET {asignaciones} WHERE pos = ?"
+                    if condicional:
+                        # Solo se actualiza la fila si conserva el DNI y la versión de la foto.
+                        sql += f" AND DNI = ? AND {_ident(self.columna_version)} = ?"
+                        dnis = anterior["DNI"].to_numpy()[cambiadas]
+                        versiones = anterior[self.columna_version].to_numpy()[cambiadas]
+                        filas = [(*fila, dni, version) for fila, dni, version in zip(filas, dnis, versiones)]
+                    cursor = con.executemany(sql, filas)
+                    if condicional and cursor.rowcount != len(filas):
+                        raise ConflictoVersiones(cambiadas.tolist())
+                if len(nuevo) > comunes:
+                    con.executemany(self._sql_insertar_socios(), self._filas_socios(nuevo.iloc[comunes:]))
+            self._subir_revision(con)
+
+    def insertar_socio(self, fila: list) -> None:
+        con = self._conexion()
+        with con:
+            siguiente = con.execute("SELECT COALESCE(MAX(pos) + 1, 0) FROM socios").fetchone()[0]
+            nueva = pd.DataFrame([fila], columns=self.columnas, index=[siguiente])
+            con.execute(self._sql_insertar_socios(), self._filas_socios(nueva)[0])
+            self._subir_revision(con)
+
+    def registrar_log(self, fila: list) -> None:
+        nombres = ", ".join([*map(_ident, self.columnas_log), "fecha_iso"])
+        marcas = ", ".join("?" * (len(self.columnas_log) + 1))
+        con = self._conexion()
+        with con:
+            con.execute(f"INSERT INTO logs ({nombres}) VALUES ({marcas})", (*fila, _fecha_iso(fila[0])))
+
+    def historial_logs(self, dni: str, limite: int) -> list:
+        cursor = self._conexion().execute(
+            f"SELECT {', '.join(map(_ident, self.columnas_log))} FROM logs WHERE DNI = ? ORDER BY fecha_iso DESC, id DESC LIMIT ?",
+            (str(dni), limite),
+        )
+        return [dict(zip(self.columnas_log, fila)) for fila in cursor.fetchall()]
@@ -1,19 +1,14 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
 import pytz
 import time
-from core.data_manager import cargar_datos, guardar_datos, registrar_log, upload_pdf_to_drive, ensure_person_folder
+from core.data_manager import existe_dni, insertar_socio, registrar_log, upload_pdf_to_drive, ensure_person_folder
 from pathlib import Path
 import base64
 import re  # 🔹 Para validaciones con expresiones regulares
 from io import BytesIO
 import io
 from PIL import Image
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas as reportlab_canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from components.signature_pad import signature_pad
 
 BASE_PDF = Path("assets/Consentimiento Fines Promocionales_NICOVA.pdf")
@@ -116,6 +111,13 @@ def _generar_pdf_firmado(
     x: int = 350,
     y: int = 120,
 ) -> bytes:
+    # PyPDF2 y reportlab pesan al importarse y solo hacen falta al confirmar un alta
+    # (editar también importa este módulo).
+    from PyPDF2 import PdfReader, PdfWriter
+    from reportlab.pdfgen import canvas as reportlab_canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+
     reader = PdfReader(str(pdf_base))
     writer = PdfWriter()
     total_paginas = len(reader.pages)
@@ -191,8 +193,6 @@ def mostrar_alta():
         if key not in st.session_state:
             st.session_state[key] = default
 
-    socios = cargar_datos()
-
     # --- PASO 0: Fecha de nacimiento ---
     if not st.session_state.fecha_nacimiento:
         st.info("Introduce la fecha de nacimiento para determinar el plan adecuado.")
@@ -344,7 +344,7 @@ def mostrar_alta():
                 errores.append("El teléfono debe tener 9 dígitos y empezar por 6, 7 o 9.")
             elif not re.fullmatch(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", email.strip().lower()):
                 errores.append("El correo electrónico no tiene un formato válido.")
-            elif dni.strip().upper() in socios["DNI"].values:
+            elif existe_dni(dni):
                 errores.append("Este socio ya existe (DNI duplicado).")
 
             if errores:
@@ -524,8 +524,9 @@ def mostrar_alta():
             # Ya no hay documentos pendientes; continuar con guardado final
             nuevo = st.session_state.nuevo_socio
 
-            socios = pd.concat([socios, pd.DataFrame([nuevo])], ignore_index=True)
-            guardar_datos(socios)
+            if not insertar_socio(nuevo):
+                st.error("Este socio ya existe (DNI duplicado).")
+                st.stop()
             detalle = (
                 f"Disciplina: {nuevo['Disciplina']}, Plan: {nuevo['Plan contratado']} "
                 f"({nuevo['Precio']}), Fecha nacimiento: {nuevo['Fecha nacimiento']}, "
@@ -1,9 +1,9 @@
 # modules/baja.py
 import streamlit as st
-import time
+import pytz
 from datetime import datetime
-from core.data_manager import cargar_datos, guardar_datos, registrar_log
-from modules.busqueda import buscador_socios, refrescar_busqueda
+from core.data_manager import cargar_datos, guardar_datos, obtener_socio_store, registrar_log, texto_en_hoja
+from modules.busqueda import buscador_socios, refrescar_busqueda, COLUMNAS_BUSQUEDA
 
 
 def _mostrar_ficha_detalle(socio: dict):
@@ -22,24 +22,27 @@ def _mostrar_ficha_detalle(socio: dict):
             <strong>Plan contratado:</strong> {socio.get('Plan contratado','')}<br>
             <strong>Estado actual:</strong> {socio.get('Estado','')}<br>
             <strong>Estado de pago:</strong> {socio.get('Estado de pago','')}<br>
-            <strong>Fecha último pago:</strong> {socio.get('Fecha último pago','') or '—'}
+            <strong>Fecha último pago:</strong> {texto_en_hoja('Fecha último pago', socio.get('Fecha último pago')) or '—'}
         </div>
         """,
         unsafe_allow_html=True,
     )
 
 
-def _mostrar_progreso(duracion=0.01):
-    barra = st.progress(0)
-    for i in range(100):
-        time.sleep(duracion)
-        barra.progress(i + 1)
+def _actualizar_estado_socio(dni: str, **estado):
+    """
+    Cambia el estado del socio y guarda solo las celdas modificadas.
+    Devuelve la tabla actualizada, que sirve para refrescar la búsqueda sin releer la hoja.
+    """
+    store = obtener_socio_store()
+    store.set_status(dni, **estado)
+    return guardar_datos(store.df)
 
 
 def mostrar_baja():
     st.subheader("🔍 Buscar socio")
 
-    socios = cargar_datos()
+    socios = cargar_datos(columns=COLUMNAS_BUSQUEDA)
     rol = (st.session_state.get("role") or "").lower()
 
     if "baja_socio_en_proceso" not in st.session_state:
@@ -55,13 +58,8 @@ def mostrar_baja():
             st.info("📄 Ficha del socio seleccionado:")
             _mostrar_ficha_detalle(socio)
         elif evento["accion"] == "marcar_pagado":
-            from core.data_manager import fecha_hoy_madrid
-            from datetime import datetime
-            import pytz
             fecha_actual = datetime.now(tz=pytz.timezone("Europe/Madrid")).strftime("%d-%m-%Y %H:%M:%S")
-            socios.loc[socios["DNI"] == socio["DNI"], "Estado de pago"] = "Pagado"
-            socios.loc[socios["DNI"] == socio["DNI"], "Fecha último pago"] = fecha_actual
-            guardar_datos(socios)
+            socios_actualizados = _actualizar_estado_socio(socio["DNI"], estado_pago="Pagado", fecha_pago=fecha_actual)
             registrar_log(
                 usuario=st.session_state.get("username", "desconocido"),
                 accion="pagado",
@@ -70,13 +68,10 @@ def mostrar_baja():
             )
             st.success(f"💰 Pago registrado para {socio['Nombre']} {socio['Apellidos']}.")
             st.toast("Pago registrado.")
-            _mostrar_progreso(0.01)
-            socios_actualizados = cargar_datos()
-            refrescar_busqueda(socios_actualizados)
+            refrescar_busqueda(socios_actualizados[COLUMNAS_BUSQUEDA])
             st.rerun()
         elif evento["accion"] == "marcar_no_pagado":
-            socios.loc[socios["DNI"] == socio["DNI"], "Estado de pago"] = "No pagado"
-            guardar_datos(socios)
+            socios_actualizados = _actualizar_estado_socio(socio["DNI"], estado_pago="No pagado")
             registrar_log(
                 usuario=st.session_state.get("username", "desconocido"),
                 accion="no pagado",
@@ -85,13 +80,10 @@ def mostrar_baja():
             )
             st.info(f"🔁 Estado revertido a 'No pagado' para {socio['Nombre']} {socio['Apellidos']}.")
             st.toast("Estado de pago cambiado a No pagado.")
-            _mostrar_progreso(0.01)
-            socios_actualizados = cargar_datos()
-            refrescar_busqueda(socios_actualizados)
+            refrescar_busqueda(socios_actualizados[COLUMNAS_BUSQUEDA])
             st.rerun()
         elif evento["accion"] == "dar_alta":
-            socios.loc[socios["DNI"] == socio["DNI"], "Estado"] = "Activo"
-            guardar_datos(socios)
+            socios_actualizados = _actualizar_estado_socio(socio["DNI"], estado="Activo")
             registrar_log(
                 usuario=st.session_state.get("username", "desconocido"),
                 accion="alta",
@@ -100,9 +92,7 @@ def mostrar_baja():
             )
             st.success(f"🟢 {socio['Nombre']} ha sido dado de alta.")
             st.toast("Socio reactivado correctamente.")
-            _mostrar_progreso(0.01)
-            socios_actualizados = cargar_datos()
-            refrescar_busqueda(socios_actualizados)
+            refrescar_busqueda(socios_actualizados[COLUMNAS_BUSQUEDA])
             st.rerun()
 
     if not st.session_state.get("busqueda_resultados"):
@@ -124,8 +114,7 @@ def mostrar_baja():
         st.rerun()
 
     if col2.button("Confirmar baja ✅"):
-        socios.loc[socios["DNI"] == socio_en_proceso["DNI"], "Estado"] = "Baja"
-        guardar_datos(socios)
+        _actualizar_estado_socio(socio_en_proceso["DNI"], estado="Baja")
         registrar_log(
             usuario=st.session_state.get("username", "desconocido"),
             accion="baja",
@@ -134,7 +123,6 @@ def mostrar_baja():
         )
         st.success(f"✅ {socio_en_proceso.get('Nombre','')} ha sido dado de baja.")
         st.toast("Baja registrada correctamente.")
-        _mostrar_progreso(0.015)
 
         st.session_state.baja_socio_en_proceso = None
         st.session_state.logged_in = False
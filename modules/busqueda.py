@@ -24,6 +24,22 @@ ACCIONES_POR_ROL = {
     ],
 }
 
+# Columnas que necesita el buscador (tarjetas y ficha). Se leen proyectadas para no
+# descargar IBAN ni URLs de documentos en cada búsqueda.
+COLUMNAS_BUSQUEDA = [
+    "Nombre",
+    "Apellidos",
+    "DNI",
+    "Teléfono",
+    "Email",
+    "Disciplina",
+    "Plan contratado",
+    "Precio",
+    "Estado",
+    "Estado de pago",
+    "Fecha último pago",
+]
+
 BUSQUEDA_STATE_KEYS = [
     "busqueda_resultados",
     "busqueda_valor",
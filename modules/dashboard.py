@@ -6,6 +6,16 @@ from datetime import datetime, timedelta, date
 
 from core.data_manager import cargar_datos
 
+# Columnas que usan las métricas y gráficos; el resto de la hoja no se descarga.
+COLUMNAS_DASHBOARD = [
+    "Estado",
+    "Estado de pago",
+    "Disciplina",
+    "Plan contratado",
+    "Fecha de alta",
+    "Fecha nacimiento",
+]
+
 
 def _configurar_figura():
     fig, ax = plt.subplots()
@@ -14,13 +24,19 @@ def _configurar_figura():
     return fig, ax
 
 
+def _recuento(serie):
+    # En las columnas categóricas value_counts también lista las categorías sin socios.
+    counts = serie.value_counts()
+    return counts[counts > 0]
+
+
 def grafico_tipo_plan(df):
     st.subheader("🥋 Distribución por tipo de plan")
     if "Plan contratado" not in df.columns or df["Plan contratado"].dropna().empty:
         st.info("No hay datos de planes para mostrar el gráfico.")
         return
 
-    plan_counts = df["Plan contratado"].value_counts()
+    plan_counts = _recuento(df["Plan contratado"])
     fig, ax = _configurar_figura()
     ax.pie(
         plan_counts.values,
@@ -39,7 +55,7 @@ def grafico_disciplinas(df):
     if "Disciplina" not in df.columns or df["Disciplina"].dropna().empty:
         st.info("No hay datos de disciplinas para generar este gráfico.")
         return
-    counts = df["Disciplina"].value_counts()
+    counts = _recuento(df["Disciplina"])
     fig, ax = _configurar_figura()
     counts.plot(kind="bar", ax=ax, color="#ff4b4b")
     ax.set_ylabel("Número de socios", color="white")
@@ -56,7 +72,7 @@ def grafico_planes_populares(df):
     if columna not in df.columns or df[columna].dropna().empty:
         st.info("No hay datos suficientes de planes contratados.")
         return
-    counts = df[columna].value_counts().sort_values(ascending=True)
+    counts = _recuento(df[columna]).sort_values(ascending=True)
     fig, ax = _configurar_figura()
     counts.plot(kind="barh", ax=ax, color="#ff884b")
     ax.set_xlabel("Socios", color="white")
@@ -73,7 +89,7 @@ def grafico_estado_pago(df):
     if "Estado de pago" not in df.columns or df["Estado de pago"].dropna().empty:
         st.info("No hay datos de estado de pago.")
         return
-    counts = df["Estado de pago"].value_counts()
+    counts = _recuento(df["Estado de pago"])
     fig, ax = _configurar_figura()
     wedges, _, autotexts = ax.pie(
         counts.values,
@@ -146,7 +162,7 @@ def grafico_hist_edades(df):
 def mostrar_dashboard():
     st.title("📊 Estadísticas del gimnasio")
 
-    df = cargar_datos()
+    df = cargar_datos(columns=COLUMNAS_DASHBOARD)
     if df.empty:
         st.warning("No hay datos disponibles todavía.")
         return
@@ -1,8 +1,8 @@
 import streamlit as st
 import re
 from datetime import date
-from core.data_manager import cargar_datos, guardar_datos, registrar_log
-from modules.busqueda import buscador_socios, refrescar_busqueda
+from core.data_manager import cargar_datos, guardar_datos, obtener_socio_store, registrar_log, texto_en_hoja
+from modules.busqueda import buscador_socios, refrescar_busqueda, COLUMNAS_BUSQUEDA
 from modules.alta import (
     PLANES_INFANTIL,
     PLANES_ADULTO,
@@ -10,6 +10,9 @@ from modules.alta import (
     _calcular_edad,
 )
 
+# El buscador de edición necesita además la fecha de nacimiento para precargar el formulario.
+COLUMNAS_EDICION = COLUMNAS_BUSQUEDA + ["Fecha nacimiento"]
+
 
 def _validar_formulario(nombre, apellidos, telefono, email, fecha_nac, plan_tuple, infantil, disciplina):
     errores = []
@@ -36,6 +39,43 @@ def _validar_formulario(nombre, apellidos, telefono, email, fecha_nac, plan_tupl
     return errores
 
 
+def _campos_cambiados(socio: dict, formulario: dict) -> dict:
+    """
+    Campos del formulario que difieren de la ficha que se cargó al abrirlo. Solo esos se
+    guardan: el resto lleva los valores de entonces y pisaría lo que otra sesión haya
+    cambiado mientras tanto.
+    """
+    return {
+        campo: valor
+        for campo, valor in formulario.items()
+        if texto_en_hoja(campo, valor) != texto_en_hoja(campo, socio.get(campo))
+    }
+
+
+def _guardar_edicion(socio: dict, formulario: dict, usuario: str):
+    """
+    Guarda los campos que el formulario cambió y registra el log con ellos. Devuelve los
+    socios tal como quedan tras guardar, o None si el DNI ya no existe.
+    """
+    store = obtener_socio_store()
+    if socio["DNI"] not in store:
+        return None
+
+    cambios = store.update(socio["DNI"], _campos_cambiados(socio, formulario))
+    cambios_detalle = [
+        f"{campo}: {valor_anterior} → {nuevo_valor}"
+        for campo, (valor_anterior, nuevo_valor) in cambios.items()
+    ]
+    if cambios_detalle:
+        registrar_log(
+            usuario=usuario,
+            accion="editar",
+            dni=socio["DNI"],
+            detalle="; ".join(cambios_detalle),
+        )
+    return guardar_datos(store.df)
+
+
 def _obtener_planes(disciplina: str, infantil: bool):
     if infantil:
         return PLANES_INFANTIL
@@ -51,7 +91,7 @@ def mostrar_editar():
         st.warning("No tienes permisos para editar socios.")
         return
 
-    socios = cargar_datos()
+    socios = cargar_datos(columns=COLUMNAS_EDICION)
 
     if "editar_socio" not in st.session_state:
         st.session_state.editar_socio = None
@@ -84,7 +124,7 @@ def mostrar_editar():
 
     disciplina = socio.get("Disciplina", "Sin definir")
     estado = socio.get("Estado", "Desconocido")
-    fecha_nac_str = socio.get("Fecha nacimiento") or socio.get("Fecha de nacimiento")
+    fecha_nac_str = texto_en_hoja("Fecha nacimiento", socio.get("Fecha nacimiento")) or socio.get("Fecha de nacimiento")
     fecha_guardada = None
     edad = None
     if fecha_nac_str:
@@ -167,41 +207,24 @@ def mostrar_editar():
                 st.error(err)
             return
 
-        df_actualizado = cargar_datos()
-        indices = df_actualizado.index[df_actualizado["DNI"] == socio["DNI"]].tolist()
-        if len(indices) != 1:
+        guardado = _guardar_edicion(
+            socio,
+            {
+                "Nombre": nombre.strip(),
+                "Apellidos": apellidos.strip(),
+                "Teléfono": telefono.strip(),
+                "Email": email.strip().lower(),
+                "Plan contratado": plan_nombre,
+                "Precio": plan_precio,
+                "Fecha nacimiento": fecha_nacimiento_input.isoformat(),
+            },
+            st.session_state.get("username", "desconocido"),
+        )
+        if guardado is None:
             st.error("No se pudo localizar el registro del socio en la base de datos.")
             return
 
-        idx = indices[0]
-        campos = {
-            "Nombre": nombre.strip(),
-            "Apellidos": apellidos.strip(),
-            "Teléfono": telefono.strip(),
-            "Email": email.strip().lower(),
-            "Plan contratado": plan_nombre,
-            "Precio": plan_precio,
-            "Fecha nacimiento": fecha_nacimiento_input.isoformat(),
-        }
-
-        usuario = st.session_state.get("username", "desconocido")
-        cambios_detalle = []
-        for campo, nuevo_valor in campos.items():
-            valor_anterior = df_actualizado.at[idx, campo] if campo in df_actualizado.columns else ""
-            if str(valor_anterior) != str(nuevo_valor):
-                df_actualizado.at[idx, campo] = nuevo_valor
-                cambios_detalle.append(f"{campo}: {valor_anterior} → {nuevo_valor}")
-
-        if cambios_detalle:
-            registrar_log(
-                usuario=usuario,
-                accion="editar",
-                dni=socio["DNI"],
-                detalle="; ".join(cambios_detalle),
-            )
-
-        guardar_datos(df_actualizado)
-        refrescar_busqueda(df_actualizado)
+        refrescar_busqueda(guardado[COLUMNAS_EDICION])
         st.success("Los datos han sido actualizados correctamente.")
         st.toast("Cambios guardados.")
         st.session_state.editar_socio = None
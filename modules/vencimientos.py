@@ -0,0 +1,33 @@
+# modules/vencimientos.py
+import streamlit as st
+from core.data_manager import socios_por_vencer, COLUMNA_PROXIMO_PAGO
+
+COLUMNAS_LISTADO = [
+    "Nombre",
+    "Apellidos",
+    "DNI",
+    "Teléfono",
+    "Plan contratado",
+    "Estado de pago",
+    COLUMNA_PROXIMO_PAGO,
+]
+
+
+def mostrar_vencimientos():
+    st.subheader("📅 Próximos vencimientos")
+
+    if st.session_state.get("role") != "admin":
+        st.warning("No tienes permisos para ver los vencimientos.")
+        return
+
+    dias = st.number_input("Vencen en los próximos (días):", min_value=1, max_value=90, value=7, step=1)
+    socios = socios_por_vencer(int(dias))
+
+    if socios.empty or COLUMNA_PROXIMO_PAGO not in socios.columns:
+        st.info(f"Ningún socio tiene el pago venciendo en los próximos {int(dias)} días.")
+        return
+
+    listado = socios[COLUMNAS_LISTADO].copy()
+    listado[COLUMNA_PROXIMO_PAGO] = listado[COLUMNA_PROXIMO_PAGO].dt.strftime("%d-%m-%Y")
+    st.success(f"{len(listado)} socio(s) con el pago venciendo en los próximos {int(dias)} días.")
+    st.dataframe(listado, hide_index=True, use_container_width=True)
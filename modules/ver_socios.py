@@ -1,19 +1,19 @@
 import streamlit as st
-from core.data_manager import cargar_datos
+from core.data_manager import obtener_socio_store
 
 def mostrar_socios():
     st.subheader("📋 Listado de socios")
 
-    socios = cargar_datos()
+    socios = obtener_socio_store()
     filtro = st.selectbox("Mostrar:", ["Todos", "Activos", "De baja", "Pagado", "No pagado"])
 
     if filtro == "Activos":
-        st.dataframe(socios[socios["Estado"] == "Activo"])
+        st.dataframe(socios.filtrar(estado="Activo"))
     elif filtro == "De baja":
-        st.dataframe(socios[socios["Estado"] == "Baja"])
+        st.dataframe(socios.filtrar(estado="Baja"))
     elif filtro == "Pagado":
-        st.dataframe(socios[socios["Estado de pago"] == "Pagado"])
+        st.dataframe(socios.filtrar(estado_pago="Pagado"))
     elif filtro == "No pagado":
-        st.dataframe(socios[socios["Estado de pago"] == "No pagado"])
+        st.dataframe(socios.filtrar(estado_pago="No pagado"))
     else:
-        st.dataframe(socios)
+        st.dataframe(socios.df)
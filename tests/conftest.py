@@ -0,0 +1,114 @@
+# tests/conftest.py
+"""
+Las pruebas corren contra el simulador de Google (SOCIOS_FAKE_GOOGLE=1). El entorno se
+fija antes de importar data_manager, que lee la configuración al cargarse; cada prueba
+parte de un gimnasio sintético nuevo y de la capa de datos vacía.
+"""
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+_DIRECTORIO = Path(tempfile.mkdtemp(prefix="socios_tests_"))
+os.environ.update(
+    SOCIOS_FAKE_GOOGLE="1",
+    SPREADSHEET_ID="sid",
+    SOCIOS_BACKEND="sheets",
+    SOCIOS_SNAPSHOT_PATH=str(_DIRECTORIO / "socios_snapshot.pkl"),
+    SOCIOS_DIARIO_PATH=str(_DIRECTORIO / "escrituras_pendientes.jsonl"),
+    SOCIOS_API_CUOTA_POR_MINUTO="0",
+    SOCIOS_API_CUOTA_DRIVE_POR_MINUTO="0",
+)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import core.data_manager as dm  # noqa: E402
+from benchmarks.datos_sinteticos import cargar_en_fake, generar_socios  # noqa: E402
+from core import llamadas_api  # noqa: E402
+
+FILAS = 200
+
+
+class Gimnasio:
+    """Simulador cargado con socios sintéticos y atajos para leer la hoja como la ve Google."""
+
+    def __init__(self, fake, socios):
+        self.fake = fake
+        self.socios = socios
+        self.titulo = dm._get_sheet_title(dm._get_spreadsheet_id())
+
+    def filas(self) -> list:
+        return [f for f in self.fake.valores("sid", self.titulo)[1:] if any(f)]
+
+    def fila(self, dni: str) -> dict:
+        """Fila del socio en la hoja como {columna: texto}."""
+        for fila in self.filas():
+            socio = dict(zip(dm.COLUMNS, fila + [""] * (len(dm.COLUMNS) - len(fila))))
+            if socio["DNI"] == dni:
+                return socio
+        raise KeyError(dni)
+
+    def escribir_fila(self, dni: str, **campos) -> None:
+        """Otra instancia cambia la fila del socio en la hoja y sube su versión."""
+        filas = self.fake.valores("sid", self.titulo)
+        pos = next(i for i, f in enumerate(filas) if i and f and f[dm.COLUMNS.index("DNI")] == dni)
+        fila = list(filas[pos]) + [""] * (len(dm.COLUMNS) - len(filas[pos]))
+        for columna, valor in campos.items():
+            fila[dm.COLUMNS.index(columna)] = valor
+        iv = dm.COLUMNS.index(dm.COLUMNA_VERSION)
+        fila[iv] = str(dm._version(fila[iv]) + 1)
+        self.fake.sheets().spreadsheets().values().update(
+            spreadsheetId="sid", range=f"{self.titulo}!A{pos + 1}", valueInputOption="RAW", body={"values": [fila]}
+        ).execute()
+
+    def reiniciar_proceso(self, directorio: Path) -> None:
+        """Simula una caída del proceso: se pierde todo lo que había en memoria, no la hoja ni los ficheros."""
+        _vaciar_capa_datos(directorio)
+        dm._fake_google = self.fake
+
+    def logs(self) -> list:
+        return [dict(zip(dm.LOG_COLUMNS, f)) for f in self.fake.valores("sid", "Logs")[1:] if any(f)]
+
+
+def _vaciar_capa_datos(directorio: Path) -> None:
+    dm.QUEUE_PATH = directorio / "offline_queue.json"
+    dm.DIARIO_PATH = directorio / "escrituras_pendientes.jsonl"
+    dm.SNAPSHOT_PATH = directorio / "socios_snapshot.pkl"
+    dm._fake_google = None
+    dm._sheets_service = None
+    dm._drive_service = None
+    dm._sheet_title_cache = None
+    dm._pestanas_existentes.clear()
+    dm._backend = None
+    dm._snapshot_disco_mtime = None
+    dm._cache_df = None
+    dm._cache_descargado_en = None
+    dm._cache_firma = None
+    dm._cache_proyecciones = {}
+    dm._indice_vencimientos = None
+    dm._socio_store = None
+    dm._pendiente_filas = {}
+    dm._pendiente_df = None
+    dm._filas_en_vuelo = {}
+    dm._escritura_en_curso = False
+    dm._pendiente_ops = 0
+    dm._pendiente_desde = None
+    dm._historial_filas = OrderedDict()
+    dm._set_snapshot(None)
+    dm._invalidar_cache()
+    llamadas_api._circuito.exito()
+
+
+@pytest.fixture
+def gimnasio(tmp_path, monkeypatch):
+    # Escrituras síncronas salvo que la prueba pida diferirlas.
+    monkeypatch.setattr(dm, "ESCRITURA_DIFERIDA_MS", 0)
+    _vaciar_capa_datos(tmp_path)
+    fake = dm._get_fake_google()
+    socios = generar_socios(FILAS, 7)
+    cargar_en_fake(fake, "sid", socios, [])
+    yield Gimnasio(fake, socios)
+    fake.simular_caida(False)
+    dm.vaciar_escrituras_pendientes()
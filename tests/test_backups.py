@@ -0,0 +1,23 @@
+# tests/test_backups.py
+"""La limpieza de backups borra los de más de 30 días y conserva los recientes."""
+from datetime import datetime, timedelta, timezone
+
+import core.data_manager as dm
+
+
+def _backup(fake, carpeta: str, nombre: str, dias: int) -> str:
+    fichero = fake._crear_fichero(nombre, "application/vnd.google-apps.spreadsheet", [carpeta], b"")
+    creado = datetime.now(timezone.utc) - timedelta(days=dias)
+    fichero["createdTime"] = creado.isoformat().replace("+00:00", "Z")
+    return fichero["id"]
+
+
+def test_limpieza_borra_solo_los_antiguos(gimnasio):
+    carpeta = dm._ensure_drive_folder_named(dm.BACKUP_SHEETS_FOLDER_NAME)
+    viejo = _backup(gimnasio.fake, carpeta, "backup_viejo", 45)
+    reciente = _backup(gimnasio.fake, carpeta, "backup_reciente", 3)
+
+    dm.limpiar_backups_antiguos()
+
+    assert viejo not in gimnasio.fake._ficheros
+    assert reciente in gimnasio.fake._ficheros
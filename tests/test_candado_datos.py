@@ -0,0 +1,71 @@
+# tests/test_candado_datos.py
+"""Las llamadas a Google se hacen sin el candado de datos: las demás sesiones no esperan."""
+import threading
+import time
+
+import core.data_manager as dm
+
+LATENCIA_MS = 300
+
+
+def _en_hilo(funcion):
+    hilo = threading.Thread(target=funcion, daemon=True)
+    hilo.start()
+    # Margen para que el hilo llegue a la llamada a Google.
+    time.sleep(LATENCIA_MS / 1000 / 3)
+    return hilo
+
+
+def _segundos(funcion) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def test_descarga_sin_candado(gimnasio):
+    gimnasio.fake.latencia_ms = LATENCIA_MS
+    hilo = _en_hilo(dm.cargar_datos)
+
+    assert _segundos(dm.obtener_metricas) < LATENCIA_MS / 1000 / 3
+    hilo.join()
+
+
+def test_descargas_simultaneas_se_comparten(gimnasio):
+    gimnasio.fake.latencia_ms = LATENCIA_MS
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(len(dm.cargar_datos()))) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == [len(gimnasio.socios)] * 4
+    assert gimnasio.fake.estadisticas()["llamadas"].get("sheets.spreadsheets.values.batchGet", 0) <= 1
+
+
+def test_lectura_durante_escritura_en_el_acto(gimnasio):
+    df = dm.cargar_datos()
+    gimnasio.fake.latencia_ms = LATENCIA_MS
+    # Quitar una fila obliga a reescribir la hoja en el acto.
+    hilo = _en_hilo(lambda: dm.guardar_datos(df.iloc[1:]))
+
+    assert _segundos(dm.cargar_datos) < LATENCIA_MS / 1000 / 3
+    hilo.join()
+    assert len(gimnasio.filas()) == len(gimnasio.socios) - 1
+    assert len(dm.cargar_datos()) == len(gimnasio.socios) - 1
+
+
+def test_alta_sin_candado(gimnasio):
+    dm.cargar_datos()
+    gimnasio.fake.latencia_ms = LATENCIA_MS
+    nuevo = {**gimnasio.socios.iloc[0].to_dict(), "DNI": "00000001R"}
+    resultados = []
+    hilo = _en_hilo(lambda: resultados.append(dm.insertar_socio(nuevo)))
+
+    assert _segundos(dm.cargar_datos) < LATENCIA_MS / 1000 / 3
+    # Un segundo alta con el mismo DNI espera su turno y se rechaza.
+    assert dm.insertar_socio(nuevo) is False
+    hilo.join()
+    assert resultados == [True]
+    assert [f[dm.COLUMNS.index("DNI")] for f in gimnasio.filas()].count("00000001R") == 1
+    assert "00000001R" in dm.cargar_datos()["DNI"].tolist()
@@ -0,0 +1,47 @@
+# tests/test_cola_offline.py
+"""Con Google caído, las escrituras van a la cola offline y se reaplican fila a fila al volver."""
+import json
+
+import core.data_manager as dm
+from core import llamadas_api
+
+
+def test_escritura_sin_conexion_se_encola_y_se_sincroniza(gimnasio):
+    df = dm.cargar_datos()
+    dni = df.loc[20, "DNI"]
+    otro = df.loc[40, "DNI"]
+
+    gimnasio.fake.simular_caida()
+    store = dm.obtener_socio_store()
+    store.update(dni, {"Email": "local@ejemplo.es"})
+    dm.guardar_datos(store.df)
+
+    cola = json.loads(dm.QUEUE_PATH.read_text(encoding="utf-8"))
+    assert [op["type"] for op in cola] == ["guardar_filas"]
+    assert len(cola[0]["payload"]["filas"]) == 1
+    assert dm.hay_pendientes_offline()
+
+    gimnasio.fake.simular_caida(False)
+    llamadas_api._circuito.exito()
+    # Entretanto, otra instancia cambia otro campo del mismo socio y otra fila.
+    gimnasio.escribir_fila(dni, **{"Teléfono": "600000000"})
+    gimnasio.escribir_fila(otro, **{"Teléfono": "611111111"})
+
+    assert dm.sincronizar_pendientes() == 1
+
+    assert not dm.hay_pendientes_offline()
+    socio = gimnasio.fila(dni)
+    assert (socio["Email"], socio["Teléfono"]) == ("local@ejemplo.es", "600000000")
+    assert gimnasio.fila(otro)["Teléfono"] == "611111111"
+    assert sum(fila["Email"] == "local@ejemplo.es" for fila in map(gimnasio.fila, gimnasio.socios["DNI"])) == 1
+
+
+def test_sin_conexion_no_se_intenta_sincronizar(gimnasio):
+    df = dm.cargar_datos()
+    gimnasio.fake.simular_caida()
+    store = dm.obtener_socio_store()
+    store.update(df.loc[5, "DNI"], {"Email": "otro@ejemplo.es"})
+    dm.guardar_datos(store.df)
+
+    assert dm.sincronizar_pendientes() == 0
+    assert dm.hay_pendientes_offline()
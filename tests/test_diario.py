@@ -0,0 +1,39 @@
+# tests/test_diario.py
+"""Lo confirmado en el diario y no escrito en la hoja se recupera tras una caída del proceso."""
+import core.data_manager as dm
+
+
+def test_recuperacion_del_diario_tras_una_caida(gimnasio, tmp_path, monkeypatch):
+    monkeypatch.setattr(dm, "ESCRITURA_DIFERIDA_MS", 200)
+    # El proceso cae antes de que el hilo escritor llegue a escribir.
+    iniciar_escritor = dm._iniciar_escritor
+    monkeypatch.setattr(dm, "_iniciar_escritor", lambda: None)
+    df = dm.cargar_datos()
+    dni, otro = df.loc[12, "DNI"], df.loc[30, "DNI"]
+    store = dm.obtener_socio_store()
+    store.update(dni, {"Email": "diario@ejemplo.es"})
+    dm.guardar_datos(store.df)
+    assert gimnasio.fila(dni)["Email"] != "diario@ejemplo.es"
+    assert dm.DIARIO_PATH.exists()
+
+    gimnasio.reiniciar_proceso(tmp_path)
+    monkeypatch.setattr(dm, "_iniciar_escritor", iniciar_escritor)
+    # Una anotación a medio escribir en el momento de la caída no cuenta.
+    with open(dm.DIARIO_PATH, "a", encoding="utf-8") as f:
+        f.write('{"pos": 30, "fila": ["truncada"')
+    # Mientras el proceso estaba caído, otra instancia cambió otra fila.
+    gimnasio.escribir_fila(otro, **{"Teléfono": "622222222"})
+
+    assert dm._recuperar_diario() == 1
+
+    assert not dm.DIARIO_PATH.exists()
+    assert gimnasio.fila(dni)["Email"] == "diario@ejemplo.es"
+    assert gimnasio.fila(otro)["Teléfono"] == "622222222"
+    assert dm.obtener_socio_store().get(dni)["Email"] == "diario@ejemplo.es"
+
+
+def test_sin_diario_no_se_lee_la_hoja(gimnasio):
+    gimnasio.fake.reiniciar_estadisticas()
+
+    assert dm._recuperar_diario() == 0
+    assert gimnasio.fake.estadisticas()["total_llamadas"] == 0
@@ -0,0 +1,82 @@
+# tests/test_edicion_concurrente.py
+"""Dos sesiones editan el mismo socio: ninguna pisa los cambios de la otra."""
+import core.data_manager as dm
+from core.socio_store import SocioStore
+from modules.busqueda import COLUMNAS_BUSQUEDA
+from modules.editar import COLUMNAS_EDICION, _guardar_edicion
+
+
+def _ficha(dni: str) -> dict:
+    """La fila que el buscador entrega al formulario de edición al abrirlo."""
+    socios = dm.cargar_datos(columns=COLUMNAS_EDICION)
+    return socios[socios["DNI"] == dni].iloc[0].to_dict()
+
+
+def _formulario(ficha: dict, **cambios) -> dict:
+    """Lo que envía el formulario: todos sus campos, con los valores cargados salvo `cambios`."""
+    campos = ["Nombre", "Apellidos", "Teléfono", "Email", "Plan contratado", "Precio", "Fecha nacimiento"]
+    formulario = {c: dm.texto_en_hoja(c, ficha[c]) for c in campos}
+    return formulario | cambios
+
+
+def test_formulario_obsoleto_no_pisa_otra_edicion(gimnasio):
+    dni = gimnasio.socios.loc[0, "DNI"]
+    ficha_a = _ficha(dni)
+
+    # B abre el mismo socio y cambia el email.
+    ficha_b = _ficha(dni)
+    _guardar_edicion(ficha_b, _formulario(ficha_b, Email="nuevo@b.es"), "b")
+
+    # A guarda después el formulario que abrió antes, cambiando solo el teléfono.
+    _guardar_edicion(ficha_a, _formulario(ficha_a, **{"Teléfono": "699000111"}), "a")
+
+    fila = gimnasio.fila(dni)
+    assert fila["Email"] == "nuevo@b.es"
+    assert fila["Teléfono"] == "699000111"
+    assert fila[dm.COLUMNA_VERSION] == "3"
+    log_a = [l for l in gimnasio.logs() if l["Usuario"] == "a"]
+    assert len(log_a) == 1
+    assert "Teléfono" in log_a[0]["Detalle"] and "Email" not in log_a[0]["Detalle"]
+
+
+def test_formulario_sin_cambios_no_escribe(gimnasio):
+    dni = gimnasio.socios.loc[5, "DNI"]
+    ficha = _ficha(dni)
+    version = gimnasio.fila(dni)[dm.COLUMNA_VERSION]
+
+    _guardar_edicion(ficha, _formulario(ficha), "a")
+
+    assert gimnasio.fila(dni)[dm.COLUMNA_VERSION] == version
+    assert gimnasio.logs() == []
+
+
+def test_sesiones_con_tablas_obsoletas_fusionan_filas(gimnasio):
+    a = dm.cargar_datos()
+    b = dm.cargar_datos()
+    dni = a.loc[10, "DNI"]
+    otro = a.loc[20, "DNI"]
+
+    sa = SocioStore(a)
+    sa.update(dni, {"Teléfono": "600000001"})
+    sb = SocioStore(b)
+    sb.update(dni, {"Email": "b@x.es"})
+    sb.update(otro, {"Estado": "Baja"})
+    dm.guardar_datos(sa.df)
+    dm.guardar_datos(sb.df)
+
+    fila = gimnasio.fila(dni)
+    assert (fila["Teléfono"], fila["Email"]) == ("600000001", "b@x.es")
+    assert gimnasio.fila(otro)["Estado"] == "Baja"
+
+
+def test_cambio_de_otra_instancia_se_conserva(gimnasio):
+    dni = gimnasio.socios.loc[50, "DNI"]
+    store = dm.obtener_socio_store()
+
+    gimnasio.escribir_fila(dni, Email="remoto@x.es")
+    store.update(dni, {"Teléfono": "611222333"})
+    dm.guardar_datos(store.df)
+
+    fila = gimnasio.fila(dni)
+    assert (fila["Email"], fila["Teléfono"]) == ("remoto@x.es", "611222333")
+    assert set(COLUMNAS_BUSQUEDA) <= set(dm.cargar_datos().columns)
@@ -0,0 +1,57 @@
+# tests/test_indice_dni.py
+"""El índice de DNIs se mantiene con cada escritura y alta; solo se reconstruye al releer la hoja."""
+import core.data_manager as dm
+
+
+def test_edicion_actualiza_el_indice_sin_reconstruirlo(gimnasio):
+    dm.cargar_datos()
+    indice = dm._get_dni_index()
+    viejo = gimnasio.socios.loc[3, "DNI"]
+
+    store = dm.obtener_socio_store()
+    store.update(viejo, {"Teléfono": "600111222"})
+    dm.guardar_datos(store.df)
+    assert dm._dni_index is indice
+
+    store = dm.obtener_socio_store()
+    store.update(viejo, {"DNI": "00000002W"})
+    dm.guardar_datos(store.df)
+
+    assert dm._dni_index is indice
+    assert dm.existe_dni("00000002w") and not dm.existe_dni(viejo)
+
+
+def test_baja_de_fila_actualiza_el_indice(gimnasio):
+    df = dm.cargar_datos()
+    indice = dm._get_dni_index()
+    quitado = df["DNI"].iloc[0]
+
+    dm.guardar_datos(df.iloc[1:])
+
+    assert dm._dni_index is indice
+    assert not dm.existe_dni(quitado)
+    assert all(dm.existe_dni(dni) for dni in df["DNI"].iloc[1:])
+
+
+def test_alta_anade_al_indice(gimnasio):
+    dm.cargar_datos()
+    indice = dm._get_dni_index()
+
+    assert dm.insertar_socio({**gimnasio.socios.iloc[0].to_dict(), "DNI": "00000001R"})
+
+    assert dm._dni_index is indice
+    assert dm.existe_dni("00000001R")
+    assert not dm.insertar_socio({**gimnasio.socios.iloc[1].to_dict(), "DNI": " 00000001r"})
+
+
+def test_relectura_completa_reconstruye(gimnasio):
+    dm.cargar_datos()
+    indice = dm._get_dni_index()
+    dni = gimnasio.socios.loc[8, "DNI"]
+    gimnasio.escribir_fila(dni, DNI="00000003A")
+
+    dm._invalidar_cache()
+    dm.cargar_datos()
+
+    assert dm._get_dni_index() is not indice
+    assert dm.existe_dni("00000003A") and not dm.existe_dni(dni)
@@ -0,0 +1,81 @@
+# tests/test_storage_sqlite.py
+"""Backend SQLite: escrituras condicionales por versión y bases creadas con esquemas anteriores."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import core.data_manager as dm
+from core.storage import BackendSocios, ConflictoVersiones, SQLiteBackend
+
+
+def _socios(n: int, columnas: list) -> pd.DataFrame:
+    df = pd.DataFrame([[f"{c}{i}" for c in columnas] for i in range(n)], columns=columnas)
+    df["DNI"] = [f"{i:08d}A" for i in range(n)]
+    df["Fecha último pago"] = "01-01-2026 10:00:00"
+    if dm.COLUMNA_VERSION in columnas:
+        df[dm.COLUMNA_VERSION] = "1"
+    return df
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(tmp_path / "socios.db", dm.COLUMNS, dm.LOG_COLUMNS, dm.COLUMNA_VERSION)
+    backend.escribir_socios(None, _socios(3, dm.COLUMNS))
+    return backend
+
+
+def test_backend_incompleto_no_se_instancia():
+    class SoloLectura(BackendSocios):
+        def descargar_socios(self, http=None):
+            return pd.DataFrame(), True
+
+    with pytest.raises(TypeError):
+        SoloLectura()
+
+
+def test_escritura_condicional(backend):
+    df, _ = backend.descargar_socios()
+    nuevo = df.copy()
+    nuevo.loc[1, ["Nombre", dm.COLUMNA_VERSION]] = ["X", "2"]
+    backend.escribir_socios(df, nuevo)
+
+    # Otra sesión escribe a partir de la misma foto: la fila ya tiene otra versión.
+    obsoleto = df.copy()
+    obsoleto.loc[1, ["Nombre", dm.COLUMNA_VERSION]] = ["Y", "2"]
+    with pytest.raises(ConflictoVersiones) as error:
+        backend.escribir_socios(df, obsoleto)
+    assert error.value.posiciones == [1]
+    assert backend.descargar_socios()[0].loc[1, "Nombre"] == "X"
+
+
+def test_alta_de_otra_instancia_provoca_conflicto(backend):
+    df, _ = backend.descargar_socios()
+    backend.insertar_socio(["z"] * len(dm.COLUMNS))
+    nuevo = pd.concat([df, _socios(4, dm.COLUMNS).iloc[[3]]])
+    with pytest.raises(ConflictoVersiones):
+        backend.escribir_socios(df, nuevo)
+    assert len(backend.descargar_socios()[0]) == 4
+
+
+def test_base_anterior_se_migra(tmp_path):
+    ruta = tmp_path / "socios.db"
+    viejas = dm.COLUMNS[:-1]
+    SQLiteBackend(ruta, viejas, dm.LOG_COLUMNS).escribir_socios(None, _socios(2, viejas))
+    # Las primeras bases guardaban además una columna de fecha de pago en ISO.
+    with sqlite3.connect(ruta) as con:
+        con.execute("ALTER TABLE socios ADD COLUMN pago_iso TEXT NOT NULL DEFAULT ''")
+
+    backend = SQLiteBackend(ruta, dm.COLUMNS, dm.LOG_COLUMNS, dm.COLUMNA_VERSION)
+    df, _ = backend.descargar_socios()
+    assert list(df.columns) == dm.COLUMNS
+    assert df[dm.COLUMNA_VERSION].tolist() == ["", ""]
+    backend.insertar_socio(["z"] * len(dm.COLUMNS))
+    assert len(backend.descargar_socios()[0]) == 3
+
+
+def test_historial_logs_por_fecha(backend):
+    backend.registrar_log(["02-01-2026 09:00:00", "a", "editar", "00000001A", "segundo"])
+    backend.registrar_log(["01-01-2026 09:00:00", "a", "alta", "00000001A", "primero"])
+    backend.registrar_log(["03-01-2026 09:00:00", "a", "editar", "00000002A", "otro"])
+    assert [l["Detalle"] for l in backend.historial_logs("00000001A", 5)] == ["segundo", "primero"]
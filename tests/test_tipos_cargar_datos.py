@@ -0,0 +1,59 @@
+# tests/test_tipos_cargar_datos.py
+"""Contrato de tipos de cargar_datos y cómo se modifican los socios sin romperlo."""
+import pandas as pd
+import pytest
+
+import core.data_manager as dm
+from modules.busqueda import COLUMNAS_BUSQUEDA
+
+
+def test_tipos_de_columnas(gimnasio):
+    df = dm.cargar_datos()
+
+    for col in dm.COLUMNAS_CATEGORICAS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    for col in [*dm.COLUMNAS_FECHA, dm.COLUMNA_PROXIMO_PAGO]:
+        assert pd.api.types.is_datetime64_any_dtype(df[col]), col
+    for col in ["DNI", "Nombre", "Email", dm.COLUMNA_VERSION]:
+        assert pd.api.types.is_string_dtype(df[col]), col
+
+
+def test_proyeccion_con_los_mismos_tipos(gimnasio):
+    completa = dm.cargar_datos()
+    dm._invalidar_cache()
+    dm._cache_df = None
+    dm.SNAPSHOT_PATH.unlink(missing_ok=True)
+    parcial = dm.cargar_datos(columns=COLUMNAS_BUSQUEDA)
+
+    assert (parcial.dtypes == completa[parcial.columns].dtypes).all()
+
+
+def test_fecha_fuera_de_formato_se_queda_como_texto(gimnasio):
+    filas = gimnasio.fake.valores("sid", gimnasio.titulo)
+    dni = filas[3][dm.COLUMNS.index("DNI")]
+    gimnasio.escribir_fila(dni, **{"Fecha nacimiento": "31/02/1990"})
+    dm._invalidar_cache()
+
+    df = dm.cargar_datos()
+
+    assert pd.api.types.is_string_dtype(df["Fecha nacimiento"])
+    assert pd.api.types.is_datetime64_any_dtype(df["Fecha de alta"])
+
+
+def test_categoria_nueva_con_loc_falla(gimnasio):
+    df = dm.cargar_datos()
+    with pytest.raises(TypeError):
+        df.loc[0, "Estado"] = "Suspendido"
+
+
+def test_categoria_nueva_por_socio_store(gimnasio):
+    store = dm.obtener_socio_store()
+    dni = store.df["DNI"].iloc[0]
+
+    store.update(dni, {"Estado": "Suspendido", "Fecha último pago": "15-03-2026 10:00:00"})
+    guardada = dm.guardar_datos(store.df)
+
+    assert isinstance(guardada["Estado"].dtype, pd.CategoricalDtype)
+    assert gimnasio.fila(dni)["Estado"] == "Suspendido"
+    assert gimnasio.fila(dni)["Fecha último pago"] == "15-03-2026 10:00:00"
+    assert dm.cargar_datos().set_index("DNI").loc[dni, "Fecha último pago"] == pd.Timestamp(2026, 3, 15, 10)
@@ -0,0 +1,63 @@
+# tests/test_vencimientos.py
+"""El índice de vencimientos deja fuera las bajas y recoloca solo las filas que cambian."""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import core.data_manager as dm
+
+
+def _pagado_hace_un_mes_menos(dias: int) -> str:
+    """Fecha de último pago con la que un plan mensual vence dentro de `dias` días."""
+    return (datetime.now() - pd.DateOffset(months=1) + timedelta(days=dias)).strftime(dm.FORMATO_FECHA_PAGO)
+
+
+def _pares(indice) -> list:
+    fechas, etiquetas = indice
+    return sorted(zip(fechas.tolist(), etiquetas.tolist()))
+
+
+def test_las_bajas_no_entran_en_el_indice(gimnasio):
+    df = dm.cargar_datos()
+    fechas, etiquetas = dm._indice_vencimientos
+
+    assert (fechas[:-1] <= fechas[1:]).all()
+    assert not (df.loc[etiquetas, "Estado"] == "Baja").any()
+    assert set(etiquetas) == set(df.index[(df["Estado"] != "Baja") & df[dm.COLUMNA_PROXIMO_PAGO].notna()])
+
+
+def test_dar_de_baja_saca_al_socio_de_por_vencer(gimnasio):
+    dm.cargar_datos()
+    dni = gimnasio.socios.loc[gimnasio.socios["Estado"] != "Baja", "DNI"].iloc[0]
+    store = dm.obtener_socio_store()
+    store.update(dni, {"Plan contratado": "Mensual", "Fecha último pago": _pagado_hace_un_mes_menos(2)})
+    dm.guardar_datos(store.df)
+    assert dni in dm.socios_por_vencer(7)["DNI"].tolist()
+
+    store = dm.obtener_socio_store()
+    store.update(dni, {"Estado": "Baja"})
+    dm.guardar_datos(store.df)
+
+    assert dni not in dm.socios_por_vencer(7)["DNI"].tolist()
+
+
+def test_escritura_diferida_recoloca_solo_las_filas_cambiadas(gimnasio, monkeypatch):
+    monkeypatch.setattr(dm, "ESCRITURA_DIFERIDA_MS", 200)
+    dm.cargar_datos()
+    reconstrucciones = []
+    construir = dm._construir_indice_vencimientos
+    monkeypatch.setattr(dm, "_construir_indice_vencimientos", lambda df: reconstrucciones.append(1) or construir(df))
+
+    activos = gimnasio.socios.loc[gimnasio.socios["Estado"] != "Baja", "DNI"].tolist()
+    for i, dni in enumerate(activos[:6]):
+        store = dm.obtener_socio_store()
+        cambios = {"Plan contratado": "Mensual", "Fecha último pago": _pagado_hace_un_mes_menos(i + 1)}
+        if i % 3 == 2:
+            cambios["Estado"] = "Baja"
+        store.update(dni, cambios)
+        dm.guardar_datos(store.df)
+
+    assert not reconstrucciones
+    assert _pares(dm._indice_vencimientos) == _pares(construir(dm._cache_df))
+    por_vencer = dm.socios_por_vencer(7)["DNI"].tolist()
+    assert [dni for i, dni in enumerate(activos[:6]) if i % 3 != 2] == [dni for dni in por_vencer if dni in activos[:6]]